@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Event-loop responsiveness of AsyncMonitorManager on a slow simulated backend
+
+A ticker coroutine measures how late the event loop wakes it while
+brightness writes, mode listings and mode-sets are in flight. The script
+also times how far different monitors proceed in parallel while calls for
+one monitor stay serialized. Ordering, timeouts and cancellation are
+checked by tests/test_async.py.
+
+Usage: python benchmarks/bench_async.py [monitors]   (4 or more, default 8)
+"""
+
+import asyncio
+import sys
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_sim
+from glorb import MAX_DDC_WORKERS
+from glorb_async import AsyncMonitorManager
+from tests import support
+
+DDC_LATENCY = 0.2
+MODESET_LATENCY = 0.3
+TICK = 0.005
+# Worst acceptable event-loop wake-up delay
+MAX_LAG = 0.05
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - expected)
+
+
+async def scenarios(monitors, gates):
+    backend = glorb_sim.SimulatedBackend(monitors=monitors, ddc_latency=DDC_LATENCY, panel_latency=DDC_LATENCY,
+                                         modeset_latency=MODESET_LATENCY)
+    with support.quiet():
+        manager = await AsyncMonitorManager.create(backend=backend)
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(lags, stop))
+
+    async with manager:
+        with support.quiet():
+            began = time.perf_counter()
+            await manager.brightness_all(0.5)
+            parallel = time.perf_counter() - began
+
+            began = time.perf_counter()
+            await asyncio.gather(*(manager.brightness(1, level / 10) for level in range(3)))
+            serial = time.perf_counter() - began
+
+            began = time.perf_counter()
+            await asyncio.gather(manager.rotate(1, 90), manager.brightness(0, 0.7),
+                                 manager.get_display_modes(2), manager.set_display_mode(2, 1920, 1080))
+            mixed = time.perf_counter() - began
+
+    stop.set()
+    await tick
+
+    # One pool thread per monitor, up to MAX_DDC_WORKERS at a time
+    rounds = -(-monitors // MAX_DDC_WORKERS)
+    gates.check(f"{monitors} monitors written in parallel", parallel < DDC_LATENCY * (rounds + 1),
+                f"{parallel * 1000:.0f}ms")
+    gates.check("writes to one monitor are serialized", serial >= DDC_LATENCY * 3 * 0.95, f"{serial * 1000:.0f}ms")
+    # The two mode-sets run back to back, each followed by a re-enumeration
+    enumerate_all = backend.config['enum_latency'] * monitors
+    gates.check("rotate, mode-set and brightness overlap where they can",
+                mixed < (MODESET_LATENCY + enumerate_all) * 2 + DDC_LATENCY, f"{mixed * 1000:.0f}ms")
+    worst = max(lags)
+    gates.check("event loop stayed responsive", worst < MAX_LAG,
+                f"worst tick delay {worst * 1000:.1f}ms over {len(lags)} ticks")
+
+
+def main():
+    monitors = max(4, int(sys.argv[1])) if len(sys.argv) > 1 else 8
+    gates = Gates()
+    with isolated_cache():
+        asyncio.run(scenarios(monitors, gates))
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
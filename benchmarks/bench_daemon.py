@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Per-command CLI latency with and without a resident glorb daemon
+
+Usage: python benchmarks/bench_daemon.py [--runs N] [--monitor ID]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GLORB = [sys.executable, os.path.join(ROOT, 'glorb.py')]
+
+
+def time_command(argv, runs):
+    """Run a glorb command repeatedly and return per-run latencies in ms"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(GLORB + argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def wait_for_daemon(timeout=10.0):
+    sys.path.insert(0, ROOT)
+    import glorb_daemon
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if glorb_daemon.is_running():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def report(label, samples):
+    print(f"  {label:<18} mean {statistics.mean(samples):8.1f} ms   "
+          f"median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--monitor', type=int, default=0)
+    args = parser.parse_args()
+
+    commands = {
+        'identify': ['identify'],
+        'brightness': ['b', str(args.monitor), '0.5'],
+    }
+
+    print("Without daemon:")
+    for name, argv in commands.items():
+        report(name, time_command(['--no-daemon'] + argv, args.runs))
+
+    daemon = subprocess.Popen(GLORB + ['daemon'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_daemon():
+            print("Daemon did not start; skipping daemon measurements")
+            return 1
+        print("With daemon:")
+        for name, argv in commands.items():
+            report(name, time_command(argv, args.runs))
+    finally:
+        subprocess.run(GLORB + ['daemon', '--stop'], stdout=subprocess.DEVNULL, check=False)
+        daemon.wait(timeout=10)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
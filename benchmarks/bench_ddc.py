@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Bulk brightness with an unresponsive monitor, with and without DDC/CI deadlines and breakers
+
+Runs MonitorManager.brightness_all repeatedly on the simulated backend with
+one monitor that never answers, first with the guard disabled (the old
+behaviour: every call waits for the dead monitor), then with a deadline
+and circuit breaker. Retries, backoff and breaker recovery are checked by
+tests/test_ddc.py.
+
+Usage: python benchmarks/bench_ddc.py [rounds]
+"""
+
+import sys
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_ddc
+import glorb_sim
+from tests import support
+
+MONITORS = 6
+DEAD_LATENCY = 1.0
+UNGUARDED = {'timeout': 0, 'retries': 0, 'threshold': 10 ** 6}
+GUARDED = {'timeout': 0.2, 'retries': 2, 'threshold': 2, 'cooldown': 60.0}
+
+
+def run(label, guard_config, rounds):
+    backend = glorb_sim.SimulatedBackend(monitors=MONITORS, dead=1, dead_latency=DEAD_LATENCY,
+                                         guard=glorb_ddc.DdcGuard(**guard_config))
+    manager = support.quiet_manager(backend)
+    timings = []
+    for round_number in range(rounds):
+        began = time.perf_counter()
+        with support.quiet():
+            results = manager.brightness_all(round_number / rounds)
+        timings.append(time.perf_counter() - began)
+    healthy = sum(result['ok'] for result in results.values())
+    manager.close()
+    print(f"{label:<34}" + ''.join(f"{timing * 1000:>8.0f}ms" for timing in timings) +
+          f"   {healthy}/{MONITORS} written")
+    return timings
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    gates = Gates()
+    with isolated_cache():
+        print(f"{MONITORS} monitors, 1 not answering (hangs {DEAD_LATENCY:g}s per request); brightness_all x{rounds}")
+        before = run('no deadline', UNGUARDED, rounds)
+        after = run(f"deadline {GUARDED['timeout']:g}s + breaker", GUARDED, rounds)
+    gates.check("no round waits for the dead monitor", all(timing < DEAD_LATENCY / 2 for timing in after))
+    gates.check("3x faster than without a deadline", sum(after) < sum(before) / 3)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
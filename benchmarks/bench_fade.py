@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Write count and timing accuracy of brightness fades against a simulated slow DDC/CI bus
+
+Fails when a fade ends later than one write slot after its duration.
+
+Final values, rate limiting and retargeting are checked by
+tests/test_fade.py.
+
+Usage: python benchmarks/bench_fade.py
+"""
+
+import sys
+import time
+
+from benchlib import Gates
+
+import glorb_fade
+from tests import support
+
+# Seconds of scheduling noise allowed on top of a fade's duration and its writes
+TIMING_SLACK = 0.02
+
+
+def run_fade(latency, start, target, duration, min_interval=glorb_fade.DEFAULT_MIN_INTERVAL):
+    bus = support.SlowBus(latency)
+    fader = glorb_fade.FadeScheduler(bus.write, start, min_interval)
+    began = time.perf_counter()
+    fader.fade_to(target, duration)
+    fader.wait()
+    elapsed = time.perf_counter() - began
+    fader.close()
+    return bus, elapsed
+
+
+def run_superseded(latency, targets, duration):
+    """Retarget a fade many times in quick succession; only the last target should matter"""
+    bus = support.SlowBus(latency)
+    fader = glorb_fade.FadeScheduler(bus.write, 50)
+    began = time.perf_counter()
+    for target in targets:
+        fader.fade_to(target, duration)
+        time.sleep(0.01)
+    fader.wait()
+    elapsed = time.perf_counter() - began
+    fader.close()
+    return bus, elapsed
+
+
+def main():
+    gates = Gates()
+    errors = []
+    print(f"{'scenario':<34}{'writes':>8}{'final':>7}{'elapsed':>10}{'error':>9}")
+    for latency in (0.005, 0.03, 0.08, 0.25):
+        duration = 0.5
+        bus, elapsed = run_fade(latency, 100, 20, duration)
+        # The last write cannot finish before the fade ends plus one write
+        error = elapsed - duration - latency
+        label = f"fade 100->20 in 500ms @ {latency * 1000:.0f}ms/write"
+        print(f"{label:<34}{len(bus.values):>8}{bus.values[-1]:>7}{elapsed * 1000:>8.0f}ms{error * 1000:>7.0f}ms")
+        errors.append((latency, error))
+
+    bus, elapsed = run_superseded(0.08, [90, 10, 70, 30, 60], 0.3)
+    label = "5 retargets, last 60 in 300ms"
+    print(f"{label:<34}{len(bus.values):>8}{bus.values[-1]:>7}{elapsed * 1000:>8.0f}ms")
+    for latency, error in errors:
+        # At worst the final value waits for one write slot already taken by a step
+        budget = max(latency, glorb_fade.DEFAULT_MIN_INTERVAL) + TIMING_SLACK
+        gates.check(f"fade @ {latency * 1000:.0f}ms/write ends on time", error <= budget,
+                    f"{error * 1000:.0f}ms late (budget {budget * 1000:.0f}ms)")
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
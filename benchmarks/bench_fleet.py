@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Fleet agent and controller on loopback, against simulated monitors
+
+Starts several agents in this process, each with its own simulated
+backend, and drives them with one FleetClient. Times fan-out against the
+hosts' total time, and a pipelined batch on a pooled connection against a
+connection per command. Pooling, ordering, failures and retries are
+checked by tests/test_fleet.py.
+
+Usage: python benchmarks/bench_fleet.py [agents]
+"""
+
+import sys
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_fleet
+import glorb_sim
+from tests import support
+
+KEY = b'bench-fleet-key'
+# Seconds each simulated brightness write takes
+DDC_LATENCY = 0.02
+BATCH = 20
+
+
+def start_agent(address=('127.0.0.1', 0)):
+    backend = glorb_sim.SimulatedBackend(monitors=2, enum_latency=0, ddc_latency=DDC_LATENCY, panel_latency=0)
+    return glorb_fleet.Agent(support.quiet_manager(backend), KEY, address).start()
+
+
+def host(agent):
+    return f"{agent.address[0]}:{agent.address[1]}"
+
+
+def main():
+    count = max(2, int(sys.argv[1])) if len(sys.argv) > 1 else 8
+    gates = Gates()
+    with isolated_cache():
+        agents = [start_agent() for _ in range(count)]
+        hosts = [host(agent) for agent in agents]
+        client = glorb_fleet.FleetClient(KEY, timeout=5)
+
+        began = time.perf_counter()
+        first = client.fan_out(hosts, [('brightness_all', (0.4,))])
+        fan_out = time.perf_counter() - began
+        serial = sum(result['elapsed'] for result in first.values())
+        print(f"fan-out to {count} agents {fan_out * 1000:7.1f}ms (hosts took {serial * 1000:.1f}ms in total)")
+        gates.check("hosts ran concurrently", fan_out < serial / 2)
+
+        calls = [('brightness', (0, level / 100)) for level in range(BATCH)]
+        began = time.perf_counter()
+        client.pipeline(hosts[0], calls)
+        pipelined = time.perf_counter() - began
+        began = time.perf_counter()
+        for call in calls:
+            with glorb_fleet.FleetClient(KEY, timeout=5) as fresh:
+                fresh.pipeline(hosts[0], [call])
+        unpooled = time.perf_counter() - began
+        print(f"{BATCH} commands: pipelined on a pooled connection {pipelined * 1000:7.1f}ms, "
+              f"a connection each {unpooled * 1000:7.1f}ms")
+        gates.check("pipelining beats a connection per command", pipelined < unpooled)
+
+        client.close()
+        for agent in agents:
+            agent.stop()
+            agent.manager.close()
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Gamma ramp tables and their cache, without a display
+
+Times building a ramp against fetching it from the LRU cache, and times a
+fade of a simulated monitor without DDC/CI, reporting how many ramps it
+loaded and built. Ramp shapes are checked by tests/test_gamma.py.
+
+Usage: python benchmarks/bench_gamma.py [fade_ms]
+"""
+
+import sys
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_gamma
+import glorb_sim
+from tests import support
+
+# Temperatures timed; together with every brightness level they fit in the cache
+KELVINS = range(2000, 6500, 500)
+
+
+def time_builds():
+    glorb_gamma.clear_cache()
+    levels = [(percent, kelvin) for kelvin in KELVINS for percent in range(101)]
+    began = time.perf_counter()
+    for percent, kelvin in levels:
+        glorb_gamma.ramp(percent, kelvin)
+    cold = (time.perf_counter() - began) / len(levels)
+    began = time.perf_counter()
+    for percent, kelvin in levels:
+        glorb_gamma.ramp(percent, kelvin)
+    warm = (time.perf_counter() - began) / len(levels)
+    info = glorb_gamma.cache_info()
+    print(f"build a ramp {cold * 1e6:>8.1f}us   cached {warm * 1e6:>6.1f}us   cache {info.currsize}/{info.maxsize}")
+    return cold, warm
+
+
+def fade(duration):
+    backend = glorb_sim.SimulatedBackend(monitors=3, no_ddc=2)
+    manager = support.quiet_manager(backend)
+    with support.quiet():
+        manager.color_temperature(1, 3400)
+        glorb_gamma.clear_cache()
+        manager.fade_brightness(1, 0.2, duration)
+        before = glorb_gamma.cache_info()
+        began = time.perf_counter()
+        manager.fade_brightness(1, 0.9, duration)
+        elapsed = time.perf_counter() - began
+        after = glorb_gamma.cache_info()
+    manager.close()
+    print(f"fade over {duration * 1000:.0f}ms on a monitor without DDC/CI: took {elapsed * 1000:.0f}ms, "
+          f"{backend.calls['gamma']} ramps loaded, {after.misses - before.misses} built after the first fade")
+    return elapsed
+
+
+def main():
+    duration = int(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.3
+    gates = Gates()
+    cold, warm = time_builds()
+    gates.check("a cached ramp is 10x faster than building one", warm < cold / 10)
+    with isolated_cache():
+        elapsed = fade(duration)
+    gates.check("a software fade finishes on time", elapsed < duration + 0.1, f"{elapsed * 1000:.0f}ms")
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
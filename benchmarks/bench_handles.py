@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Bulk brightness on the win32 backend against a fake dxva2 that is slow to hand out handles
+
+Physical monitor handles are pooled, so only the first write to each
+monitor pays for GetPhysicalMonitorsFromHMONITOR. That handles are reused
+and destroyed exactly once is checked by tests/test_win32_handles.py.
+
+Usage: python benchmarks/bench_handles.py [writes]
+"""
+
+import sys
+import time
+
+import pytest
+
+from benchlib import Gates, isolated_cache
+
+from tests import support
+
+ACQUIRE_LATENCY = 0.005
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    gates = Gates()
+    fake = support.FakeDxva2(ACQUIRE_LATENCY)
+    with pytest.MonkeyPatch.context() as patch, isolated_cache():
+        glorb_win32 = support.import_win32_backend(patch)
+        fake.install(patch, glorb_win32, [support.win32_display(0, 11), support.win32_display(1, 12),
+                                          support.win32_display(2, 13)])
+        manager = support.quiet_manager(glorb_win32.Win32Backend())
+        with manager, support.quiet():
+            began = time.perf_counter()
+            manager.brightness_all(0.0)
+            first = time.perf_counter() - began
+            began = time.perf_counter()
+            for write in range(1, writes):
+                manager.brightness_all(write / writes)
+            later = (time.perf_counter() - began) / max(1, writes - 1)
+    print(f"{writes} bulk writes on 3 monitors: first {first * 1000:.1f}ms, then {later * 1000:.1f}ms each; "
+          f"{fake.opened} handles opened")
+    gates.check("later writes never wait for a handle", later < ACQUIRE_LATENCY)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
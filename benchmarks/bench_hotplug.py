@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Hotplug reaction time and idle CPU of the Linux display watcher on a fake /sys/class/drm tree
+
+Which displays each event adds or removes is checked by
+tests/test_hotplug.py.
+
+Usage: python benchmarks/bench_hotplug.py
+"""
+
+import sys
+import tempfile
+import threading
+import time
+
+from benchlib import Gates
+
+import glorb
+from tests import support
+
+
+def main():
+    gates = Gates()
+    with tempfile.TemporaryDirectory() as root:
+        support.set_drm_status(root, 'card0-eDP-1', 'connected')
+        support.set_drm_status(root, 'card0-HDMI-A-1', 'disconnected')
+        manager = glorb.MonitorManager(backend=support.FakeDrmBackend(root))
+        changed = threading.Event()
+        manager.subscribe(lambda added, removed, changed_displays: changed.set())
+        manager.watch()
+        time.sleep(0.2)
+
+        cpu = time.process_time()
+        time.sleep(2.0)
+        idle_cpu = time.process_time() - cpu
+        gates.check("idle watcher uses no CPU", idle_cpu < 0.01, f"{idle_cpu * 1000:.1f}ms over 2s")
+
+        for connector, status in (('card0-HDMI-A-1', 'connected'), ('card0-HDMI-A-1', 'disconnected'),
+                                  ('card0-DP-2', 'connected')):
+            changed.clear()
+            began = time.perf_counter()
+            support.set_drm_status(root, connector, status)
+            reacted = changed.wait(2.0)
+            elapsed = time.perf_counter() - began
+            gates.check(f"{connector} {status} noticed within 1s", reacted and elapsed < 1.0,
+                        f"{elapsed * 1000:.0f}ms")
+        print(f"enumerations: {manager.backend.enumerations}")
+        manager.close()
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""A day of glorb schedule on a fake clock, against simulated monitors
+
+Follows a day/night curve on every monitor (one monitor with its own
+curve) and counts wakeups, idle wakeups, display enumerations and
+brightness writes, next to a cron job running `glorb b` every five
+minutes. That monitors track the curve and that a suspend is caught up
+on resume is checked by tests/test_schedule.py.
+
+Usage: python benchmarks/bench_schedule.py [monitors]
+"""
+
+import os
+import sys
+
+from benchlib import Gates, isolated_cache
+
+import glorb_schedule
+from tests import support
+
+CRON_INTERVAL = 300
+
+
+def main():
+    monitors = max(2, int(sys.argv[1])) if len(sys.argv) > 1 else 4
+    gates = Gates()
+    with isolated_cache():
+        os.environ.pop('GLORB_SCHEDULE', None)
+        # Exact tracking: every whole-percent change written when it happens
+        scheduler, backend, _, _ = support.follow_schedule(monitors, min_interval=0, coalesce=0)
+        exact = dict(scheduler.stats, enumerations=backend.calls['enumerate'])
+        # Defaults: steep ramps coarsened to one write a minute, nearby changes sharing a wakeup
+        scheduler, backend, _, _ = support.follow_schedule(monitors)
+        stats = scheduler.stats
+
+    cron_runs = glorb_schedule.DAY // CRON_INTERVAL
+    print(f"{monitors} monitors over one day:")
+    print(f"  {'':<34}{'wakeups':>9}{'idle':>7}{'writes':>9}{'enumerations':>14}")
+    print(f"  {'exact tracking':<34}{exact['wakeups']:>9}{exact['idle_wakeups']:>7}{exact['writes']:>9}"
+          f"{exact['enumerations']:>14}")
+    print(f"  {'default (min_interval 60s)':<34}{stats['wakeups']:>9}{stats['idle_wakeups']:>7}"
+          f"{stats['writes']:>9}{backend.calls['enumerate']:>14}")
+    print(f"  {'cron glorb b every 5 minutes':<34}{cron_runs:>9}{'':>7}{cron_runs * monitors:>9}{cron_runs:>14}")
+    print(f"  (DDC/CI and panel writes counted by the simulator: {backend.calls['ddc'] + backend.calls['panel']})")
+    gates.check("fewer wakeups than the cron job", stats['wakeups'] < cron_runs)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""CLI startup cost: import time of glorb, what `glorb --help` loads and a real command
+
+Runs fresh interpreters the way the installed `glorb` entry point does
+(`import glorb; glorb.main()`), next to a bare interpreter as the baseline.
+Budgets are multiples of that baseline, so they scale with the machine;
+the run fails when:
+- the median cumulative import time of glorb (from `python -X importtime`)
+  exceeds the import budget;
+- `glorb --help` or an argument error takes longer than the startup budget;
+- `glorb --no-daemon --backend sim identify` takes longer than the command
+  budget;
+- `glorb --help` loads a platform backend, pywin32, WMI or another module
+  only some commands need.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--import-budget X] [--startup-budget X] [--command-budget X]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchlib import ROOT, Gates, isolated_cache
+
+# Budgets, as multiples of the bare interpreter's wall time
+IMPORT_BUDGET = 1.5
+STARTUP_BUDGET = 3.5
+COMMAND_BUDGET = 4.5
+# Simulated monitors that answer at once, so the command times glorb rather than the simulator
+SIM_CONFIG = 'enum_latency=0,ddc_latency=0,panel_latency=0'
+# Modules glorb --help must not load: backends, Windows bindings and what only some commands use
+LAZY_MODULES = ('glorb_win32', 'glorb_wmi', 'glorb_sysfs', 'glorb_xrandr', 'glorb_sim', 'glorb_hotplug',
+                'glorb_daemon', 'glorb_fleet', 'glorb_fade', 'glorb_gamma', 'glorb_profiles', 'glorb_schedule',
+                'glorb_trace', 'glorb_vcp', 'glorb_watch', 'win32api', 'win32con', 'win32gui', 'wmi', 'pythoncom',
+                'ctypes', 'json', 'socket', 'subprocess', 'shutil', 'concurrent.futures', 'multiprocessing',
+                'tempfile', 'hashlib')
+
+
+def run(code, *options):
+    # Installed modules have bytecode, so let the interpreter write it
+    env = {name: value for name, value in os.environ.items() if name != 'PYTHONDONTWRITEBYTECODE'}
+    return subprocess.run([sys.executable, *options, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def cli(argv):
+    return f"import sys, glorb; sys.argv[0] = 'glorb'; glorb.main({argv!r})"
+
+
+def import_times(runs):
+    """Cumulative import time of glorb in ms, one sample per fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        for line in run('import glorb', '-X', 'importtime').stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'glorb':
+                samples.append(int(fields[1]) / 1000)
+    return samples
+
+
+def wall_times(codes, runs):
+    """Median wall time in ms of each piece of code, sampled in turn so that drift hits them all alike"""
+    samples = {code: [] for code in codes}
+    for _ in range(runs):
+        for code in codes:
+            began = time.perf_counter()
+            run(code)
+            samples[code].append((time.perf_counter() - began) * 1000)
+    return {code: statistics.median(times) for code, times in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET, metavar='X')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET, metavar='X')
+    parser.add_argument('--command-budget', type=float, default=COMMAND_BUDGET, metavar='X')
+    args = parser.parse_args()
+    gates = Gates()
+
+    help_code, error_code = cli(['--help']), cli(['b', 'x', 'y'])
+    identify_code = cli(['--no-daemon', '--backend', 'sim', 'identify'])
+    with isolated_cache():
+        os.environ['GLORB_SIM'] = SIM_CONFIG
+        try:
+            # Write bytecode first so no run pays for compiling; identify also caches the topology,
+            # as any earlier glorb call would have
+            run(identify_code)
+            walls = wall_times(['pass', help_code, error_code, identify_code], args.runs)
+        finally:
+            os.environ.pop('GLORB_SIM', None)
+    baseline = walls['pass']
+    print(f"{'bare interpreter (baseline)':<58}{baseline:8.1f} ms")
+
+    def check(label, value, budget):
+        return gates.check(label, value <= baseline * budget,
+                           f"{value:.1f} ms = {value / baseline:.2f}x baseline (budget {budget:g}x)")
+
+    check("import glorb (median of -X importtime)", statistics.median(import_times(args.runs)), args.import_budget)
+    check("glorb --help", walls[help_code], args.startup_budget)
+    check("glorb with a bad argument", walls[error_code], args.startup_budget)
+    check("glorb --no-daemon --backend sim identify", walls[identify_code], args.command_budget)
+
+    loaded = run(f"import contextlib, io, sys\nwith contextlib.suppress(SystemExit), "
+                 f"contextlib.redirect_stdout(io.StringIO()):\n    {cli(['--help'])}\n"
+                 f"print(' '.join(sorted(sys.modules)))").stdout.split()
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    gates.check("glorb --help loads no module only some commands need", not eager,
+                f"loaded: {', '.join(eager)}" if eager else '')
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Enumeration and control latency of MonitorManager on the simulated backend, saved as JSON
+
+Usage: python benchmarks/bench_suite.py [--monitors 1,4,16,64] [--output results.json]
+                                        [--compare baseline.json] [--threshold 1.2] [--min-delta 1.0]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import glorb
+import glorb_cache
+import glorb_sim
+
+
+def timed(action, repeat):
+    """Run action repeat times with stdout discarded; returns timings in ms"""
+    samples = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            began = time.perf_counter()
+            action()
+            samples.append((time.perf_counter() - began) * 1000)
+    return {'median_ms': round(statistics.median(samples), 3), 'min_ms': round(min(samples), 3),
+            'max_ms': round(max(samples), 3)}
+
+
+def run_scenarios(monitors, config, repeat):
+    def backend():
+        return glorb_sim.SimulatedBackend(monitors=monitors, **config)
+
+    def cold_start():
+        glorb_cache.clear('sim-topology')
+        glorb.MonitorManager(backend=backend()).close()
+
+    def warm_start():
+        glorb.MonitorManager(backend=backend()).close()
+
+    results = {'cold_start': timed(cold_start, repeat)}
+    glorb.MonitorManager(backend=backend()).close()
+    results['warm_start'] = timed(warm_start, repeat)
+
+    manager = glorb.MonitorManager(backend=backend())
+    last = monitors - 1
+    angles = iter([90, 0] * repeat)
+    all_angles = iter([90, 0] * repeat)
+    results['identify'] = timed(manager.identify, repeat)
+    results['brightness_single'] = timed(lambda: manager.brightness(last, 0.5), repeat)
+    results['brightness_bulk'] = timed(lambda: manager.brightness_all(0.4), repeat)
+    results['rotate'] = timed(lambda: manager.rotate(last, next(angles)), repeat)
+
+    def rotate_all():
+        angle = next(all_angles)
+        manager.apply([(display['id'], 'rotate', angle) for display in manager.displays])
+
+    results['rotate_all'] = timed(rotate_all, repeat)
+    results['calls'] = dict(manager.backend.calls)
+    manager.close()
+    return results
+
+
+def compare(current, baseline, threshold, min_delta):
+    """Print median ratios against a baseline run; returns the number of regressions
+
+    Slowdowns smaller than min_delta ms are timer noise, whatever their ratio.
+    """
+    regressions = 0
+    print(f"\n{'scenario':<32}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for monitors, scenarios in current['results'].items():
+        for name, timing in scenarios.items():
+            before = baseline.get('results', {}).get(monitors, {}).get(name)
+            if name == 'calls' or not before:
+                continue
+            ratio = timing['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            slower = ratio > threshold and timing['median_ms'] - before['median_ms'] > min_delta
+            flag = ' REGRESSION' if slower else ''
+            regressions += bool(flag)
+            print(f"{monitors + ' ' + name:<32}{before['median_ms']:>10.2f}ms{timing['median_ms']:>10.2f}ms"
+                  f"{ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--monitors', default='1,4,16,64', help='Comma-separated monitor counts (1-64)')
+    parser.add_argument('--modes', type=int, default=glorb_sim.DEFAULTS['modes'], help='Modes per monitor')
+    parser.add_argument('--ddc-latency', type=float, default=glorb_sim.DEFAULTS['ddc_latency'])
+    parser.add_argument('--modeset-latency', type=float, default=glorb_sim.DEFAULTS['modeset_latency'])
+    parser.add_argument('--enum-latency', type=float, default=glorb_sim.DEFAULTS['enum_latency'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--label', default='', help='Name stored with the results, e.g. a version')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Median ratio counted as a regression')
+    parser.add_argument('--min-delta', type=float, default=1.0, help='Ignore slowdowns smaller than this many ms')
+    args = parser.parse_args()
+
+    config = {'modes': args.modes, 'ddc_latency': args.ddc_latency, 'modeset_latency': args.modeset_latency,
+              'enum_latency': args.enum_latency}
+    report = {
+        'label': args.label,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': dict(config, repeat=args.repeat),
+        'results': {},
+    }
+
+    # Keep the simulator's topology cache away from the user's real one
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ['GLORB_CACHE_DIR'] = cache
+        for monitors in (int(count) for count in args.monitors.split(',')):
+            results = run_scenarios(monitors, config, args.repeat)
+            report['results'][f"monitors={monitors}"] = results
+            summary = '  '.join(f"{name} {timing['median_ms']:.1f}ms" for name, timing in results.items()
+                                if name != 'calls')
+            print(f"{monitors:>2} monitors: {summary}")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(report, baseline, args.threshold, args.min_delta)
+        print(f"\n{regressions} regression(s) above {args.threshold:.2f}x")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
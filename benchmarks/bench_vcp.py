@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""`glorb vcp` latency with a cold and a warm capabilities cache
+
+Runs `glorb vcp` commands on the simulated backend twice: once with an
+empty cache, where every monitor's capabilities string is requested
+(caps_latency each), and once warm, where none should be. Parsing is
+checked by tests/test_vcp.py.
+
+Usage: python benchmarks/bench_vcp.py [monitors]
+"""
+
+import sys
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_sim
+from tests import support
+
+CAPS_LATENCY = 0.5
+
+
+def run(label, monitors):
+    backend = glorb_sim.SimulatedBackend(monitors=monitors, caps_latency=CAPS_LATENCY)
+    manager = support.quiet_manager(backend)
+    with support.quiet():
+        began = time.perf_counter()
+        for monitor_id in range(1, monitors):
+            manager.vcp_set(monitor_id, 'input', 'hdmi1')
+        for monitor_id in range(1, monitors):
+            manager.vcp_get(monitor_id, 'contrast')
+        elapsed = time.perf_counter() - began
+    manager.close()
+    print(f"{label:<10}{elapsed * 1000:>8.0f}ms   {backend.calls['capabilities']} capabilities requests")
+    return elapsed
+
+
+def main():
+    monitors = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    gates = Gates()
+    with isolated_cache():
+        print(f"{monitors - 1} external monitors, capabilities string takes {CAPS_LATENCY:g}s")
+        run('cold', monitors)
+        warm = run('warm', monitors)
+    gates.check("warm cache never waits for a capabilities string", warm < CAPS_LATENCY)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Cost of glorb watch while idle, and how quickly it reports changes
+
+Runs the adaptive poller against the simulated backend on a fake clock
+for an hour of mostly idle time, with a rotation and two brightness
+changes made behind its back, and prints what it cost next to scraping
+`identify` every topology interval. A short run on the real clock
+measures the CPU an idle watch uses. That every change is reported
+within its polling interval is checked by tests/test_watch.py.
+
+Usage: python benchmarks/bench_watch.py [monitors]
+"""
+
+import contextlib
+import sys
+import threading
+import time
+
+from benchlib import Gates, isolated_cache
+
+import glorb_sim
+import glorb_watch
+from tests import support
+
+REAL_SECONDS = 2.0
+
+
+def idle_cpu(monitors):
+    """CPU seconds per second used by a real-clock watch that sees no changes"""
+    manager = support.quiet_manager(glorb_sim.SimulatedBackend(monitors=monitors))
+    stop = threading.Event()
+
+    def sleep(seconds):
+        if stop.wait(seconds):
+            raise support.Stopped
+
+    poller = glorb_watch.DisplayPoller(manager, sleep=sleep, topology=0.1)
+    events = poller.events()
+    for _ in range(monitors):
+        next(events)
+
+    def run():
+        with contextlib.suppress(support.Stopped):
+            for _ in events:
+                pass
+
+    thread = threading.Thread(target=run)
+    began_cpu = time.process_time()
+    thread.start()
+    time.sleep(REAL_SECONDS)
+    stop.set()
+    thread.join()
+    cpu = time.process_time() - began_cpu
+    manager.close()
+    print(f"idle watch checking the layout every 0.1s: {cpu * 1000:.0f}ms CPU over {REAL_SECONDS:g}s, "
+          f"{poller.stats['topology_checks']} checks")
+    return cpu / REAL_SECONDS
+
+
+def main():
+    monitors = max(3, int(sys.argv[1])) if len(sys.argv) > 1 else 4
+    gates = Gates()
+    with isolated_cache():
+        delays, counts, config = support.watch_fake_hour(monitors)
+        scraped = support.scraping_hour(monitors, config['topology'])
+        print(f"{monitors} monitors, one hour on a fake clock:")
+        for (_, label, _), delay in zip(support.WATCH_CHANGES, delays):
+            print(f"  {label:<40}" + (f"reported after {delay:5.2f}s" if delay is not None else "never reported"))
+        print("  " + ', '.join(f"{key} {value}" for key, value in counts.items()))
+        print(f"scraping identify --json every {config['topology']:g}s: "
+              + ', '.join(f"{key} {value}" for key, value in scraped.items()))
+        cpu = idle_cpu(monitors)
+    gates.check("idle watch uses under 5% of a CPU", cpu < 0.05, f"{cpu:.1%}")
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
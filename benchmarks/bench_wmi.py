@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Panel brightness latency: per-call WMI connection plus PowerShell fallback vs glorb_wmi.WmiPanels
+
+A stub wmi module (tests/support.py) stands in for the real one with
+configurable latencies, so this runs anywhere. The legacy path is the
+set_panel_brightness code glorb used before WmiPanels, with PowerShell
+replaced by a sleep. Which monitors get WMI writes, and the detection kept
+on disk, are checked by tests/test_wmi.py.
+
+Usage: python benchmarks/bench_wmi.py [calls]
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from benchlib import Gates, isolated_cache
+
+import glorb_wmi
+from tests import support
+
+CONNECT_LATENCY = 0.08
+QUERY_LATENCY = 0.02
+SET_LATENCY = 0.01
+POWERSHELL_LATENCY = 0.4
+
+
+def stub_wmi(has_panel):
+    return support.StubWmi(has_panel, connect_latency=CONNECT_LATENCY, query_latency=QUERY_LATENCY,
+                           set_latency=SET_LATENCY)
+
+
+def legacy_set_panel_brightness(stub, percent):
+    """The pre-WmiPanels code path: new connection per call, PowerShell on any failure"""
+    try:
+        wmi = stub.module()
+        c = wmi.WMI(namespace='wmi')
+        brightness_methods = c.WmiMonitorBrightnessMethods()[0]
+        brightness_methods.WmiSetBrightness(percent, 0)
+        return True
+    except Exception:
+        stub.calls['powershell'] += 1
+        time.sleep(POWERSHELL_LATENCY)
+        return stub.has_panel
+
+
+def run(label, has_panel, display, calls, legacy):
+    stub = stub_wmi(has_panel)
+    with pytest.MonkeyPatch.context() as patch:
+        stub.install(patch)
+        panels = glorb_wmi.WmiPanels()
+        panels.load([support.WMI_PANEL, support.WMI_EXTERNAL] if has_panel else [support.WMI_EXTERNAL])
+        began = time.perf_counter()
+        for percent in range(calls):
+            if legacy:
+                legacy_set_panel_brightness(stub, percent)
+            else:
+                panels.set_brightness(display, percent)
+        elapsed = time.perf_counter() - began
+        panels.close()
+    wmi_calls = ' '.join(f"{name}={count}" for name, count in stub.calls.items())
+    print(f"{label:<44}{elapsed * 1000:>9.0f}ms{elapsed / calls * 1000:>9.1f}ms  {wmi_calls}")
+    return elapsed
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    gates = Gates()
+    print(f"{'scenario (' + str(calls) + ' writes)':<44}{'total':>11}{'per call':>11}")
+    with isolated_cache() as cache:
+        # Each scenario is a different machine, with its own cache directory
+        for title, has_panel, display in (('laptop panel', True, support.WMI_PANEL),
+                                          ('external monitor on a laptop', True, support.WMI_EXTERNAL),
+                                          ('desktop without WMI brightness', False, support.WMI_EXTERNAL)):
+            os.environ['GLORB_CACHE_DIR'] = os.path.join(cache, title)
+            before = run(f"{title}, legacy", has_panel, display, calls, legacy=True)
+            after = run(f"{title}, WmiPanels", has_panel, display, calls, legacy=False)
+            gates.check(f"{title}: WmiPanels is faster", after < before)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
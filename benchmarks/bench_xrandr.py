@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""xrandr parsing speed on large multi-head output
+
+Parsing a recorded query and batching commits into one xrandr run are
+checked by tests/test_xrandr.py.
+
+Usage: python benchmarks/bench_xrandr.py [heads]
+"""
+
+import sys
+import time
+
+from benchlib import Gates
+
+import glorb_xrandr
+
+# A query is parsed on every enumeration; even a wall of monitors should not show
+PARSE_BUDGET = 0.05
+
+
+def multihead_output(heads, modes_per_head=40):
+    """Synthetic xrandr output for a large multi-head setup"""
+    lines = [f"Screen 0: minimum 8 x 8, current {1920 * heads} x 1080, maximum 32767 x 32767"]
+    for head in range(heads):
+        lines.append(f"DP-{head} connected {1920}x1080+{1920 * head}+0 (normal left inverted right x axis y axis) 527mm x 296mm")
+        for mode in range(modes_per_head):
+            width = 3840 - mode * 64
+            lines.append(f"   {width}x{width * 9 // 16}     60.00{'*+' if mode == 0 else '  '}  59.94    50.00    144.00")
+    return '\n'.join(lines) + '\n'
+
+
+def bench_parse(heads, rounds=20):
+    text = multihead_output(heads)
+    began = time.perf_counter()
+    for _ in range(rounds):
+        displays, modes = glorb_xrandr.parse_query(text)
+    elapsed = (time.perf_counter() - began) / rounds
+    lines = text.count('\n')
+    print(f"parse {heads} heads / {lines} lines: {elapsed * 1000:.2f}ms ({lines / elapsed / 1e6:.2f}M lines/s)")
+    return elapsed, len(displays)
+
+
+def main():
+    heads = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    gates = Gates()
+    bench_parse(4)
+    elapsed, found = bench_parse(heads)
+    gates.check(f"{heads} heads parsed within {PARSE_BUDGET * 1000:.0f}ms", found == heads and elapsed < PARSE_BUDGET)
+    return gates.finish()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
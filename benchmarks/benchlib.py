@@ -0,0 +1,49 @@
+"""Helpers shared by the benchmark scripts
+
+Benchmarks time things and fail when a timing budget is missed; whether
+glorb behaves correctly is checked by the tests in tests/, whose fakes
+(tests/support.py) the benchmarks reuse.
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@contextlib.contextmanager
+def isolated_cache():
+    """Keep caches written by a benchmark away from the user's real ones"""
+    previous = os.environ.get('GLORB_CACHE_DIR')
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ['GLORB_CACHE_DIR'] = cache
+        try:
+            yield cache
+        finally:
+            if previous is None:
+                os.environ.pop('GLORB_CACHE_DIR', None)
+            else:
+                os.environ['GLORB_CACHE_DIR'] = previous
+
+
+class Gates:
+    """Timing budgets of one benchmark run"""
+
+    def __init__(self):
+        self.results = []
+
+    def check(self, label, ok, detail=''):
+        """Record and print whether a budget was met; returns ok"""
+        self.results.append(bool(ok))
+        print(f"{label:<58}{'ok' if ok else 'FAILED':>8}   {detail}".rstrip())
+        return ok
+
+    def finish(self):
+        """Print the verdict; returns the process exit status"""
+        ok = all(self.results)
+        print("OK" if ok else "FAILED")
+        return 0 if ok else 1
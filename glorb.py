@@ -1,123 +1,216 @@
 #!/usr/bin/env python3
 """Glorb - CLI Monitor Management Tool"""
 
+import os
 import sys
+import time
 import argparse
-import win32api
-import win32con
-from ctypes import windll, wintypes, byref, Structure
-from ctypes.wintypes import DWORD, HANDLE
-try:
-    import wmi
-except ImportError:
-    pass
-
-class PHYSICAL_MONITOR(Structure):
-    _fields_ = [('hPhysicalMonitor', HANDLE), ('szPhysicalMonitorDescription', wintypes.WCHAR * 128)]
+import contextlib
+import threading
+
+# Modules only some commands need are imported where they are used, so `glorb --help` and
+# commands forwarded to the daemon do not pay for them
+import glorb_backend
+import glorb_config
+from glorb_modes import format_mode
+from glorb_topology import Topology
+
+# Upper bound on concurrent DDC/CI transactions in bulk brightness calls
+MAX_DDC_WORKERS = 8
+
+def _trace():
+    """glorb_trace while --profile is recording, else None; glorb itself imports it only for --profile"""
+    trace = sys.modules.get('glorb_trace')
+    return trace if trace is not None and trace.enabled() else None
 
 class MonitorManager:
-    def __init__(self):
-        self.displays = self._detect_displays()
-        self.physical_monitors = self._get_physical_monitors()
+    def __init__(self, use_cache=True, backend=None):
+        if backend is None or isinstance(backend, str):
+            backend = glorb_backend.get_backend(backend)
+        trace = _trace()
+        if trace is not None:
+            trace.instrument(backend)
+        self.backend = backend
+        self.displays = Topology(self.backend.load_displays(use_cache))
+        self._lock = threading.Lock()
+        self._monitor_locks = {}
+        self._faders = {}
+        self._mode_catalogs = {}
+        self._vcp_capabilities = {}
+        # monitor_id -> (percent, kelvin) of the gamma ramp glorb last loaded
+        self._gamma = {}
+        self._gamma_changed = False
+        self._load_gamma()
+        self._subscribers = []
+        self._watcher = None
+        self._fingerprint = None
+    
+    def _find_display(self, monitor_id):
+        return self.displays.find(monitor_id)
     
-    def _detect_displays(self):
-        displays = []
-        device_index = 0
+    def _monitor_lock(self, monitor_id):
+        """Lock serializing backend traffic to one monitor"""
+        with self._lock:
+            # Reentrant: a fade step holds it across its stale check and the write that locks it again
+            return self._monitor_locks.setdefault(monitor_id, threading.RLock())
+    
+    def refresh(self):
+        """Re-detect displays and drop per-display caches"""
+        self.displays = Topology(self.backend.load_displays(use_cache=False))
+        self._mode_catalogs = {}
+        self._vcp_capabilities = {}
+        return True
+    
+    def update_topology(self):
+        """Re-enumerate after a display change, replacing only the entries that differ"""
+        import glorb_hotplug
+        displays = Topology(self.backend.rescan(self.displays))
+        added, removed, changed = glorb_hotplug.diff_displays(self.displays, displays)
+        if not (added or removed or changed):
+            return False
         
-        while True:
-            try:
-                device = win32api.EnumDisplayDevices(None, device_index)
-                if not device.DeviceName:
-                    break
-                
-                if device.StateFlags & 0x00000001:  # DISPLAY_DEVICE_ACTIVE
-                    settings = win32api.EnumDisplaySettings(device.DeviceName, win32con.ENUM_CURRENT_SETTINGS)
-                    displays.append({
-                        'id': device_index,
-                        'name': device.DeviceName,
-                        'description': device.DeviceString,
-                        'width': settings.PelsWidth,
-                        'height': settings.PelsHeight,
-                        'primary': device.StateFlags & 0x00000004 != 0  # DISPLAY_DEVICE_PRIMARY_DEVICE
-                    })
-                device_index += 1
-            except:
-                break
-        
-        return displays
-    
-    def _get_physical_monitors(self):
-        """Get physical monitor handles for brightness control"""
-        physical_monitors = {}
-        try:
-            import win32gui
-            from ctypes import POINTER, c_void_p, WINFUNCTYPE
-            from ctypes.wintypes import RECT, HDC, BOOL
-            
-            MONITORENUMPROC = WINFUNCTYPE(BOOL, HANDLE, HDC, POINTER(RECT), c_void_p)
-            
-            def enum_callback(hmonitor, hdc, rect, data):
-                try:
-                    monitor_count = DWORD()
-                    if windll.dxva2.GetNumberOfPhysicalMonitorsFromHMONITOR(hmonitor, byref(monitor_count)):
-                        if monitor_count.value > 0:
-                            physical_monitors_array = (PHYSICAL_MONITOR * monitor_count.value)()
-                            if windll.dxva2.GetPhysicalMonitorsFromHMONITOR(hmonitor, monitor_count.value, physical_monitors_array):
-                                # Map to display ID (simplified)
-                                for i, display in enumerate(self.displays):
-                                    if i < monitor_count.value:
-                                        physical_monitors[display['id']] = physical_monitors_array[i].hPhysicalMonitor
-                except:
-                    pass
-                return True
-            
-            callback_func = MONITORENUMPROC(enum_callback)
-            windll.user32.EnumDisplayMonitors(None, None, callback_func, None)
-        except:
-            pass
+        stale = {display['id'] for display in removed + changed}
+        with self._lock:
+            # Unchanged monitors keep the very same dicts callers may hold on to
+            current = self.displays
+            self.displays = Topology(display if display.id in stale or current.find(display.id) is None
+                                     else current.find(display.id) for display in displays)
+            for display in removed + changed:
+                self._mode_catalogs.pop(display['id'], None)
+                self._vcp_capabilities.pop(display['id'], None)
+            for display in removed:
+                self._gamma.pop(display['id'], None)
+            faders = [self._faders.pop(display['id']) for display in removed if display['id'] in self._faders]
+        for fader in faders:
+            fader.close()
         
-        return physical_monitors
+        for callback in list(self._subscribers):
+            try:
+                callback(added, removed, changed)
+            except Exception as e:
+                print(f"Error in display change callback: {e}")
+        return True
+    
+    def check_topology(self):
+        """update_topology, but only when the backend's cheap layout fingerprint moved"""
+        fingerprint = self.backend.fingerprint()
+        if fingerprint is not None and fingerprint == self._fingerprint:
+            return False
+        changed = self.update_topology()
+        self._fingerprint = fingerprint
+        return changed
+    
+    def subscribe(self, callback):
+        """Call callback(added, removed, changed) with display lists on every topology change"""
+        self._subscribers.append(callback)
+        return callback
+    
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def watch(self, settle=None):
+        """Follow display hotplug in the background, keeping self.displays current"""
+        if self._watcher is None:
+            try:
+                self._watcher = self.backend.watcher(self.update_topology, settle)
+            except NotImplementedError as e:
+                print(f"Error: {e}")
+                return False
+            self._watcher.start()
+        return True
+    
+    def unwatch(self):
+        """Stop following display hotplug"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+    
+    def _load_gamma(self):
+        import glorb_gamma
+        levels = glorb_gamma.load_levels(self.backend.name)
+        self._gamma = {display['id']: levels[display['name']] for display in self.displays
+                       if display['name'] in levels}
+    
+    def _save_gamma(self):
+        """Remember the ramps left loaded, merged with those of outputs no longer connected"""
+        if not self._gamma_changed:
+            return
+        import glorb_gamma
+        levels = glorb_gamma.load_levels(self.backend.name)
+        for display in self.displays:
+            if display['id'] in self._gamma:
+                levels[display['name']] = self._gamma[display['id']]
+        glorb_gamma.store_levels(self.backend.name, levels)
+        self._gamma_changed = False
+    
+    def close(self):
+        """Stop background fades and release backend resources"""
+        self.unwatch()
+        for fader in list(self._faders.values()):
+            fader.close()
+        self._faders = {}
+        self._save_gamma()
+        self.backend.close()
     
-    def identify(self):
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def records(self, brightness=True):
+        """State of every display as JSON-ready dicts (the glorb watch record schema)"""
+        import glorb_watch
+        levels = self.get_brightness_many(display['id'] for display in self.displays) if brightness else {}
+        return [glorb_watch.display_record(display, levels.get(display['id'])) for display in self.displays]
+    
+    def poll(self, **config):
+        """Generator of display change events; see glorb_watch.DisplayPoller"""
+        import glorb_watch
+        return glorb_watch.DisplayPoller(self, **config).events()
+    
+    def follow_schedule(self, curves=None, **config):
+        """Generator of scheduled brightness writes; see glorb_schedule.BrightnessScheduler"""
+        import glorb_schedule
+        if curves is None:
+            curves = glorb_schedule.load()
+        return glorb_schedule.BrightnessScheduler(self, curves, **config).updates()
+    
+    def identify(self, as_json=False):
         """List all detected monitors"""
+        if as_json:
+            import json
+            print(json.dumps(self.records()))
+            return
         print("Detected monitors:")
         for display in self.displays:
             primary = " (Primary)" if display['primary'] else ""
-            print(f"  {display['id']}: {display['description']} - {display['width']}x{display['height']}{primary}")
+            size = f" - {display['width']}x{display['height']}" if display.get('width') else ""
+            health = self.backend.health(display)
+            status = f" [{health}]" if health else ""
+            print(f"  {display['id']}: {display['description']}{size}{primary}{status}")
+    
+    def batch(self):
+        """Start a transaction that applies many rotation/mode changes with one mode-set"""
+        return self.backend.transaction(self.displays, on_commit=self.refresh)
     
     def rotate(self, monitor_id, angle):
         """Rotate monitor to specific angle"""
-        if monitor_id >= len(self.displays):
+        if self._find_display(monitor_id) is None:
             print(f"Error: Monitor {monitor_id} not found")
             return False
         
-        display = self.displays[monitor_id]
-        rotation_map = {0: 0, 90: 1, 180: 2, 270: 3}
-        
-        if angle not in rotation_map:
+        if angle not in glorb_backend.ROTATIONS:
             print(f"Error: Invalid angle {angle}. Use 0, 90, 180, or 270")
             return False
         
         try:
-            # Get fresh settings each time
-            settings = win32api.EnumDisplaySettings(display['name'], win32con.ENUM_CURRENT_SETTINGS)
-            current_orientation = settings.DisplayOrientation
-            
-            # Set new orientation
-            settings.DisplayOrientation = rotation_map[angle]
-            
-            # Handle width/height swapping based on orientation change
-            if (current_orientation in [0, 2] and angle in [90, 270]) or \
-               (current_orientation in [1, 3] and angle in [0, 180]):
-                settings.PelsWidth, settings.PelsHeight = settings.PelsHeight, settings.PelsWidth
-            
-            result = win32api.ChangeDisplaySettingsEx(display['name'], settings, 0x00000001)
+            result = self.batch().rotate(monitor_id, angle).commit()[monitor_id]
             
             if result == 0:
                 print(f"Monitor {monitor_id} rotated to {angle}°")
-                # Refresh display info and physical monitors
-                self.displays = self._detect_displays()
-                self.physical_monitors = self._get_physical_monitors()
                 return True
             else:
                 print(f"Failed to rotate monitor {monitor_id} (error code: {result})")
@@ -126,104 +219,912 @@ class MonitorManager:
             print(f"Error rotating monitor: {e}")
             return False
     
+    def mode_catalog(self, monitor_id):
+        """Indexed catalog of a monitor's modes, built once per topology"""
+        catalog = self._mode_catalogs.get(monitor_id)
+        if catalog is None:
+            display = self._find_display(monitor_id)
+            if display is None:
+                return None
+            catalog = self.backend.mode_catalog(display)
+            self._mode_catalogs[monitor_id] = catalog
+        return catalog
+    
+    def get_display_modes(self, monitor_id):
+        """Available modes for a monitor as width/height/frequency/bits_per_pixel dicts"""
+        try:
+            catalog = self.mode_catalog(monitor_id)
+        except NotImplementedError:
+            return []
+        return catalog.modes() if catalog else []
+    
+    def modes(self, monitor_id, min_refresh=None):
+        """List a monitor's resolutions with their refresh rates"""
+        try:
+            catalog = self.mode_catalog(monitor_id)
+        except NotImplementedError as e:
+            print(f"Error: {e}")
+            return False
+        if catalog is None:
+            print(f"Error: Monitor {monitor_id} not found")
+            return False
+        
+        native = catalog.native_mode()
+        print(f"Modes for monitor {monitor_id}" + (f" (native {format_mode(*native)})" if native else "") + ":")
+        for width, height in catalog.resolutions():
+            rates = [rate for rate in catalog.refresh_rates(width, height) if not min_refresh or rate >= min_refresh]
+            if rates:
+                print(f"  {format_mode(width, height)}: {', '.join(f'{rate}Hz' for rate in rates)}")
+        return True
+    
+    def vcp_capabilities(self, monitor_id):
+        """VCP feature table of a monitor, fetched once and then kept on disk; None if it does not answer"""
+        capabilities = self._vcp_capabilities.get(monitor_id)
+        if capabilities is None:
+            display = self._find_display(monitor_id)
+            if display is None:
+                return None
+            with self._monitor_lock(monitor_id):
+                capabilities = self.backend.vcp_capabilities(display)
+            if capabilities is not None:
+                self._vcp_capabilities[monitor_id] = capabilities
+        return capabilities
+    
+    def _vcp_table(self, monitor_id):
+        """vcp_capabilities, printing why it is unavailable"""
+        if self._find_display(monitor_id) is None:
+            print(f"Error: Monitor {monitor_id} not found")
+            return None
+        try:
+            capabilities = self.vcp_capabilities(monitor_id)
+        except NotImplementedError as e:
+            print(f"Error: {e}")
+            return None
+        if capabilities is None:
+            print(f"Error: Monitor {monitor_id} did not report its DDC/CI capabilities")
+        return capabilities
+    
+    def _vcp_feature(self, monitor_id, feature, value=None):
+        """(display, code, value) after checking them against the feature table, or None"""
+        import glorb_vcp
+        try:
+            code = feature if isinstance(feature, int) else glorb_vcp.parse_feature(feature)
+            if value is not None and not isinstance(value, int):
+                value = glorb_vcp.parse_value(code, value)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+        capabilities = self._vcp_table(monitor_id)
+        if capabilities is None:
+            return None
+        if not capabilities.supports(code):
+            print(f"Error: Monitor {monitor_id} does not support {glorb_vcp.feature_label(code)}")
+            return None
+        if value is not None and not capabilities.supports(code, value):
+            allowed = ', '.join(glorb_vcp.value_label(code, allowed) for allowed in capabilities.values(code))
+            print(f"Error: {glorb_vcp.value_label(code, value)} is not a valid {glorb_vcp.feature_label(code)} "
+                  f"for monitor {monitor_id} (allowed: {allowed})")
+            return None
+        return self._find_display(monitor_id), code, value
+    
+    def vcp_list(self, monitor_id):
+        """Print the VCP features a monitor supports"""
+        import glorb_vcp
+        capabilities = self._vcp_table(monitor_id)
+        if capabilities is None:
+            return False
+        model = f" ({capabilities.model})" if capabilities.model else ""
+        print(f"VCP features for monitor {monitor_id}{model}:")
+        for code, values in sorted(capabilities.features.items()):
+            allowed = 'continuous' if values is None else \
+                ', '.join(glorb_vcp.value_label(code, value) for value in values)
+            print(f"  {glorb_vcp.feature_label(code)}: {allowed}")
+        return True
+    
+    def vcp_get(self, monitor_id, feature):
+        """Print and return the current value of a VCP feature"""
+        import glorb_vcp
+        checked = self._vcp_feature(monitor_id, feature)
+        if checked is None:
+            return None
+        display, code, _ = checked
+        with self._monitor_lock(monitor_id):
+            reply = self.backend.get_vcp(display, code)
+        if reply is None:
+            print(f"Failed to read {glorb_vcp.feature_label(code)} from monitor {monitor_id}")
+            return None
+        current, maximum = reply
+        limit = f" (max {maximum})" if self.vcp_capabilities(monitor_id).values(code) is None else ""
+        print(f"Monitor {monitor_id} {glorb_vcp.feature_label(code)}: {glorb_vcp.value_label(code, current)}{limit}")
+        return current
+    
+    def vcp_set(self, monitor_id, feature, value):
+        """Write a VCP feature after checking it against the monitor's feature table"""
+        import glorb_vcp
+        checked = self._vcp_feature(monitor_id, feature, value)
+        if checked is None:
+            return False
+        display, code, value = checked
+        with self._monitor_lock(monitor_id):
+            ok = self.backend.set_vcp(display, code, value)
+        if not ok:
+            print(f"Failed to set {glorb_vcp.feature_label(code)} on monitor {monitor_id}")
+            return False
+        print(f"Monitor {monitor_id} {glorb_vcp.feature_label(code)} set to {glorb_vcp.value_label(code, value)}")
+        return True
+    
+    def _check_mode(self, monitor_id, width, height, frequency, angle=None):
+        """Validate a mode against the catalog, printing why it was rejected
+        
+        angle is a rotation staged together with the mode, if any.
+        """
+        try:
+            catalog = self.mode_catalog(monitor_id)
+        except NotImplementedError as e:
+            print(f"Error: {e}")
+            return False
+        if catalog is None:
+            print(f"Error: Monitor {monitor_id} not found")
+            return False
+        quarter_turn = False
+        if angle in glorb_backend.ROTATIONS:
+            orientation = self._find_display(monitor_id)['orientation'] or 0
+            quarter_turn = glorb_backend.ROTATIONS.index(angle) % 2 != orientation % 2
+        if not catalog.supports(width, height, frequency, quarter_turn):
+            print(f"Error: Mode {format_mode(width, height, frequency)} not supported by monitor {monitor_id}")
+            return False
+        return True
+    
+    def set_display_mode(self, monitor_id, width, height, frequency=None):
+        """Set monitor resolution and optional refresh rate"""
+        if not self._check_mode(monitor_id, width, height, frequency):
+            return False
+        
+        try:
+            result = self.batch().set_mode(monitor_id, width, height, frequency).commit()[monitor_id]
+            
+            if result == 0:
+                print(f"Monitor {monitor_id} set to {format_mode(width, height, frequency)}")
+                return True
+            else:
+                print(f"Failed to set mode for monitor {monitor_id} (error code: {result})")
+                return False
+        except Exception as e:
+            print(f"Error setting display mode: {e}")
+            return False
+    
+    def apply(self, changes):
+        """Apply (monitor_id, setting, value) changes with a single mode-set
+        
+        setting is 'rotate' (value: angle) or 'mode' (value: (width, height, frequency)).
+        """
+        angles = {monitor_id: value for monitor_id, setting, value in changes if setting == 'rotate'}
+        for monitor_id, setting, value in changes:
+            if setting == 'mode' and not self._check_mode(monitor_id, *value, angle=angles.get(monitor_id)):
+                return False
+        
+        try:
+            with self.batch() as batch:
+                for monitor_id, setting, value in changes:
+                    if setting == 'rotate':
+                        batch.rotate(monitor_id, value)
+                    elif setting == 'mode':
+                        batch.set_mode(monitor_id, *value)
+                    else:
+                        raise ValueError(f"Unknown setting '{setting}'")
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+        
+        ok = True
+        for monitor_id, result in batch.results.items():
+            if result == 0:
+                print(f"Monitor {monitor_id} updated")
+            else:
+                print(f"Failed to update monitor {monitor_id} (error code: {result})")
+                ok = False
+        return ok
+    
     def brightness(self, monitor_id, level):
         """Set monitor brightness (0.0 to 1.0)"""
-        if monitor_id >= len(self.displays):
+        if self._find_display(monitor_id) is None:
             print(f"Error: Monitor {monitor_id} not found")
             return False
         
         brightness_percent = max(0, min(100, int(level * 100)))
         
-        # Try laptop brightness first (WMI method)
-        if self._set_laptop_brightness(brightness_percent):
+        try:
+            result = self._apply_brightness(monitor_id, brightness_percent)
+        except Exception as e:
+            print(f"Error setting brightness: {e}")
+            return False
+        
+        if result is None:
+            print(f"Error: Brightness control not supported for monitor {monitor_id}")
+            return False
+        
+        if result:
             print(f"Monitor {monitor_id} brightness set to {brightness_percent}%")
             return True
         
-        # Try DDC/CI for external monitors
-        self.physical_monitors = self._get_physical_monitors()
+        print(f"Failed to set brightness for monitor {monitor_id}")
+        return False
+    
+    def _cancel_fade(self, monitor_id, brightness_percent):
+        """A direct write supersedes any fade running on this monitor"""
+        fader = self._faders.get(monitor_id)
+        if fader is not None:
+            fader.cancel(brightness_percent)
+    
+    def _apply_brightness(self, monitor_id, brightness_percent):
+        """Set brightness quietly; None when the monitor has no brightness control"""
+        self._cancel_fade(monitor_id, brightness_percent)
+        return self._write_brightness(monitor_id, brightness_percent)
+    
+    def _write_brightness(self, monitor_id, brightness_percent):
+        return self._write_brightness_by(monitor_id, brightness_percent)[0]
+    
+    def _write_brightness_by(self, monitor_id, brightness_percent):
+        """Write brightness the first way the monitor accepts; returns (result, method)
+        
+        method is 'panel', 'ddc' or 'gamma', or None when nothing took the write.
+        """
+        display = self._find_display(monitor_id)
+        with self._monitor_lock(monitor_id):
+            # Try the built-in panel interface first (WMI on Windows)
+            if self.backend.set_panel_brightness(display, brightness_percent):
+                return True, 'panel'
+            
+            # Then the monitor's own channel (DDC/CI for external monitors)
+            result = self.backend.set_brightness(display, brightness_percent)
+            if result is not None:
+                return result, 'ddc' if result else None
+            # No hardware control at all: dim in software
+            result = self._write_gamma(display, brightness_percent)
+            return result, 'gamma' if result else None
+    
+    def _write_gamma(self, display, brightness_percent=None, kelvin=None):
+        """Load a gamma ramp, keeping whichever of brightness and temperature is not given
         
-        if monitor_id not in self.physical_monitors:
-            print(f"Error: Brightness control not supported for monitor {monitor_id}")
+        The caller holds the monitor lock.
+        """
+        import glorb_gamma
+        percent, current_kelvin = self._gamma.get(display['id'], (100, glorb_gamma.NEUTRAL_KELVIN))
+        percent, kelvin = glorb_gamma.normalize(percent if brightness_percent is None else brightness_percent,
+                                                current_kelvin if kelvin is None else kelvin)
+        result = self.backend.set_gamma(display, percent, kelvin)
+        if result:
+            self._gamma[display['id']] = (percent, kelvin)
+            self._gamma_changed = True
+        return result
+    
+    def brightness_many(self, levels, max_workers=None):
+        """Set brightness (0.0 to 1.0) on several monitors at once
+        
+        levels maps monitor IDs to brightness levels. Each monitor is written
+        the way brightness() writes it (panel, then DDC/CI, then gamma), on a
+        bounded thread pool, one thread per monitor at a time.
+        Returns {monitor_id: {'ok', 'method', 'error', 'elapsed'}} with method
+        'panel', 'ddc' or 'gamma' and elapsed in seconds.
+        """
+        return self.set_brightness_many({monitor_id: max(0, min(100, int(level * 100)))
+                                          for monitor_id, level in levels.items()}, max_workers)
+    
+    def set_brightness_many(self, percents, max_workers=None):
+        """brightness_many with levels given as whole percentages (0-100)"""
+        start = time.perf_counter()
+        results = {}
+        pending = {}
+        for monitor_id, brightness_percent in percents.items():
+            if self._find_display(monitor_id) is None:
+                results[monitor_id] = {'ok': False, 'method': None, 'error': 'not found', 'elapsed': 0.0}
+            else:
+                pending[monitor_id] = brightness_percent
+        
+        def set_one(item):
+            monitor_id, brightness_percent = item
+            call_start = time.perf_counter()
+            self._cancel_fade(monitor_id, brightness_percent)
+            try:
+                result, method = self._write_brightness_by(monitor_id, brightness_percent)
+                error = None if result else ('not supported' if result is None else 'write failed')
+            except Exception as e:
+                result, method, error = False, None, str(e)
+            return monitor_id, {'ok': bool(result), 'method': method, 'error': error,
+                                'elapsed': time.perf_counter() - call_start}
+        
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor
+            workers = min(max_workers or MAX_DDC_WORKERS, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results.update(pool.map(set_one, pending.items()))
+        
+        for monitor_id, result in sorted(results.items()):
+            if result['ok']:
+                print(f"Monitor {monitor_id} brightness set to {pending[monitor_id]}% ({result['elapsed'] * 1000:.1f} ms)")
+            else:
+                print(f"Failed to set brightness for monitor {monitor_id}: {result['error']}")
+        
+        succeeded = sum(1 for result in results.values() if result['ok'])
+        print(f"Brightness set on {succeeded}/{len(results)} monitors in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return results
+    
+    def brightness_all(self, level, max_workers=None):
+        """Set the same brightness (0.0 to 1.0) on every detected monitor"""
+        return self.brightness_many({display['id']: level for display in self.displays}, max_workers)
+    
+    def _fader(self, monitor_id):
+        """Per-monitor fade scheduler, created on first use"""
+        with self._lock:
+            fader = self._faders.get(monitor_id)
+        if fader is None:
+            import glorb_fade
+            current = self.get_brightness(monitor_id)
+            lock = self._monitor_lock(monitor_id)
+            with self._lock:
+                fader = self._faders.get(monitor_id)
+                if fader is None:
+                    fader = glorb_fade.FadeScheduler(lambda percent: self._write_brightness(monitor_id, percent), current,
+                                                     lock=lock)
+                    self._faders[monitor_id] = fader
+        return fader
+    
+    def fade_brightness_many(self, levels, duration, wait=True):
+        """Fade several monitors to brightness levels (0.0 to 1.0) over duration seconds
+        
+        Writes are rate-limited per monitor and a new fade supersedes one in
+        progress. With wait=False the fades continue in the background.
+        """
+        import glorb_gamma
+        faders = {}
+        # Every step of a software fade then reuses a cached ramp
+        for kelvin in {self._gamma[monitor_id][1] for monitor_id in levels if monitor_id in self._gamma}:
+            glorb_gamma.precompute(kelvin)
+        for monitor_id, level in levels.items():
+            if self._find_display(monitor_id) is None:
+                print(f"Error: Monitor {monitor_id} not found")
+                continue
+            faders[monitor_id] = self._fader(monitor_id)
+            faders[monitor_id].fade_to(max(0, min(100, int(level * 100))), duration)
+        
+        if not wait:
+            for monitor_id, level in levels.items():
+                if monitor_id in faders:
+                    print(f"Monitor {monitor_id} fading to {max(0, min(100, int(level * 100)))}% over {duration * 1000:.0f} ms")
+            return bool(faders) and len(faders) == len(levels)
+        
+        start = time.perf_counter()
+        ok = len(faders) == len(levels)
+        for monitor_id, fader in faders.items():
+            fader.wait()
+            target = max(0, min(100, int(levels[monitor_id] * 100)))
+            if fader.current == target:
+                print(f"Monitor {monitor_id} brightness set to {target}% ({fader.writes} writes, {(time.perf_counter() - start) * 1000:.0f} ms)")
+            else:
+                print(f"Failed to fade brightness for monitor {monitor_id}")
+                ok = False
+        return ok
+    
+    def fade_brightness(self, monitor_id, level, duration, wait=True):
+        """Fade one monitor to a brightness level (0.0 to 1.0) over duration seconds"""
+        return self.fade_brightness_many({monitor_id: level}, duration, wait)
+    
+    def fade_brightness_all(self, level, duration, wait=True):
+        """Fade every detected monitor to the same brightness level"""
+        return self.fade_brightness_many({display['id']: level for display in self.displays}, duration, wait)
+    
+    def get_brightness(self, monitor_id, max_age=None):
+        """Current brightness (0-100), or None if unavailable
+        
+        Backends may answer from the last read or write while it is younger
+        than max_age seconds. Monitors dimmed in software report the level
+        of their gamma ramp.
+        """
+        display = self._find_display(monitor_id)
+        if display is None:
+            return None
+        with self._monitor_lock(monitor_id):
+            current = self.backend.get_brightness(display, max_age)
+        if current is None and monitor_id in self._gamma:
+            return self._gamma[monitor_id][0]
+        return current
+    
+    def get_brightness_many(self, monitor_ids, max_age=None):
+        """{monitor_id: brightness (0-100) or None}, read concurrently like brightness_many writes"""
+        monitor_ids = list(monitor_ids)
+        if not monitor_ids:
+            return {}
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(MAX_DDC_WORKERS, len(monitor_ids))) as pool:
+            return dict(zip(monitor_ids, pool.map(lambda monitor_id: self.get_brightness(monitor_id, max_age),
+                                                  monitor_ids)))
+    
+    def color_temperature(self, monitor_id, kelvin):
+        """Tint a monitor's gamma ramp to a color temperature in kelvin (6500 is neutral)"""
+        display = self._find_display(monitor_id)
+        if display is None:
+            print(f"Error: Monitor {monitor_id} not found")
             return False
         
+        import glorb_gamma
+        _, kelvin = glorb_gamma.normalize(100, kelvin)
         try:
-            handle = self.physical_monitors[monitor_id]
-            
-            # Get current range and calculate proper value
-            min_brightness = DWORD()
-            current_brightness = DWORD()
-            max_brightness = DWORD()
-            
-            if windll.dxva2.GetMonitorBrightness(handle, byref(min_brightness), byref(current_brightness), byref(max_brightness)):
-                brightness_range = max_brightness.value - min_brightness.value
-                if brightness_range > 0:
-                    new_brightness = min_brightness.value + int((brightness_percent / 100.0) * brightness_range)
-                else:
-                    new_brightness = int((brightness_percent / 100.0) * max_brightness.value)
-                
-                if windll.dxva2.SetMonitorBrightness(handle, DWORD(new_brightness)):
-                    print(f"Monitor {monitor_id} brightness set to {brightness_percent}%")
-                    return True
-            
-            print(f"Failed to set brightness for monitor {monitor_id}")
-            return False
+            with self._monitor_lock(monitor_id):
+                result = self._write_gamma(display, kelvin=kelvin)
         except Exception as e:
-            print(f"Error setting brightness: {e}")
+            print(f"Error setting color temperature: {e}")
+            return False
+        
+        if result is None:
+            print(f"Error: Gamma ramps not supported for monitor {monitor_id}")
             return False
+        
+        if result:
+            print(f"Monitor {monitor_id} color temperature set to {kelvin}K")
+            return True
+        
+        print(f"Failed to set color temperature for monitor {monitor_id}")
+        return False
     
-    def _set_laptop_brightness(self, brightness_percent):
-        """Set laptop brightness using WMI"""
-        try:
-            import wmi
-            c = wmi.WMI(namespace='wmi')
-            
-            # Get brightness methods
-            brightness_methods = c.WmiMonitorBrightnessMethods()[0]
-            
-            # Set brightness
-            brightness_methods.WmiSetBrightness(brightness_percent, 0)
+    def color_temperature_all(self, kelvin):
+        """Set the same color temperature on every detected monitor"""
+        results = [self.color_temperature(display['id'], kelvin) for display in self.displays]
+        return bool(results) and all(results)
+    
+    def save_profile(self, name):
+        """Save every monitor's rotation, mode and brightness as a named profile"""
+        import glorb_profiles
+        brightness = self.get_brightness_many(display['id'] for display in self.displays)
+        profile = glorb_profiles.capture(self.displays, brightness)
+        if not glorb_profiles.save(name, profile):
+            print(f"Error: Could not write profile '{name}' to {glorb_config.config_dir()}")
+            return False
+        print(f"Profile '{name}' saved ({len(profile['monitors'])} monitors)")
+        return True
+    
+    def apply_profile(self, name):
+        """Bring monitors to a saved profile, changing only settings that differ"""
+        import glorb_profiles
+        profile = glorb_profiles.load(name)
+        if profile is None:
+            print(f"Error: No profile named '{name}'")
+            return False
+        
+        pairs, missing = glorb_profiles.match(profile, self.displays)
+        for key in missing:
+            print(f"Monitor {key} from profile '{name}' is not connected")
+        brightness = self.get_brightness_many(display['id'] for display, entry in pairs
+                                              if entry.get('brightness') is not None)
+        changes, levels = glorb_profiles.diff(pairs, brightness)
+        if not (changes or levels):
+            print(f"Profile '{name}' is already applied")
             return True
-        except:
-            # Fallback: try powershell method
-            try:
-                import subprocess
-                cmd = f'powershell -Command "(Get-WmiObject -Namespace root/WMI -Class WmiMonitorBrightnessMethods).WmiSetBrightness(1,{brightness_percent})"'
-                result = subprocess.run(cmd, shell=True, capture_output=True)
-                return result.returncode == 0
-            except:
-                return False
+        
+        ok = True
+        if changes:
+            ok = self.apply(changes)
+        if levels:
+            results = self.set_brightness_many(levels)
+            ok = ok and all(result['ok'] for result in results.values())
+        return ok
 
-def main():
-    parser = argparse.ArgumentParser(description='Glorb - Monitor Management Tool')
-    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+def _monitor_or_all(text):
+    if text == 'all':
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid monitor '{text}' (expected an ID or 'all')")
+
+def _keyframe(text):
+    import glorb_schedule
+    try:
+        return glorb_schedule.parse_keyframe(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _duration(text):
+    import glorb_fade
+    try:
+        return glorb_fade.parse_duration(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _parse_change(text):
+    """Parse an apply spec such as 0:rotate=90 or 2:mode=1920x1080@144"""
+    try:
+        monitor, setting = text.split(':', 1)
+        key, value = setting.split('=', 1)
+        monitor_id = int(monitor)
+        if key == 'rotate':
+            angle = int(value)
+            if angle not in glorb_backend.ROTATIONS:
+                raise ValueError
+            return monitor_id, 'rotate', angle
+        if key == 'mode':
+            resolution, _, frequency = value.partition('@')
+            width, height = resolution.lower().split('x')
+            return monitor_id, 'mode', (int(width), int(height), int(frequency) if frequency else None)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"invalid change '{text}' (expected ID:rotate=ANGLE or ID:mode=WxH[@HZ])")
+
+def _command_call(args):
+    """Map parsed CLI arguments to a (method, params) manager call"""
+    if args.command == 'identify':
+        return 'identify', (args.json,) if args.json else ()
+    if args.command == 'rotate':
+        return 'rotate', (args.monitor, args.angle)
+    if args.command == 'b':
+        if args.fade is not None:
+            if args.monitor == 'all':
+                return 'fade_brightness_all', (args.level, args.fade)
+            return 'fade_brightness', (args.monitor, args.level, args.fade)
+        if args.monitor == 'all':
+            return 'brightness_all', (args.level,)
+        return 'brightness', (args.monitor, args.level)
+    if args.command == 'temp':
+        if args.monitor == 'all':
+            return 'color_temperature_all', (args.kelvin,)
+        return 'color_temperature', (args.monitor, args.kelvin)
+    if args.command == 'apply':
+        return 'apply', (args.changes,)
+    if args.command == 'modes':
+        return 'modes', (args.monitor, args.min_refresh)
+    if args.command == 'vcp':
+        if args.action == 'list':
+            return 'vcp_list', (args.monitor,)
+        if args.action == 'get':
+            return 'vcp_get', (args.monitor, args.feature)
+        return 'vcp_set', (args.monitor, args.feature, args.value)
+    if args.command == 'profile':
+        return f"{args.action}_profile", (args.name,)
+    return None, ()
+
+def _write_profile(path):
+    """Print the --profile summary and save the Chrome trace"""
+    import glorb_trace
+    print()
+    print(glorb_trace.summary())
+    try:
+        glorb_trace.write_chrome_trace(path)
+    except OSError as e:
+        print(f"Error writing trace: {e}")
+        return
+    print(f"Trace written to {path} (open in chrome://tracing or ui.perfetto.dev)")
+
+def _watch(manager, config):
+    """Print change events as JSON lines until interrupted or the reader goes away"""
+    import json
+    try:
+        for event in manager.poll(**config):
+            print(json.dumps(event), flush=True)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # e.g. piped into head: keep the interpreter from failing to flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+def _fleet(args):
+    """Run one command on every host of a fleet and print what each host printed"""
+    import glorb_fleet
+    key = glorb_fleet.load_key(args.key_file)
+    if key is None:
+        print(f"Error: no fleet key (set GLORB_FLEET_KEY or create {args.key_file or glorb_fleet.key_path()})")
+        return False
+    hosts = glorb_fleet.load_hosts(args.hosts)
+    if not hosts:
+        print(f"Error: no hosts in '{args.hosts}'")
+        return False
+    method, params = _command_call(argparse.Namespace(**dict(vars(args), command=args.remote)))
+    # Agents finish fades in the background, like the daemon
+    if method.startswith('fade_'):
+        params += (False,)
+    with glorb_fleet.FleetClient(key, timeout=args.timeout, max_workers=args.workers) as client:
+        results = client.fan_out(hosts, [(method, params)])
+    for host in hosts:
+        result = results[host]
+        print(f"== {host} ({result['elapsed'] * 1000:.0f}ms) ==")
+        for reply in result['replies']:
+            sys.stdout.write(reply['output'])
+        if result['error'] is not None:
+            print(f"Error: {result['error']}")
+    ok = sum(1 for result in results.values() if result['ok'])
+    print(f"{ok}/{len(hosts)} hosts succeeded")
+    return ok == len(hosts)
+
+def _add_commands(subparsers, parents=()):
+    """Add the commands that map to a manager call; parents adds shared options to each"""
+    parents = list(parents)
     
     # identify command
-    subparsers.add_parser('identify', help='List all detected monitors')
+    identify_parser = subparsers.add_parser('identify', help='List all detected monitors', parents=parents)
+    identify_parser.add_argument('--json', action='store_true', help='Print display records as JSON, with brightness')
     
     # rotate command
-    rotate_parser = subparsers.add_parser('rotate', help='Rotate monitor')
+    rotate_parser = subparsers.add_parser('rotate', help='Rotate monitor', parents=parents)
     rotate_parser.add_argument('monitor', type=int, help='Monitor ID')
     rotate_parser.add_argument('angle', type=int, choices=[0, 90, 180, 270], help='Rotation angle')
     
     # brightness command
-    brightness_parser = subparsers.add_parser('b', help='Set monitor brightness')
-    brightness_parser.add_argument('monitor', type=int, help='Monitor ID')
+    brightness_parser = subparsers.add_parser('b', help='Set monitor brightness', parents=parents)
+    brightness_parser.add_argument('monitor', type=_monitor_or_all, help="Monitor ID or 'all'")
     brightness_parser.add_argument('level', type=float, help='Brightness level (0.0 to 1.0)')
+    brightness_parser.add_argument('--fade', type=_duration, metavar='DURATION', help='Fade to the level over a duration such as 500ms or 2s')
+    
+    # color temperature command
+    temp_parser = subparsers.add_parser('temp', help='Set monitor color temperature through its gamma ramp', parents=parents)
+    temp_parser.add_argument('monitor', type=_monitor_or_all, help="Monitor ID or 'all'")
+    temp_parser.add_argument('kelvin', type=int, help=f"Color temperature in kelvin ({glorb_config.MIN_KELVIN}-"
+                                                      f"{glorb_config.MAX_KELVIN}, {glorb_config.NEUTRAL_KELVIN} is neutral)")
+    
+    # modes command
+    modes_parser = subparsers.add_parser('modes', help='List display modes for a monitor', parents=parents)
+    modes_parser.add_argument('monitor', type=int, help='Monitor ID')
+    modes_parser.add_argument('--min-refresh', type=int, metavar='HZ', help='Only show refresh rates at or above HZ')
+    
+    # apply command
+    apply_parser = subparsers.add_parser('apply', help='Apply several rotation/mode changes at once', parents=parents)
+    apply_parser.add_argument('changes', nargs='+', type=_parse_change, metavar='CHANGE',
+                              help='ID:rotate=ANGLE or ID:mode=WxH[@HZ], e.g. 0:rotate=90 2:mode=1920x1080@144')
+    
+    # profile command
+    profile_parser = subparsers.add_parser('profile', help='Save or apply a named monitor layout', parents=parents)
+    profile_parser.add_argument('action', choices=['save', 'apply'], help='Save the current layout or apply a saved one')
+    profile_parser.add_argument('name', help='Profile name, e.g. coding')
+    
+    # vcp command
+    vcp_parser = subparsers.add_parser('vcp', help='Read or change monitor settings over DDC/CI (contrast, input, ...)')
+    vcp_actions = vcp_parser.add_subparsers(dest='action', metavar='ACTION')
+    vcp_actions.required = True
+    vcp_list_parser = vcp_actions.add_parser('list', help='List the VCP features a monitor supports', parents=parents)
+    vcp_list_parser.add_argument('monitor', type=int, help='Monitor ID')
+    vcp_get_parser = vcp_actions.add_parser('get', help='Read a VCP feature', parents=parents)
+    vcp_get_parser.add_argument('monitor', type=int, help='Monitor ID')
+    vcp_get_parser.add_argument('feature', help=f"Feature name ({', '.join(glorb_config.VCP_FEATURES)}) or hex VCP code")
+    vcp_set_parser = vcp_actions.add_parser('set', help='Write a VCP feature', parents=parents)
+    vcp_set_parser.add_argument('monitor', type=int, help='Monitor ID')
+    vcp_set_parser.add_argument('feature', help=f"Feature name ({', '.join(glorb_config.VCP_FEATURES)}) or hex VCP code")
+    vcp_set_parser.add_argument('value', help='Value, e.g. 70, 0x11 or a name such as hdmi1 or standby')
+
+def _describe_curve(curve):
+    import glorb_schedule
+    return ', '.join(f"{glorb_schedule.format_time(seconds)} {level:.0%}" for seconds, level in curve.keyframes)
+
+def _schedule(args):
+    """Edit, show or follow the saved brightness schedule"""
+    import glorb_schedule
+    curves = glorb_schedule.load()
+    if args.action in ('set', 'clear'):
+        if args.action == 'set':
+            curves[args.monitor] = glorb_schedule.Curve(args.keyframes)
+        elif args.monitor is None:
+            curves = {}
+        elif curves.pop(args.monitor, None) is None:
+            print(f"No schedule for {'all monitors' if args.monitor == 'all' else f'monitor {args.monitor}'}")
+            return False
+        if not glorb_schedule.save(curves):
+            print("Error: Could not save the schedule")
+            return False
+        print("Schedule saved" if args.action == 'set' else "Schedule cleared")
+        return True
+    if not curves:
+        print("No brightness schedule; create one with e.g. glorb schedule set all 07:00=0.4 12:00=0.9 22:00=0.2")
+        return False
+    
+    config = {}
+    if getattr(args, 'min_interval', None) is not None:
+        config['min_interval'] = args.min_interval
+    manager = MonitorManager(use_cache=not args.no_cache, backend=args.backend)
+    try:
+        if args.action == 'show':
+            scheduler = glorb_schedule.BrightnessScheduler(manager, curves, **config)
+            plan = scheduler.replan()
+            print("Brightness schedule (local time):")
+            for key, curve in sorted(curves.items(), key=lambda item: (item[0] != 'all', str(item[0]))):
+                print(f"  {'All monitors' if key == 'all' else f'Monitor {key}'}: {_describe_curve(curve)}")
+            now = glorb_schedule.seconds_of_day(time.time())
+            levels = plan.levels(now)
+            print("Now: " + (', '.join(f"monitor {monitor_id} {percent}%" for monitor_id, percent in sorted(levels.items()))
+                             or "no scheduled monitor connected"))
+            delay, changes = plan.next_wakeup(now)
+            if delay is not None:
+                print(f"Next change at {glorb_schedule.format_time(now + delay)}: "
+                      + ', '.join(f"monitor {monitor_id} to {percent}%" for monitor_id, percent in sorted(changes.items())))
+            print(f"Per day: {len(plan.wakeups)} wakeups, {plan.writes} brightness writes "
+                  f"(at most one per monitor every {scheduler.config['min_interval']:g}s)")
+            return True
+        
+        print("Following the brightness schedule (Ctrl+C to stop)")
+        import glorb_daemon
+        glorb_daemon.warm_up(manager)
+        scheduler = glorb_schedule.BrightnessScheduler(manager, curves, **config)
+        try:
+            for _ in scheduler.updates():
+                pass
+        except KeyboardInterrupt:
+            pass
+        stats = scheduler.stats
+        print(f"Schedule stopped after {stats['wakeups']} wakeups ({stats['idle_wakeups']} idle) and "
+              f"{stats['writes']} brightness writes")
+        return True
+    finally:
+        manager.close()
+
+def _terminal_width():
+    """Columns shutil.get_terminal_size would report, without importing shutil (and with it lzma and bz2)"""
+    try:
+        columns = int(os.environ.get('COLUMNS', 0))
+    except ValueError:
+        columns = 0
+    if columns <= 0:
+        try:
+            columns = os.get_terminal_size(sys.__stdout__.fileno()).columns
+        except (AttributeError, ValueError, OSError):
+            columns = 0
+    return columns or 80
+
+class _Parser(argparse.ArgumentParser):
+    """ArgumentParser whose help and usage messages do not import shutil; subparsers inherit it"""
+    
+    def _get_formatter(self):
+        return self.formatter_class(prog=self.prog, width=_terminal_width() - 2)
+
+def main(argv=None):
+    parser = _Parser(description='Glorb - Monitor Management Tool')
+    parser.add_argument('--no-daemon', action='store_true', help='Always run in-process, even if a daemon is running')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore the cached display topology and re-enumerate')
+    parser.add_argument('--backend', choices=sorted(glorb_backend.BACKENDS), help='Display backend (default: platform-specific)')
+    parser.add_argument('--profile', action='store_true', help='Time native and backend calls (implies --no-daemon)')
+    parser.add_argument('--trace-file', default='glorb-trace.json', help='Chrome trace written by --profile (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    
+    _add_commands(subparsers)
+    
+    # watch command
+    watch_parser = subparsers.add_parser('watch', help='Stream display changes as JSON lines')
+    watch_parser.add_argument('--interval', type=float, metavar='SECONDS',
+                              help=f"Seconds between layout checks (default {glorb_config.WATCH_DEFAULTS['topology']:g})")
+    watch_parser.add_argument('--brightness-interval', type=float, metavar='SECONDS',
+                              help=f"Seconds between DDC/CI brightness reads "
+                                   f"(default {glorb_config.WATCH_DEFAULTS['brightness']:g})")
     
-    args = parser.parse_args()
+    # schedule command
+    schedule_parser = subparsers.add_parser('schedule', help='Follow a daily brightness curve')
+    schedule_actions = schedule_parser.add_subparsers(dest='action', metavar='ACTION')
+    schedule_actions.required = True
+    schedule_set_parser = schedule_actions.add_parser('set', help="Set a monitor's (or every monitor's) curve")
+    schedule_set_parser.add_argument('monitor', type=_monitor_or_all, help="Monitor ID or 'all'")
+    schedule_set_parser.add_argument('keyframes', nargs='+', type=_keyframe, metavar='TIME=LEVEL',
+                                     help='Brightness (0.0 to 1.0) at a time of day, e.g. 07:00=0.4 12:00=0.9 22:00=0.2')
+    schedule_clear_parser = schedule_actions.add_parser('clear', help='Remove one curve, or the whole schedule')
+    schedule_clear_parser.add_argument('monitor', type=_monitor_or_all, nargs='?', help="Monitor ID or 'all'")
+    schedule_actions.add_parser('show', help='Show the curves, the next change and writes per day')
+    schedule_run_parser = schedule_actions.add_parser('run', help='Follow the schedule until interrupted')
+    schedule_run_parser.add_argument('--min-interval', type=float, metavar='SECONDS',
+                                     help=f"Fewest seconds between writes to one monitor "
+                                          f"(default {glorb_config.SCHEDULE_DEFAULTS['min_interval']:g})")
+    
+    # daemon command
+    daemon_parser = subparsers.add_parser('daemon', help='Keep monitor state warm and serve CLI calls')
+    daemon_parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    
+    # agent command
+    agent_parser = subparsers.add_parser('agent', help='Serve commands to fleet controllers over the network')
+    agent_parser.add_argument('--listen', default='', metavar='HOST:PORT',
+                              help='Address to listen on; bracket IPv6 addresses, as in [::]:7719 (default: every IPv4 interface, port 7719)')
+    agent_parser.add_argument('--key-file', help='Shared fleet key, created if missing (default: fleet.key in the config directory)')
+    
+    # fleet command
+    fleet_options = _Parser(add_help=False)
+    fleet_options.add_argument('--hosts', required=True, metavar='FILE|LIST',
+                               help='Hosts file (one HOST[:PORT] per line) or a comma-separated list')
+    fleet_options.add_argument('--key-file', help='Shared fleet key (default: fleet.key in the config directory)')
+    fleet_options.add_argument('--timeout', type=float, default=10.0, metavar='SECONDS',
+                               help='Seconds to wait for each host (default: %(default)g)')
+    fleet_options.add_argument('--workers', type=int, default=64, help='Hosts contacted at once (default: %(default)s)')
+    fleet_parser = subparsers.add_parser('fleet', help='Run a command on many machines running glorb agent')
+    fleet_commands = fleet_parser.add_subparsers(dest='remote', metavar='COMMAND')
+    fleet_commands.required = True
+    _add_commands(fleet_commands, parents=[fleet_options])
+    
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
         return
     
-    manager = MonitorManager()
+    if args.profile:
+        import glorb_trace
+        glorb_trace.enable()
     
-    if args.command == 'identify':
-        manager.identify()
-    elif args.command == 'rotate':
-        manager.rotate(args.monitor, args.angle)
-    elif args.command == 'b':
-        manager.brightness(args.monitor, args.level)
+    if args.command == 'daemon':
+        import glorb_daemon
+        if args.stop:
+            if not glorb_daemon.stop():
+                print("No glorb daemon running")
+            return
+        manager = MonitorManager(use_cache=not args.no_cache, backend=args.backend)
+        try:
+            glorb_daemon.serve(manager)
+        finally:
+            manager.close()
+            if args.profile:
+                _write_profile(args.trace_file)
+        return
+    
+    if args.command == 'agent':
+        import glorb_fleet
+        key = glorb_fleet.load_key(args.key_file)
+        if key is None:
+            key = glorb_fleet.create_key(args.key_file)
+            print(f"Created fleet key {args.key_file or glorb_fleet.key_path()}; copy it to the controller")
+        try:
+            address = glorb_fleet.parse_address(args.listen)
+        except ValueError:
+            print(f"Error: invalid address '{args.listen}' (expected HOST:PORT or [IPV6]:PORT)")
+            return
+        manager = MonitorManager(use_cache=not args.no_cache, backend=args.backend)
+        try:
+            glorb_fleet.serve(manager, key, address)
+        finally:
+            manager.close()
+        return
+    
+    if args.command == 'fleet':
+        _fleet(args)
+        return
+    
+    if args.command == 'schedule':
+        try:
+            _schedule(args)
+        finally:
+            if args.profile:
+                _write_profile(args.trace_file)
+        return
+    
+    if args.command == 'watch':
+        config = {}
+        if args.interval is not None:
+            config['topology'] = args.interval
+        if args.brightness_interval is not None:
+            config['brightness'] = args.brightness_interval
+        manager = MonitorManager(use_cache=not args.no_cache, backend=args.backend)
+        try:
+            _watch(manager, config)
+        finally:
+            manager.close()
+            if args.profile:
+                _write_profile(args.trace_file)
+        return
+    
+    method, params = _command_call(args)
+    
+    if not (args.no_daemon or args.no_cache or args.backend or args.profile):
+        import glorb_daemon
+        try:
+            # The daemon finishes fades in the background, so later calls can supersede them
+            daemon_params = params + (False,) if method.startswith('fade_') else params
+            _, output = glorb_daemon.send_command(method, *daemon_params)
+            sys.stdout.write(output)
+            return
+        except glorb_daemon.DaemonUnavailable:
+            pass
+        except glorb_daemon.DaemonError as e:
+            print(f"Error: {e}")
+            return
+    
+    trace = _trace()
+    try:
+        with trace.span(f"glorb {args.command}", 'cli') if trace is not None else contextlib.nullcontext():
+            manager = MonitorManager(use_cache=not args.no_cache, backend=args.backend)
+            try:
+                getattr(manager, method)(*params)
+            finally:
+                manager.close()
+    finally:
+        if args.profile:
+            _write_profile(args.trace_file)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""asyncio front end to MonitorManager for event-loop applications"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from glorb import MAX_DDC_WORKERS, MonitorManager
+
+# Lock key shared by every operation that ends in a mode-set
+_MODESET = 'modeset'
+
+
+class AsyncMonitorManager:
+    """Awaitable MonitorManager operations that never block the event loop
+
+    Blocking work (DDC/CI, WMI, mode-sets, enumeration) runs on a dedicated
+    thread pool. Calls for the same monitor run one at a time in the order
+    they were awaited, calls for different monitors run concurrently, and
+    mode-sets are serialized because each one re-detects every display.
+
+    Every call takes an optional timeout (defaulting to self.timeout).
+    Cancelling or timing out a call that has not started yet drops it; one
+    already talking to the hardware cannot be interrupted, so its monitor
+    stays locked until it finishes while the awaiting task moves on.
+    """
+
+    def __init__(self, manager, max_workers=None, timeout=None):
+        self.manager = manager
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or MAX_DDC_WORKERS,
+                                            thread_name_prefix='glorb-async')
+        self._locks = {}
+
+    @classmethod
+    async def create(cls, use_cache=True, backend=None, max_workers=None, timeout=None):
+        """Detect displays off the event loop and wrap a new MonitorManager"""
+        loop = asyncio.get_running_loop()
+        manager = await loop.run_in_executor(None, functools.partial(MonitorManager, use_cache, backend))
+        return cls(manager, max_workers, timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    @property
+    def displays(self):
+        return self.manager.displays
+
+    def _lock(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def _call(self, keys, func, *args, timeout=None):
+        """Run func(*args) on the executor while holding the locks for keys"""
+        loop = asyncio.get_running_loop()
+        locks = [self._lock(key) for key in keys]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            for lock in reversed(acquired):
+                lock.release()
+            raise
+
+        def release(_):
+            # Locks are freed when the work is really over, not when the awaiting task gives up
+            for lock in reversed(acquired):
+                loop.call_soon_threadsafe(lock.release)
+        future.add_done_callback(release)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Only succeeds while the call is still queued
+            future.cancel()
+            raise
+
+    async def identify(self, timeout=None):
+        """List all detected monitors"""
+        return await self._call((), self.manager.identify, timeout=timeout)
+
+    async def brightness(self, monitor_id, level, timeout=None):
+        """Set monitor brightness (0.0 to 1.0)"""
+        return await self._call((monitor_id,), self.manager.brightness, monitor_id, level, timeout=timeout)
+
+    async def brightness_all(self, level, timeout=None):
+        """Set every monitor's brightness concurrently; returns {monitor_id: result}"""
+        monitor_ids = [display['id'] for display in self.manager.displays]
+        results = await asyncio.gather(*(self.brightness(monitor_id, level, timeout) for monitor_id in monitor_ids),
+                                       return_exceptions=True)
+        return dict(zip(monitor_ids, results))
+
+    async def get_brightness(self, monitor_id, max_age=None, timeout=None):
+        """Current brightness (0-100), or None if unavailable"""
+        return await self._call((monitor_id,), self.manager.get_brightness, monitor_id, max_age, timeout=timeout)
+
+    async def rotate(self, monitor_id, angle, timeout=None):
+        """Rotate a monitor to 0, 90, 180 or 270 degrees"""
+        return await self._call((monitor_id, _MODESET), self.manager.rotate, monitor_id, angle, timeout=timeout)
+
+    async def get_display_modes(self, monitor_id, timeout=None):
+        """Available modes for a monitor as width/height/frequency/bits_per_pixel dicts"""
+        return await self._call((monitor_id,), self.manager.get_display_modes, monitor_id, timeout=timeout)
+
+    async def set_display_mode(self, monitor_id, width, height, frequency=None, timeout=None):
+        """Set monitor resolution and optional refresh rate"""
+        return await self._call((monitor_id, _MODESET), self.manager.set_display_mode, monitor_id, width, height,
+                                frequency, timeout=timeout)
+
+    async def close(self):
+        """Wait for running calls, then release the manager's resources"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        await loop.run_in_executor(None, self.manager.close)
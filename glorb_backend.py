@@ -0,0 +1,131 @@
+"""Platform backends behind MonitorManager and how one gets picked"""
+
+import importlib
+import os
+import sys
+
+# Rotation angles every backend understands
+ROTATIONS = (0, 90, 180, 270)
+
+# Backend name -> 'module:Class', imported only when selected
+BACKENDS = {
+    'win32': 'glorb_win32:Win32Backend',
+    'sim': 'glorb_sim:SimulatedBackend',
+    'sysfs': 'glorb_sysfs:SysfsBacklightBackend',
+    'xrandr': 'glorb_xrandr:XrandrBackend',
+}
+
+
+class Backend:
+    """Platform layer that enumerates displays and talks to the hardware
+
+    Displays are plain dicts carrying at least 'id', 'name', 'description',
+    'width', 'height' and 'primary'. Brightness setters return True/False,
+    or None when the display has no brightness control through this path.
+    MonitorManager serializes calls per display, so a backend only needs to
+    guard state it shares across displays.
+    """
+
+    name = None
+
+    def load_displays(self, use_cache=True):
+        """Enumerate displays; use_cache=False forces a full re-enumeration"""
+        raise NotImplementedError
+
+    def set_brightness(self, display, percent):
+        """Set brightness (0-100) through the display's own control channel"""
+        return None
+
+    def set_panel_brightness(self, display, percent):
+        """Set brightness through a built-in panel interface, if the platform has one"""
+        return None
+
+    def get_brightness(self, display, max_age=None):
+        """Current brightness (0-100), or None if unavailable"""
+        return None
+
+    def set_gamma(self, display, percent, kelvin):
+        """Load a software gamma ramp (brightness 0-100, color temperature in kelvin); None if unsupported"""
+        return None
+
+    def health(self, display):
+        """Short note when the display's control channel is failing, else None"""
+        return None
+
+    def fingerprint(self):
+        """Cheap token that changes whenever the display layout does, or None if there is none"""
+        return None
+
+    def rescan(self, previous):
+        """Re-enumerate after a hotplug event, keeping per-display state for unchanged displays"""
+        return self.load_displays(use_cache=False)
+
+    def watcher(self, on_change, settle=None):
+        """glorb_hotplug.DisplayWatcher calling on_change() after display hotplug events"""
+        raise NotImplementedError(f"The {self.name} backend cannot watch for display changes")
+
+    def mode_catalog(self, display):
+        """glorb_modes.ModeCatalog of the modes the display reports"""
+        raise NotImplementedError(f"The {self.name} backend cannot list display modes")
+
+    def monitor_identity(self, display):
+        """Stable key for per-monitor disk caches (an EDID hash where available), or None"""
+        return display.get('hardware_id')
+
+    def vcp_capabilities(self, display):
+        """glorb_vcp.VcpCapabilities of the monitor, or None if it does not answer"""
+        raise NotImplementedError(f"The {self.name} backend cannot control VCP features")
+
+    def get_vcp(self, display, code):
+        """(current, maximum) of a VCP feature, or None on failure"""
+        raise NotImplementedError(f"The {self.name} backend cannot control VCP features")
+
+    def set_vcp(self, display, code, value):
+        """Write a VCP feature; True/False"""
+        raise NotImplementedError(f"The {self.name} backend cannot control VCP features")
+
+    def transaction(self, displays, on_commit=None):
+        """Object staging rotate()/set_mode() calls until commit() applies them"""
+        raise NotImplementedError(f"The {self.name} backend cannot change rotation or display modes")
+
+    def close(self):
+        """Release handles and file descriptors held by the backend"""
+
+
+def default_backend_name():
+    """Backend used when none is requested explicitly"""
+    if sys.platform == 'win32':
+        return 'win32'
+    import shutil
+    if os.environ.get('DISPLAY') and shutil.which(os.environ.get('GLORB_XRANDR') or 'xrandr'):
+        return 'xrandr'
+    return 'sysfs'
+
+
+def get_backend(name=None):
+    """Instantiate a backend by name, GLORB_BACKEND, or the platform default"""
+    name = name or os.environ.get('GLORB_BACKEND') or default_backend_name()
+    try:
+        target = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    module_name, class_name = target.split(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def percent_to_raw(percent, min_value, max_value):
+    """Convert a 0-100 brightness percentage to a device's raw value"""
+    brightness_range = max_value - min_value
+    if brightness_range > 0:
+        return min_value + int((percent / 100.0) * brightness_range)
+    return int((percent / 100.0) * max_value)
+
+
+def raw_to_percent(raw, min_value, max_value):
+    """Convert a raw device brightness value to a 0-100 percentage"""
+    brightness_range = max_value - min_value
+    if brightness_range > 0:
+        return int(((raw - min_value) / brightness_range) * 100)
+    if max_value > 0:
+        return int((raw / max_value) * 100)
+    return 0
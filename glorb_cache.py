@@ -0,0 +1,50 @@
+"""Small persistent JSON cache stored under the user's cache directory"""
+
+import os
+import sys
+
+import glorb_config
+
+
+def cache_dir():
+    """Per-user cache directory, overridable with GLORB_CACHE_DIR"""
+    path = os.environ.get('GLORB_CACHE_DIR')
+    if not path:
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+            path = os.path.join(base, 'glorb', 'Cache')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            path = os.path.join(base, 'glorb')
+    return path
+
+
+def _entry_path(name):
+    return os.path.join(cache_dir(), f'{name}.json')
+
+
+def load(name, key):
+    """Return the value cached under name if it was stored with the same key"""
+    import json
+    try:
+        with open(_entry_path(name), 'r', encoding='utf-8') as fh:
+            entry = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get('key') != key:
+        return None
+    return entry.get('value')
+
+
+def store(name, key, value):
+    """Atomically write value under name, tagged with key"""
+    return glorb_config.write_json(_entry_path(name), {'key': key, 'value': value})
+
+
+def clear(name):
+    """Remove a cache entry if present"""
+    try:
+        os.unlink(_entry_path(name))
+        return True
+    except OSError:
+        return False
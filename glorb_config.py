@@ -0,0 +1,126 @@
+"""Defaults, names and config files shared by the CLI and the modules it imports only when a command needs them
+
+This module imports only os and sys, so the argument parser can show
+defaults and accepted names without loading glorb_vcp, glorb_gamma,
+glorb_watch or glorb_schedule. Those modules take their values from here,
+and read their GLORB_* environment settings through settings(). Config
+files (profiles, schedules, the fleet key) live under config_dir(), and
+every JSON file glorb keeps, cache entries included, is written by
+write_json().
+"""
+
+import os
+import sys
+
+# Common VCP codes by the names the CLI accepts
+VCP_FEATURES = {
+    'brightness': 0x10,
+    'contrast': 0x12,
+    'color-preset': 0x14,
+    'red-gain': 0x16,
+    'green-gain': 0x18,
+    'blue-gain': 0x1A,
+    'input': 0x60,
+    'volume': 0x62,
+    'mute': 0x8D,
+    'power': 0xD6,
+}
+
+# Color temperatures a gamma ramp can have, in kelvin
+NEUTRAL_KELVIN = 6500
+MIN_KELVIN = 1000
+MAX_KELVIN = 10000
+
+# glorb watch: seconds between polls. Topology checks are a cheap
+# fingerprint; brightness reads are DDC/CI transactions, so they run far
+# less often. For `boost` seconds after any change both use their fast
+# interval.
+WATCH_DEFAULTS = {
+    'topology': 2.0,
+    'brightness': 60.0,
+    'fast_topology': 0.25,
+    'fast_brightness': 2.0,
+    'boost': 10.0,
+}
+
+# glorb schedule
+SCHEDULE_DEFAULTS = {
+    # Fewest seconds between two writes to one monitor; steep ramps are written in coarser steps
+    'min_interval': 60.0,
+    # Writes due this many seconds after a wakeup are made in it, so monitors share wakeups
+    'coalesce': 5.0,
+    # Longest sleep, so a resume from suspend or a clock change is noticed within it
+    'max_sleep': 3600.0,
+}
+
+
+def parse_settings(text, defaults, what):
+    """Parse 'key=value,key=value' settings into a dict, each value of its default's type
+
+    what names the settings in the error raised for a key defaults lacks.
+    """
+    config = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        key, _, value = item.partition('=')
+        if key not in defaults:
+            raise ValueError(f"Unknown {what} setting '{key}' (available: {', '.join(defaults)})")
+        config[key] = type(defaults[key])(value)
+    return config
+
+
+def settings(defaults, variable, what, overrides):
+    """defaults, updated from the settings in environment variable, then from the overrides dict"""
+    merged = dict(defaults)
+    merged.update(parse_settings(os.environ.get(variable), defaults, what))
+    merged.update(overrides)
+    return merged
+
+
+def config_dir():
+    """Per-user config directory, overridable with GLORB_CONFIG_DIR"""
+    path = os.environ.get('GLORB_CONFIG_DIR')
+    if not path:
+        if sys.platform == 'win32':
+            base = os.environ.get('APPDATA') or os.path.expanduser('~')
+        else:
+            base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        path = os.path.join(base, 'glorb')
+    return path
+
+
+def write_json(path, data, indent=None):
+    """Atomically replace the JSON file at path; returns False if it could not be written"""
+    import json
+    import tempfile
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=indent)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, TypeError, ValueError):
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def read_config(filename):
+    """JSON object stored in a config file, or {} when it is missing or unreadable"""
+    import json
+    try:
+        with open(os.path.join(config_dir(), filename), 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_config(filename, data):
+    """Atomically replace a JSON config file; returns False if it could not be written"""
+    return write_json(os.path.join(config_dir(), filename), data, indent=2)
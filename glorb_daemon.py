@@ -0,0 +1,390 @@
+"""Resident glorb daemon and the thin client the CLI uses to reach it
+
+Client and daemon exchange one length-prefixed JSON request and reply per
+connection, over a Unix socket in a directory only the current user can
+open, or a named pipe on Windows. Each request carries the key the daemon
+wrote next to its socket. The client side only needs os, json and _socket,
+so forwarding a command costs less than importing a backend.
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+
+# Manager methods a client may invoke on the daemon
+DAEMON_COMMANDS = ('identify', 'rotate', 'brightness', 'brightness_many', 'brightness_all',
+                   'fade_brightness', 'fade_brightness_many', 'fade_brightness_all', 'apply', 'modes', 'refresh',
+                   'save_profile', 'apply_profile', 'vcp_list', 'vcp_get', 'vcp_set', 'color_temperature',
+                   'color_temperature_all')
+
+# Commands whose first parameter maps monitor IDs to levels; JSON turns those keys into strings
+_LEVEL_COMMANDS = ('brightness_many', 'fade_brightness_many')
+
+# Largest message either side accepts
+MAX_MESSAGE = 1 << 24
+# Seconds the daemon waits for a connected client to send its request
+REQUEST_TIMEOUT = 5.0
+# Seconds the client waits on the daemon; fades run on in the background, so no command takes this long
+REPLY_TIMEOUT = 30.0
+
+# Win32 error codes for named pipes
+ERROR_PIPE_BUSY = 231
+ERROR_PIPE_CONNECTED = 535
+
+
+# Output is captured by redirecting stdout, which is process-wide, so commands run one at a time
+_command_lock = threading.Lock()
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening for the current user"""
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon could not run a command"""
+
+
+def _user_tag():
+    if hasattr(os, 'getuid'):
+        return str(os.getuid())
+    return os.environ.get('USERNAME') or str(os.getpid())
+
+
+def runtime_dir():
+    """Per-user directory holding the daemon socket and auth key"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA')
+        path = os.path.join(base or _temp_dir(), 'glorb')
+    else:
+        base = os.environ.get('XDG_RUNTIME_DIR')
+        path = os.path.join(base or _temp_dir(), f'glorb-{_user_tag()}')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def _temp_dir():
+    import tempfile
+    return tempfile.gettempdir()
+
+
+def daemon_address():
+    """Named pipe on Windows, Unix socket elsewhere"""
+    if sys.platform == 'win32':
+        return rf'\\.\pipe\glorb-{_user_tag()}'
+    return os.path.join(runtime_dir(), 'daemon.sock')
+
+
+def _key_path():
+    return os.path.join(runtime_dir(), 'daemon.key')
+
+
+def _write_key(key):
+    fd = os.open(_key_path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(key)
+
+
+def _read_key():
+    try:
+        with open(_key_path(), 'r') as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _read_exact(stream, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def write_message(stream, message):
+    """Send a JSON message prefixed by its 4-byte big-endian length"""
+    data = json.dumps(message, default=str).encode('utf-8')
+    view = memoryview(len(data).to_bytes(4, 'big') + data)
+    while view:
+        view = view[stream.write(view):]
+
+
+def read_message(stream):
+    """Receive one message sent by write_message; raises EOFError or ValueError"""
+    size = int.from_bytes(_read_exact(stream, 4), 'big')
+    if size > MAX_MESSAGE:
+        raise ValueError(f"message of {size} bytes is too large")
+    return json.loads(_read_exact(stream, size).decode('utf-8'))
+
+
+class _SocketStream:
+    """read()/write() over a connected socket, like the file a named pipe opens as"""
+
+    def __init__(self, sock):
+        self._socket = sock
+        self.read = sock.recv
+        self.write = sock.send
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self._socket.close()
+
+
+class _PipeStream:
+    """read()/write() over a named pipe client; a read with nothing arriving for timeout seconds fails"""
+
+    def __init__(self, pipe, timeout):
+        import msvcrt
+        import _winapi
+        self._pipe = pipe
+        self._handle = msvcrt.get_osfhandle(pipe.fileno())
+        self._peek = _winapi.PeekNamedPipe
+        self._timeout = timeout
+        self.write = pipe.write
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def read(self, size):
+        # A pipe opened by open() has no timeout, so wait for data before the blocking read
+        import time
+        deadline = time.monotonic() + self._timeout
+        while not self._peek(self._handle)[0]:
+            if time.monotonic() >= deadline:
+                raise TimeoutError("timed out")
+            time.sleep(0.005)
+        return self._pipe.read(size)
+
+    def close(self):
+        self._pipe.close()
+
+
+def _connect(address, timeout):
+    """Unbuffered binary stream to the daemon whose reads time out after timeout seconds"""
+    if sys.platform == 'win32':
+        try:
+            pipe = open(address, 'r+b', buffering=0)
+        except OSError as e:
+            if getattr(e, 'winerror', None) != ERROR_PIPE_BUSY:
+                raise
+            # The daemon is between connections: wait for its next pipe instance
+            import _winapi
+            _winapi.WaitNamedPipe(address, 2000)
+            pipe = open(address, 'r+b', buffering=0)
+        return _PipeStream(pipe, timeout)
+    # The C module alone: the socket.py wrapper costs more to import than a request takes
+    import _socket
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        # Raises socket.timeout, an OSError, from connect, send or recv
+        sock.settimeout(timeout)
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return _SocketStream(sock)
+
+
+def send_command(command, *params):
+    """Run a manager command inside the daemon, returning (result, output)
+
+    Raises DaemonUnavailable when no daemon answers, including one that
+    accepts the request but does not reply within REPLY_TIMEOUT seconds.
+    """
+    key = _read_key()
+    if not key:
+        raise DaemonUnavailable('no daemon key')
+    try:
+        stream = _connect(daemon_address(), REPLY_TIMEOUT)
+    except OSError as e:
+        raise DaemonUnavailable(str(e))
+    try:
+        write_message(stream, {'key': key, 'command': command, 'params': list(params)})
+        reply = read_message(stream)
+        status, result, output = reply['status'], reply['result'], reply['output']
+    except (EOFError, OSError, ValueError, KeyError, TypeError) as e:
+        raise DaemonUnavailable(str(e) or type(e).__name__)
+    finally:
+        stream.close()
+    if status == 'error':
+        raise DaemonError(result)
+    return result, output
+
+
+def is_running():
+    """Check whether a daemon answers on the current user's address"""
+    try:
+        send_command('ping')
+        return True
+    except (DaemonUnavailable, DaemonError):
+        return False
+
+
+def stop():
+    """Ask a running daemon to exit"""
+    try:
+        send_command('stop')
+        return True
+    except DaemonUnavailable:
+        return False
+
+
+def _decode_params(command, params):
+    """Undo what JSON does to parameters: monitor-ID keys arrive as strings"""
+    params = list(params)
+    if command in _LEVEL_COMMANDS and params and isinstance(params[0], dict):
+        params[0] = {int(monitor_id) if isinstance(monitor_id, str) and monitor_id.isdigit() else monitor_id: level
+                     for monitor_id, level in params[0].items()}
+    return params
+
+
+def run_command(manager, command, params):
+    """Run one whitelisted manager command; returns (status, result, printed output)"""
+    if command == 'ping':
+        return 'ok', True, ''
+    if command not in DAEMON_COMMANDS:
+        return 'error', f'Unknown command: {command}', ''
+    import contextlib
+    params = _decode_params(command, params)
+    output = io.StringIO()
+    with _command_lock, contextlib.redirect_stdout(output):
+        result = getattr(manager, command)(*params)
+    return 'ok', result, output.getvalue()
+
+
+def warm_up(manager):
+    """Prepare a manager that will serve commands for a long time"""
+    import glorb_backend
+    import glorb_gamma
+    # A long-lived manager has to notice monitors being plugged and unplugged, where the backend can
+    if type(manager.backend).watcher is not glorb_backend.Backend.watcher:
+        manager.watch()
+    # Slider drags on software-dimmed monitors should never build a gamma ramp
+    glorb_gamma.precompute()
+
+
+class _SocketListener:
+    """Unix socket accepting one client at a time"""
+
+    def __init__(self, address):
+        import socket
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(address)
+        os.chmod(address, 0o600)
+        self._socket.listen()
+
+    def accept(self):
+        conn, _ = self._socket.accept()
+        conn.settimeout(REQUEST_TIMEOUT)
+        return _SocketStream(conn)
+
+    def close(self):
+        self._socket.close()
+
+
+class _PipeListener:
+    """Windows named pipe; the next instance is created before a client is served, so others can queue"""
+
+    def __init__(self, address):
+        import _winapi
+        self._winapi = _winapi
+        self._address = address
+        self._handle = self._create(_winapi.FILE_FLAG_FIRST_PIPE_INSTANCE)
+
+    def _create(self, flags=0):
+        winapi = self._winapi
+        # Byte-mode pipe: PIPE_TYPE_BYTE and PIPE_READMODE_BYTE are 0
+        return winapi.CreateNamedPipe(self._address, winapi.PIPE_ACCESS_DUPLEX | flags, winapi.PIPE_WAIT,
+                                      winapi.PIPE_UNLIMITED_INSTANCES, 1 << 16, 1 << 16,
+                                      winapi.NMPWAIT_WAIT_FOREVER, winapi.NULL)
+
+    def accept(self):
+        import msvcrt
+        handle = self._handle
+        try:
+            self._winapi.ConnectNamedPipe(handle, False)
+        except OSError as e:
+            if getattr(e, 'winerror', None) != ERROR_PIPE_CONNECTED:
+                self._winapi.CloseHandle(handle)
+                self._handle = self._create()
+                raise
+        self._handle = self._create()
+        return open(msvcrt.open_osfhandle(handle, 0), 'r+b', buffering=0)
+
+    def close(self):
+        self._winapi.CloseHandle(self._handle)
+
+
+def _serve_connection(manager, stream, key):
+    """Answer one request; returns False when the daemon was asked to stop"""
+    import hmac
+    try:
+        request = read_message(stream)
+        if not (isinstance(request, dict) and isinstance(request.get('key'), str)
+                and hmac.compare_digest(request['key'], key)):
+            # Wrong key, or not a glorb client: no reply
+            return True
+        command, params = request.get('command'), request.get('params') or []
+        if command == 'stop':
+            write_message(stream, {'status': 'ok', 'result': True, 'output': ''})
+            return False
+        try:
+            status, result, output = run_command(manager, command, params)
+        except Exception as e:
+            status, result, output = 'error', f'{type(e).__name__}: {e}', ''
+        write_message(stream, {'status': status, 'result': result, 'output': output})
+    except (EOFError, OSError, ValueError):
+        pass
+    return True
+
+
+def serve(manager):
+    """Serve commands against a warm manager until asked to stop"""
+    import contextlib
+    address = daemon_address()
+    if is_running():
+        print(f"Glorb daemon already running at {address}")
+        return False
+    if sys.platform != 'win32' and os.path.exists(address):
+        # Stale socket left behind by a daemon that did not exit cleanly
+        os.unlink(address)
+
+    key = os.urandom(32).hex()
+    listener = _PipeListener(address) if sys.platform == 'win32' else _SocketListener(address)
+    _write_key(key)
+    print(f"Glorb daemon listening on {address}")
+    warm_up(manager)
+
+    try:
+        running = True
+        while running:
+            try:
+                stream = listener.accept()
+            except OSError:
+                continue
+            with stream:
+                running = _serve_connection(manager, stream, key)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        with contextlib.suppress(OSError):
+            os.unlink(_key_path())
+        if sys.platform != 'win32':
+            with contextlib.suppress(OSError):
+                os.unlink(address)
+    print("Glorb daemon stopped")
+    return True
@@ -0,0 +1,228 @@
+"""Deadlines, jittered retries and per-monitor circuit breakers for DDC/CI calls"""
+
+import queue
+import random
+import threading
+import time
+
+import glorb_config
+
+# Seconds for timeout/backoff/cooldown; retries and threshold are counts
+DEFAULTS = {
+    'timeout': 2.0,
+    'retries': 2,
+    'backoff': 0.05,
+    'max_backoff': 1.0,
+    'threshold': 5,
+    'cooldown': 30.0,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Failure tracking for one monitor
+
+    After threshold failed attempts in a row the breaker opens and calls
+    fail immediately. Once cooldown seconds have passed, a single trial call
+    is let through (half-open): success closes the breaker, failure opens it
+    for another cooldown.
+    """
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def allow(self):
+        """Whether a call may go ahead; moves an open breaker to half-open after the cooldown"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self._clock() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+
+    def failure(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.state = OPEN
+            self.opened_at = self._clock()
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial call through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (self._clock() - self.opened_at))
+
+    def describe(self):
+        """Short status for identify, or None while the monitor is healthy"""
+        if self.state == CLOSED:
+            return f"{self.failures} recent DDC/CI failures" if self.failures else None
+        if self.state == HALF_OPEN:
+            return "DDC/CI probing after failures"
+        return f"DDC/CI not responding ({self.last_error}), retry in {self.retry_in():.0f}s"
+
+
+class _Worker:
+    """Daemon thread running one monitor's DDC/CI calls, one after another"""
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name='glorb-ddc', daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        self._jobs.put(job)
+
+    def stop(self):
+        """Exit once the call in progress, if any, has returned"""
+        self._jobs.put(None)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job()
+
+
+class DdcGuard:
+    """Runs DDC/CI calls with a deadline, bounded retries and a breaker per monitor
+
+    call() returns the function's result, or None when every attempt failed,
+    the deadline passed or the monitor's breaker is open. Calls with a
+    deadline run on a worker thread kept per monitor. A call that misses its
+    deadline keeps that worker busy (a blocked DDC/CI transaction cannot be
+    interrupted); until it returns, further calls for that monitor fail at
+    once, counting as failures, instead of queueing behind it.
+
+    pool, if given, is the owner of the keys (e.g. a PhysicalMonitorPool of
+    handles): pool.retain(key) is called before a call is handed to the
+    worker and pool.release(key) after it returns, so a handle whose caller
+    gave up on it is not destroyed while the worker still uses it. Settings
+    come from keyword arguments or GLORB_DDC.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, jitter=random.random, pool=None, **config):
+        self.config = glorb_config.settings(DEFAULTS, 'GLORB_DDC', 'DDC/CI', config)
+        self.pool = pool
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self._breakers = {}
+        self._busy = set()
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.config['threshold'], self.config['cooldown'],
+                                                               self._clock)
+            return breaker
+
+    def describe(self, key):
+        """Breaker status for a monitor, or None if it is healthy or unknown"""
+        with self._lock:
+            breaker = self._breakers.get(key)
+        return breaker.describe() if breaker is not None else None
+
+    def forget(self, key=None):
+        """Drop one monitor's breaker and worker (e.g. its handle was closed), or all of them"""
+        with self._lock:
+            if key is None:
+                self._breakers.clear()
+                workers = list(self._workers.values())
+                self._workers.clear()
+            else:
+                self._breakers.pop(key, None)
+                workers = [self._workers.pop(key)] if key in self._workers else []
+        for worker in workers:
+            worker.stop()
+
+    def _backoff(self, attempt):
+        delay = min(self.config['max_backoff'], self.config['backoff'] * 2 ** attempt)
+        # Equal jitter: never less than half the delay, so retries stay spaced out
+        return delay / 2 + self._jitter() * delay / 2
+
+    def _attempt(self, key, timeout, func, args, kwargs):
+        """(result, error, timed_out) for one attempt"""
+        if not timeout:
+            try:
+                return func(*args, **kwargs), None, False
+            except Exception as e:
+                return None, type(e).__name__, False
+
+        outcome = []
+        done = threading.Event()
+
+        def run():
+            try:
+                outcome.append((func(*args, **kwargs), None))
+            except Exception as e:
+                outcome.append((None, type(e).__name__))
+            finally:
+                # Only now may the pool destroy the handle, even if the caller gave up long ago
+                if self.pool is not None:
+                    self.pool.release(key)
+                with self._lock:
+                    self._busy.discard(key)
+                done.set()
+
+        if self.pool is not None and not self.pool.retain(key):
+            return None, 'handle closed', False
+        with self._lock:
+            self._busy.add(key)
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = self._workers[key] = _Worker()
+        worker.submit(run)
+        if not done.wait(timeout):
+            return None, f"timed out after {timeout:g}s", True
+        return outcome[0] + (False,)
+
+    def call(self, key, func, *args, succeeded=bool, timeout=None, **kwargs):
+        """func(*args, **kwargs) for the monitor identified by key, or None on failure
+
+        timeout overrides the configured deadline for slow requests such as
+        the capabilities string, unless deadlines are turned off (timeout=0).
+        """
+        if timeout is None or not self.config['timeout']:
+            timeout = self.config['timeout']
+        breaker = self.breaker(key)
+        with self._lock:
+            if not breaker.allow():
+                return None
+            if key in self._busy:
+                # Still stuck on a request that missed its deadline
+                breaker.failure('no answer to an earlier request')
+                return None
+        # A half-open trial gets a single attempt
+        attempts = 1 if breaker.state == HALF_OPEN else self.config['retries'] + 1
+        for attempt in range(attempts):
+            if attempt:
+                self._sleep(self._backoff(attempt - 1))
+            result, error, timed_out = self._attempt(key, timeout, func, args, kwargs)
+            with self._lock:
+                if error is None and succeeded(result):
+                    breaker.success()
+                    return result
+                breaker.failure(error or 'call failed')
+                if timed_out or breaker.state == OPEN:
+                    # The monitor is still busy with the abandoned call, or has been given up on
+                    return None
+        return None
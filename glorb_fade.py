@@ -0,0 +1,141 @@
+"""Rate-limited, coalescing brightness fades"""
+
+import contextlib
+import threading
+import time
+
+# Minimum seconds between two brightness writes to the same monitor
+DEFAULT_MIN_INTERVAL = 0.05
+
+class FadeScheduler:
+    """Drive one monitor's brightness toward a target over time
+
+    write(percent) is a synchronous brightness setter returning True on
+    success. A worker thread issues at most one write per min_interval and,
+    each time the bus is free, writes the value the fade should have *now*:
+    when writes are slow the intermediate steps are skipped instead of
+    queued, and a new target simply replaces the one in flight.
+
+    lock, if given, is held around each write together with the check that
+    the fade was not cancelled or retargeted since the value was chosen. A
+    caller that cancels the fade and then writes under the same lock can
+    never be overwritten by a step that was already on its way.
+    """
+
+    def __init__(self, write, current=None, min_interval=DEFAULT_MIN_INTERVAL, clock=time.monotonic, lock=None):
+        self._write = write
+        self._lock = lock if lock is not None else contextlib.nullcontext()
+        self._clock = clock
+        self.min_interval = min_interval
+        self.current = current
+        self.writes = 0
+        self.failures = 0
+        self._fade = None
+        # Bumped by every fade_to() and cancel(), so a worker can tell its value went stale
+        self._generation = 0
+        self._next_write = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='glorb-fade', daemon=True)
+        self._thread.start()
+
+    def fade_to(self, target, duration=0.0):
+        """Start fading to target (0-100) over duration seconds, superseding any fade in progress"""
+        target = max(0, min(100, int(target)))
+        with self._cond:
+            start = self.current if self.current is not None else target
+            self._fade = (start, target, self._clock(), max(0.0, duration))
+            self._generation += 1
+            self._cond.notify_all()
+
+    def cancel(self, current=None):
+        """Abandon the fade in progress, e.g. after a direct brightness write"""
+        with self._cond:
+            self._fade = None
+            self._generation += 1
+            if current is not None:
+                self.current = current
+            self._cond.notify_all()
+
+    def _value_at(self, now):
+        start, target, began, duration = self._fade
+        if duration <= 0 or now >= began + duration or start == target:
+            return target, True
+        return round(start + (target - start) * (now - began) / duration), False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._fade is None:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                now = self._clock()
+                if now < self._next_write:
+                    self._cond.wait(self._next_write - now)
+                    continue
+                fade, generation = self._fade, self._generation
+                value, finished = self._value_at(now)
+                if value == self.current:
+                    if finished:
+                        self._fade = None
+                        self._cond.notify_all()
+                    else:
+                        # Nothing visible changes until the next whole percent
+                        self._cond.wait(self.min_interval)
+                    continue
+
+            write_start = self._clock()
+            with self._lock:
+                with self._cond:
+                    stale = self._generation != generation
+                if stale:
+                    # Cancelled or retargeted while this value was chosen: pick again
+                    continue
+                try:
+                    ok = self._write(value)
+                except Exception:
+                    ok = False
+
+            with self._cond:
+                self._next_write = write_start + self.min_interval
+                if ok:
+                    self.writes += 1
+                    # After a cancel() during this write, current is the value the canceller writes next
+                    if self._generation == generation or self._fade is not None:
+                        self.current = value
+                else:
+                    self.failures += 1
+                # Give up on a fade the monitor refuses, unless it was superseded meanwhile
+                if self._fade is fade and (finished or not ok):
+                    self._fade = None
+                self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until the current fade has finished; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._fade is None or self._closed, timeout)
+
+    @property
+    def busy(self):
+        return self._fade is not None
+
+    def close(self):
+        """Stop the worker thread, abandoning any fade in progress"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+def parse_duration(text):
+    """Parse '500ms', '1.5s' or bare seconds into seconds"""
+    text = text.strip().lower()
+    try:
+        if text.endswith('ms'):
+            return float(text[:-2]) / 1000.0
+        if text.endswith('s'):
+            return float(text[:-1])
+        return float(text)
+    except ValueError:
+        raise ValueError(f"invalid duration '{text}' (expected e.g. 500ms or 1.5s)")
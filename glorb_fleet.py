@@ -0,0 +1,488 @@
+"""Fleet control: a TCP agent serving MonitorManager commands, and a pooled, pipelining controller
+
+The agent and controller share a secret key. Each connection starts with
+both sides sending a random nonce and proving, with an HMAC over both
+nonces, that they hold the key; the nonces and key also give the
+connection its own session key. After that, every length-prefixed JSON
+message carries an HMAC-SHA256 under the session key over its direction,
+its sequence number on the connection and its body, so a message that was
+altered, replayed, reordered or reflected back ends the connection. The
+controller may send many requests before reading the replies, which come
+back in order. Traffic is authenticated but not encrypted.
+"""
+
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import glorb_config
+import glorb_daemon
+
+DEFAULT_PORT = 7719
+# Seconds to connect and to wait for each reply
+DEFAULT_TIMEOUT = 10.0
+# Hosts contacted at once by fan_out
+MAX_HOST_WORKERS = 64
+# Largest message either side accepts
+MAX_MESSAGE = 1 << 20
+# Bytes of random nonce each side contributes to the handshake
+NONCE_SIZE = 16
+MAC_SIZE = hashlib.sha256().digest_size
+# Direction labels bound into every MAC, so a message cannot be reflected back to its sender
+CONTROLLER = b'controller'
+AGENT = b'agent'
+
+
+class FleetError(Exception):
+    """Raised when a host cannot be reached or answers out of protocol"""
+
+
+def key_path():
+    return os.path.join(glorb_config.config_dir(), 'fleet.key')
+
+
+def load_key(path=None):
+    """Shared secret from GLORB_FLEET_KEY or the key file, or None"""
+    key = os.environ.get('GLORB_FLEET_KEY')
+    if key:
+        return key.strip().encode('utf-8')
+    try:
+        with open(path or key_path(), 'rb') as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+def create_key(path=None):
+    """Write a new random key file readable only by the current user; returns the key"""
+    path = path or key_path()
+    key = os.urandom(32).hex().encode('ascii')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(key + b'\n')
+    return key
+
+
+def parse_address(text, default_host='0.0.0.0'):
+    """(host, port) from 'host', 'host:port', ':port', '[addr]', '[addr]:port' or a bare IPv6 address"""
+    text = text.strip()
+    if text.startswith('['):
+        host, bracket, rest = text[1:].partition(']')
+        if not bracket or (rest and not rest.startswith(':')):
+            raise ValueError(f"invalid address '{text}'")
+        port = rest[1:]
+    elif text.count(':') > 1:
+        host, port = text, ''
+    else:
+        host, _, port = text.partition(':')
+    return host or default_host, int(port) if port else DEFAULT_PORT
+
+
+def format_address(address):
+    """'host:port', with IPv6 addresses in brackets so parse_address reads them back"""
+    host, port = address[:2]
+    return f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+
+
+def load_hosts(text):
+    """Agent addresses from a hosts file (one per line, # comments) or a comma-separated list"""
+    if os.path.isfile(text):
+        with open(text, 'r', encoding='utf-8') as fh:
+            entries = [line.split('#', 1)[0].strip() for line in fh]
+    else:
+        entries = [entry.strip() for entry in text.split(',')]
+    return [entry for entry in entries if entry]
+
+
+def _no_delay(sock):
+    """Send small messages at once: the handshake and pipelined requests would wait on delayed ACKs"""
+    with contextlib.suppress(OSError):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _mac(key, *parts):
+    return hmac.new(key, b''.join(parts), hashlib.sha256).digest()
+
+
+class _Channel:
+    """Length-prefixed JSON messages over a connected socket
+
+    Until authenticate() is called messages go out bare, as the handshake
+    needs; afterwards each body is preceded by its MAC, and recv() raises
+    FleetError for a message whose MAC does not match.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._session = None
+        self._send_label = self._recv_label = b''
+        self._sent = 0
+        self._received = 0
+
+    def authenticate(self, session, send_label, recv_label):
+        self._session = session
+        self._send_label, self._recv_label = send_label, recv_label
+
+    def _frame(self, message):
+        """The bytes that send() writes for a message; counts it as sent"""
+        body = json.dumps(message, default=str).encode('utf-8')
+        if self._session is not None:
+            body = _mac(self._session, self._send_label, self._sent.to_bytes(8, 'big'), body) + body
+            self._sent += 1
+        return len(body).to_bytes(4, 'big') + body
+
+    def send(self, message):
+        self.sock.sendall(self._frame(message))
+
+    def _read_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("connection closed")
+            data += chunk
+        return bytes(data)
+
+    def recv(self, timeout=None):
+        """Next message, waiting at most timeout seconds (None waits for ever)"""
+        self.sock.settimeout(timeout)
+        try:
+            size = int.from_bytes(self._read_exact(4), 'big')
+            if size > MAX_MESSAGE + MAC_SIZE:
+                raise FleetError(f"message of {size} bytes is too large")
+            body = self._read_exact(size)
+        except socket.timeout:
+            # Not TimeoutError: the two are one class only from Python 3.10
+            raise FleetError(f"no reply within {timeout:g}s")
+        if self._session is not None:
+            mac, body = body[:MAC_SIZE], body[MAC_SIZE:]
+            expected = _mac(self._session, self._recv_label, self._received.to_bytes(8, 'big'), body)
+            if not hmac.compare_digest(mac, expected):
+                raise FleetError("message failed authentication")
+            self._received += 1
+        try:
+            message = json.loads(body.decode('utf-8'))
+        except ValueError:
+            raise FleetError("malformed message")
+        if not isinstance(message, dict):
+            raise FleetError("malformed message")
+        return message
+
+    def shutdown(self):
+        with contextlib.suppress(OSError):
+            self.sock.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self.sock.close()
+
+
+def _nonce(message):
+    """A peer's nonce from a handshake message, as bytes"""
+    try:
+        nonce = bytes.fromhex(message['nonce'])
+    except (KeyError, TypeError, ValueError):
+        raise FleetError("malformed handshake")
+    if len(nonce) != NONCE_SIZE:
+        raise FleetError("malformed handshake")
+    return nonce
+
+
+def _check_proof(message, expected):
+    proof = message.get('proof')
+    if not (isinstance(proof, str) and hmac.compare_digest(proof, expected.hex())):
+        raise FleetError("authentication failed: wrong key")
+
+
+def _accept_handshake(channel, key):
+    """Agent side: check the controller holds the key, prove we do, and switch to the session key"""
+    agent_nonce = os.urandom(NONCE_SIZE)
+    channel.send({'nonce': agent_nonce.hex()})
+    reply = channel.recv(DEFAULT_TIMEOUT)
+    nonces = agent_nonce + _nonce(reply)
+    _check_proof(reply, _mac(key, CONTROLLER, nonces))
+    channel.send({'proof': _mac(key, AGENT, nonces).hex()})
+    channel.authenticate(_mac(key, b'session', nonces), AGENT, CONTROLLER)
+
+
+def _open_handshake(channel, key, timeout):
+    """Controller side of _accept_handshake"""
+    nonces = _nonce(channel.recv(timeout))
+    client_nonce = os.urandom(NONCE_SIZE)
+    nonces += client_nonce
+    channel.send({'nonce': client_nonce.hex(), 'proof': _mac(key, CONTROLLER, nonces).hex()})
+    _check_proof(channel.recv(timeout), _mac(key, AGENT, nonces))
+    channel.authenticate(_mac(key, b'session', nonces), CONTROLLER, AGENT)
+
+
+def _listen(host, port):
+    """Listening TCP socket for an IPv4 or IPv6 address; what socket.create_server does from Python 3.8"""
+    family, _, _, _, sockaddr = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE)[0]
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        # A restarted agent can listen again at once; on Windows this option would let others take the port
+        if os.name != 'nt':
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if family == socket.AF_INET6 and host == '::':
+            # Also take IPv4 clients where the system allows it
+            with contextlib.suppress(AttributeError, OSError):
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        sock.bind(sockaddr)
+        sock.listen()
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class Agent:
+    """Serves glorb_daemon.DAEMON_COMMANDS to authenticated controllers over TCP
+
+    Every connection gets its own thread and may stay open for any number
+    of requests. Commands still run one at a time (see
+    glorb_daemon.run_command).
+    """
+
+    def __init__(self, manager, key, address=('0.0.0.0', DEFAULT_PORT)):
+        self.manager = manager
+        self.key = key
+        self._listener = _listen(*address)
+        self.address = self._listener.getsockname()[:2]
+        self._stopping = False
+        self._thread = None
+        self._open = set()
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _serve_connection(self, sock):
+        _no_delay(sock)
+        conn = _Channel(sock)
+        # The handshake runs on the connection's thread, so a stalled client cannot block accept()
+        try:
+            _accept_handshake(conn, self.key)
+        except (EOFError, OSError, FleetError):
+            conn.close()
+            return
+        with self._lock:
+            self.connections += 1
+            self._open.add(conn)
+        try:
+            while not self._stopping:
+                request = conn.recv()
+                try:
+                    command = request['command']
+                    params = request.get('params', [])
+                    status, result, output = glorb_daemon.run_command(self.manager, command, params)
+                except Exception as e:
+                    status, result, output = 'error', f'{type(e).__name__}: {e}', ''
+                with self._lock:
+                    self.requests += 1
+                conn.send({'id': request.get('id'), 'status': status, 'result': result, 'output': output})
+        except (EOFError, OSError, FleetError):
+            pass
+        finally:
+            with self._lock:
+                self._open.discard(conn)
+            conn.close()
+
+    def serve_forever(self):
+        """Accept connections until stop() is called"""
+        while not self._stopping:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                if self._stopping:
+                    break
+                continue
+            if self._stopping:
+                conn.close()
+                break
+            threading.Thread(target=self._serve_connection, args=(conn,), name='glorb-agent',
+                             daemon=True).start()
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        self._thread = threading.Thread(target=self.serve_forever, name='glorb-agent-listener', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping = True
+        # Closing the socket does not wake a blocked accept() everywhere; a dummy connection does
+        host, port = self.address
+        host = {'0.0.0.0': '127.0.0.1', '::': '::1'}.get(host, host)
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self._listener.close()
+        # Wake connection threads blocked reading, so controllers see the agent go away
+        with self._lock:
+            open_connections = list(self._open)
+        for conn in open_connections:
+            conn.shutdown()
+
+
+class FleetClient:
+    """Controller side: pooled, authenticated connections to many agents
+
+    Connections are opened on first use and kept for later calls, so a
+    schedule pushed every few minutes pays the TCP connect and handshake
+    once per host. pipeline() sends a batch of commands to one host before
+    reading any reply; fan_out() runs a batch on many hosts concurrently.
+    """
+
+    def __init__(self, key, timeout=DEFAULT_TIMEOUT, max_workers=MAX_HOST_WORKERS):
+        self.key = key
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.connects = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _connect(self, address):
+        try:
+            sock = socket.create_connection(address, timeout=self.timeout)
+        except OSError as e:
+            raise FleetError(f"cannot connect: {e}")
+        _no_delay(sock)
+        conn = _Channel(sock)
+        try:
+            _open_handshake(conn, self.key, self.timeout)
+        except FleetError:
+            conn.close()
+            raise
+        except EOFError:
+            conn.close()
+            # An agent that rejects the key closes the connection without a word
+            raise FleetError("authentication failed: the agent closed the connection")
+        except OSError as e:
+            conn.close()
+            raise FleetError(f"connection lost: {e}")
+        with self._lock:
+            self.connects += 1
+        return conn
+
+    def _acquire(self, address):
+        """(connection, reused) for a host, taking an idle pooled one when there is one"""
+        with self._lock:
+            idle = self._idle.get(address)
+            if idle:
+                return idle.pop(), True
+        return self._connect(address), False
+
+    def _release(self, address, conn):
+        with self._lock:
+            self._idle.setdefault(address, []).append(conn)
+
+    def _exchange(self, conn, calls):
+        with self._lock:
+            first = self._next_id
+            self._next_id += len(calls)
+        for offset, (command, params) in enumerate(calls):
+            conn.send({'id': first + offset, 'command': command, 'params': list(params)})
+        replies = []
+        for offset in range(len(calls)):
+            reply = conn.recv(self.timeout)
+            if reply.get('id') != first + offset:
+                raise FleetError("reply out of order")
+            replies.append(reply)
+        return replies
+
+    def pipeline(self, host, calls):
+        """Run [(command, params), ...] on one agent; returns its replies in order
+
+        Each reply is a dict with status ('ok' or 'error'), result and the
+        command's printed output. Raises FleetError if the host cannot be
+        reached.
+        """
+        address = parse_address(host, 'localhost')
+        conn, reused = self._acquire(address)
+        try:
+            replies = self._exchange(conn, calls)
+        except (EOFError, OSError) as e:
+            conn.close()
+            if not reused:
+                raise FleetError(f"connection lost: {e}")
+            # The agent restarted or dropped an idle connection: retry once on a fresh one
+            conn = self._connect(address)
+            try:
+                replies = self._exchange(conn, calls)
+            except (EOFError, OSError) as e:
+                conn.close()
+                raise FleetError(f"connection lost: {e}")
+        except Exception:
+            conn.close()
+            raise
+        self._release(address, conn)
+        return replies
+
+    def call(self, host, command, *params):
+        """Run one command on one agent; returns its reply"""
+        return self.pipeline(host, [(command, params)])[0]
+
+    def fan_out(self, hosts, calls):
+        """Run the same batch of calls on every host concurrently
+
+        Returns {host: {'ok', 'replies', 'error', 'elapsed'}}; ok is True
+        when the host answered and every command succeeded.
+        """
+        def run(host):
+            began = time.perf_counter()
+            try:
+                replies = self.pipeline(host, calls)
+                error = next((reply['result'] for reply in replies if reply['status'] != 'ok'), None)
+                ok = error is None and all(reply['result'] is not False for reply in replies)
+            except FleetError as e:
+                replies, ok, error = [], False, str(e)
+            return host, {'ok': ok, 'replies': replies, 'error': error, 'elapsed': time.perf_counter() - began}
+
+        hosts = list(hosts)
+        if not hosts:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(hosts))) as pool:
+            return dict(pool.map(run, hosts))
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+
+def serve(manager, key, address):
+    """Run an agent in the foreground until interrupted"""
+    try:
+        agent = Agent(manager, key, address)
+    except OSError as e:
+        print(f"Error: cannot listen on {format_address(address)}: {e}")
+        return False
+    print(f"Glorb agent listening on {format_address(agent.address)}")
+    glorb_daemon.warm_up(manager)
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+    print("Glorb agent stopped")
+    return True
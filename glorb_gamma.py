@@ -0,0 +1,146 @@
+"""Software dimming and color temperature through a display's gamma ramp
+
+Monitors without DDC/CI (TVs, many USB-C and budget panels) can still be
+dimmed by loading a scaled gamma ramp into the graphics card. A ramp is
+three 256-entry tables of 16-bit values (red, green, blue), laid out like
+the Win32 GAMMARAMP structure. Ramps are built a whole channel at a time
+and kept in an LRU cache keyed by (brightness, color temperature), so
+fades and slider drags that revisit a level reuse the same bytes.
+"""
+
+import array
+import functools
+import math
+import operator
+from itertools import repeat
+
+import glorb_cache
+from glorb_config import MAX_KELVIN, MIN_KELVIN, NEUTRAL_KELVIN
+
+RAMP_SIZE = 256
+# Temperatures are rounded to this step so nearby requests share a ramp
+KELVIN_STEP = 100
+# Share of full output left at 0%, so a dimmed display never goes black
+FLOOR = 0.1
+# Every brightness level at ten color temperatures
+RAMP_CACHE_SIZE = 1010
+# Furthest SetDeviceGammaRamp lets an entry fall below the identity ramp; Windows rejects
+# deeper ramps (dimming below about half, extreme temperatures) unless GdiIcmGammaRange is raised
+WIN32_MAX_DEVIATION = 0x7FFF
+
+# Bumped whenever the saved per-output levels change shape
+LEVELS_FORMAT = 1
+
+# Identity ramp: 0, 257, ... 65535
+_IDENTITY = tuple(index * 257 for index in range(RAMP_SIZE))
+
+
+def normalize(percent, kelvin=None):
+    """(percent, kelvin) clamped and rounded to the values ramps are cached for"""
+    percent = max(0, min(100, int(round(percent))))
+    kelvin = NEUTRAL_KELVIN if kelvin is None else kelvin
+    kelvin = max(MIN_KELVIN, min(MAX_KELVIN, int(round(kelvin / KELVIN_STEP)) * KELVIN_STEP))
+    return percent, kelvin
+
+
+def _blackbody(kelvin):
+    """Approximate sRGB color (0-1 per channel) of a black body at this temperature"""
+    temperature = kelvin / 100.0
+    if temperature <= 66:
+        red = 1.0
+        green = (99.4708025861 * math.log(temperature) - 161.1195681661) / 255
+    else:
+        red = 329.698727446 * (temperature - 60) ** -0.1332047592 / 255
+        green = 288.1221695283 * (temperature - 60) ** -0.0755148492 / 255
+    if temperature >= 66:
+        blue = 1.0
+    elif temperature <= 19:
+        blue = 0.0
+    else:
+        blue = (138.5177312231 * math.log(temperature - 10) - 305.0447927307) / 255
+    return tuple(max(0.0, min(1.0, channel)) for channel in (red, green, blue))
+
+
+@functools.lru_cache(maxsize=None)
+def whitepoint(kelvin):
+    """Per-channel multipliers for a color temperature, (1, 1, 1) at NEUTRAL_KELVIN"""
+    neutral = _blackbody(NEUTRAL_KELVIN)
+    return tuple(min(1.0, channel / reference) for channel, reference in zip(_blackbody(kelvin), neutral))
+
+
+def factors(percent, kelvin=None):
+    """(red, green, blue) output scale for a brightness (0-100) and color temperature"""
+    percent, kelvin = normalize(percent, kelvin)
+    level = FLOOR + (1.0 - FLOOR) * percent / 100.0
+    return tuple(level * channel for channel in whitepoint(kelvin))
+
+
+@functools.lru_cache(maxsize=RAMP_CACHE_SIZE)
+def _ramp(percent, kelvin):
+    table = array.array('H')
+    for factor in factors(percent, kelvin):
+        # Scales the whole identity channel in one pass at C speed
+        table.extend(map(int, map(operator.mul, _IDENTITY, repeat(factor))))
+    return table.tobytes()
+
+
+def ramp(percent, kelvin=None):
+    """Gamma ramp bytes (3 x 256 native-endian WORDs) for a brightness (0-100) and color temperature"""
+    return _ramp(*normalize(percent, kelvin))
+
+
+@functools.lru_cache(maxsize=RAMP_CACHE_SIZE)
+def _limited_ramp(percent, kelvin, max_deviation):
+    table = array.array('H', _ramp(percent, kelvin))
+    lowest = [max(0, value - max_deviation) for value in _IDENTITY] * 3
+    limited = array.array('H', map(max, table, lowest))
+    return limited.tobytes(), limited != table
+
+
+def limited_ramp(percent, kelvin=None, max_deviation=WIN32_MAX_DEVIATION):
+    """(ramp bytes, clamped): ramp() raised where it falls more than max_deviation below the identity ramp
+
+    Raising entries to a rising bound keeps every channel monotonic; clamped
+    tells whether the ramp had to give up some of the dimming or tint.
+    """
+    return _limited_ramp(*normalize(percent, kelvin), max_deviation)
+
+
+def channels(table):
+    """Split ramp bytes back into (red, green, blue) arrays of RAMP_SIZE values"""
+    values = array.array('H')
+    values.frombytes(table)
+    return tuple(values[start:start + RAMP_SIZE] for start in range(0, 3 * RAMP_SIZE, RAMP_SIZE))
+
+
+def precompute(kelvin=None):
+    """Build the ramps for every brightness level at one color temperature ahead of use"""
+    for percent in range(101):
+        ramp(percent, kelvin)
+
+
+def cache_info():
+    return _ramp.cache_info()
+
+
+def clear_cache():
+    _ramp.cache_clear()
+    _limited_ramp.cache_clear()
+
+
+def load_levels(backend_name):
+    """{output name: (percent, kelvin)} of the ramps glorb left loaded on a backend's outputs
+
+    Ramps outlive the process that loads them, so the next run needs to
+    know them to change brightness without losing the color temperature.
+    """
+    saved = glorb_cache.load('gamma', LEVELS_FORMAT) or {}
+    return {name: tuple(level) for name, level in saved.get(backend_name, {}).items()}
+
+
+def store_levels(backend_name, levels):
+    """Save {output name: (percent, kelvin)}; outputs back at full neutral output are dropped"""
+    saved = glorb_cache.load('gamma', LEVELS_FORMAT) or {}
+    neutral = (100, NEUTRAL_KELVIN)
+    saved[backend_name] = {name: list(level) for name, level in levels.items() if tuple(level) != neutral}
+    return glorb_cache.store('gamma', LEVELS_FORMAT, saved)
@@ -0,0 +1,214 @@
+"""Display hotplug watchers that wake only when the kernel or window system reports a change"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import socket
+import struct
+import threading
+
+DRM_ROOT = '/sys/class/drm'
+
+# Seconds to let a burst of hotplug events settle before re-enumerating
+DEFAULT_SETTLE = 0.2
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# Kernel uevents (the stream udev itself listens to)
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+
+
+def diff_displays(old, new):
+    """Compare two display lists by id; returns (added, removed, changed) lists of displays"""
+    before = {display['id']: display for display in old}
+    after = {display['id']: display for display in new}
+    added = [display for display_id, display in after.items() if display_id not in before]
+    removed = [display for display_id, display in before.items() if display_id not in after]
+    changed = [display for display_id, display in after.items()
+               if display_id in before and before[display_id] != display]
+    return added, removed, changed
+
+
+class DisplayWatcher:
+    """Background listener that calls on_change() once per burst of display events
+
+    Subclasses implement _run(), which blocks until an event arrives and
+    calls _notify(), and _wake(), which makes _run() return. Nothing runs
+    between events, so an idle watcher costs no CPU.
+    """
+
+    def __init__(self, on_change, settle=DEFAULT_SETTLE):
+        self.on_change = on_change
+        self.settle = settle
+        self.events = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._thread = None
+        self._stopping = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=f"glorb-{type(self).__name__}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _notify(self):
+        """Schedule on_change() shortly after the first event of a burst"""
+        with self._lock:
+            self.events += 1
+            if self._timer is None and not self._stopping:
+                self._timer = threading.Timer(self.settle, self._fire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Error handling display change: {e}")
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _wake(self):
+        raise NotImplementedError
+
+
+class LinuxDisplayWatcher(DisplayWatcher):
+    """DRM connector changes from kernel uevents and inotify on the DRM class directory
+
+    Kernel uevents carry real hotplug (sysfs attributes never raise
+    inotify events); inotify covers connectors appearing or disappearing
+    and lets a temporary directory tree stand in for /sys/class/drm
+    (root argument or GLORB_DRM_ROOT).
+    """
+
+    def __init__(self, on_change, settle=DEFAULT_SETTLE, root=None, uevents=None):
+        super().__init__(on_change, settle)
+        self.root = root or os.environ.get('GLORB_DRM_ROOT') or DRM_ROOT
+        self.uevents = self.root == DRM_ROOT if uevents is None else uevents
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._inotify = None
+        self._watches = {}
+        self._uevent_socket = None
+        self._wake_r = self._wake_w = None
+
+    def _open(self):
+        self._wake_r, self._wake_w = os.pipe()
+        fds = [self._wake_r]
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd >= 0:
+            self._inotify = fd
+            self._sync_watches()
+            fds.append(fd)
+        if self.uevents and hasattr(socket, 'AF_NETLINK'):
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+                sock.bind((0, UEVENT_KERNEL_GROUP))
+                self._uevent_socket = sock
+                fds.append(sock.fileno())
+            except OSError:
+                pass
+        return fds
+
+    def _sync_watches(self):
+        """Watch the root and every connector directory below it"""
+        paths = [self.root]
+        try:
+            paths += [os.path.join(self.root, entry) for entry in os.listdir(self.root)]
+        except OSError:
+            pass
+        for path in paths:
+            if path not in self._watches and os.path.isdir(path):
+                wd = self._libc.inotify_add_watch(self._inotify, os.fsencode(path), WATCH_MASK)
+                if wd >= 0:
+                    self._watches[path] = wd
+        for path in [path for path in self._watches if not os.path.isdir(path)]:
+            del self._watches[path]
+
+    def _drain_inotify(self):
+        try:
+            data = os.read(self._inotify, 4096)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            if mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO):
+                # A connector came or went: follow it
+                self._sync_watches()
+                break
+            offset += INOTIFY_EVENT.size + name_length
+        return True
+
+    def _drain_uevent(self):
+        message = self._uevent_socket.recv(8192)
+        return b'\0SUBSYSTEM=drm\0' in message
+
+    def _run(self):
+        fds = self._open()
+        try:
+            while not self._stopping:
+                ready, _, _ = select.select(fds, [], [])
+                if self._wake_r in ready:
+                    break
+                relevant = False
+                if self._inotify in ready:
+                    relevant |= self._drain_inotify()
+                if self._uevent_socket is not None and self._uevent_socket.fileno() in ready:
+                    relevant |= self._drain_uevent()
+                if relevant:
+                    self._notify()
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._inotify is not None:
+            os.close(self._inotify)
+            self._inotify = None
+        self._watches = {}
+        if self._uevent_socket is not None:
+            self._uevent_socket.close()
+            self._uevent_socket = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._wake_r = self._wake_w = None
+
+    def _wake(self):
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'x')
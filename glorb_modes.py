@@ -0,0 +1,85 @@
+"""Indexed catalog of the display modes a monitor reports"""
+
+def format_mode(width, height, frequency=None):
+    """Render a mode as WxH or WxH@FHz"""
+    mode = f"{width}x{height}"
+    return f"{mode}@{frequency}Hz" if frequency else mode
+
+class ModeCatalog:
+    """Deduplicated display modes with indexes by resolution and refresh rate
+
+    Built once from the raw (width, height, frequency, bits_per_pixel) tuples
+    a display enumerates; every query afterwards is a dict lookup or a scan
+    of the much smaller per-resolution index.
+    """
+
+    def __init__(self, modes, preferred=None):
+        # dict keys dedup in O(1) and keep enumeration order
+        self._modes = dict.fromkeys(tuple(mode) for mode in modes)
+        self._preferred = preferred
+        self._by_resolution = {}
+        self._by_refresh = {}
+        for width, height, frequency, _ in self._modes:
+            self._by_resolution.setdefault((width, height), set()).add(frequency)
+            self._by_refresh.setdefault(frequency, set()).add((width, height))
+
+    def __len__(self):
+        return len(self._modes)
+
+    def modes(self):
+        """All modes as dicts, in the order the display reported them"""
+        return [{'width': width, 'height': height, 'frequency': frequency, 'bits_per_pixel': bits_per_pixel}
+                for width, height, frequency, bits_per_pixel in self._modes]
+
+    def resolutions(self):
+        """Distinct (width, height) pairs, largest first"""
+        return sorted(self._by_resolution, key=lambda size: (size[0] * size[1], size), reverse=True)
+
+    def refresh_rates(self, width, height):
+        """Refresh rates available at a resolution, highest first"""
+        return sorted(self._resolution_rates(width, height), reverse=True)
+
+    def best_refresh(self, width, height):
+        """Highest refresh rate available at a resolution, or None"""
+        rates = self._resolution_rates(width, height)
+        return max(rates) if rates else None
+
+    def native_mode(self):
+        """(width, height, frequency) of the panel's preferred mode
+
+        When the platform does not flag a preferred timing (DEVMODE
+        enumeration does not), the largest resolution at its best refresh
+        rate stands in for it.
+        """
+        if self._preferred:
+            return tuple(self._preferred)
+        if not self._by_resolution:
+            return None
+        width, height = self.resolutions()[0]
+        return width, height, self.best_refresh(width, height)
+
+    def at_least(self, min_refresh):
+        """(width, height, frequency) modes at or above a refresh rate, fastest first"""
+        found = [(width, height, frequency)
+                 for frequency, sizes in self._by_refresh.items() if frequency >= min_refresh
+                 for width, height in sizes]
+        return sorted(found, key=lambda mode: (mode[2], mode[0] * mode[1]), reverse=True)
+
+    def supports(self, width, height, frequency=None, quarter_turn=False):
+        """Whether the display reports a resolution, optionally at a given refresh rate
+
+        quarter_turn: the mode is for the display after a rotation between
+        landscape and portrait, so it may be listed with width and height
+        swapped.
+        """
+        rates = self._resolution_rates(width, height, quarter_turn)
+        if frequency:
+            return frequency in rates
+        return bool(rates)
+
+    def _resolution_rates(self, width, height, quarter_turn=False):
+        rates = self._by_resolution.get((width, height))
+        if not rates and quarter_turn:
+            # Modes are listed in the current orientation; the rotated display takes them transposed
+            rates = self._by_resolution.get((height, width))
+        return rates or set()
@@ -0,0 +1,111 @@
+"""Named desk layouts: per-monitor rotation, mode and brightness, keyed by monitor identity"""
+
+import glorb_config
+from glorb_backend import ROTATIONS
+
+
+def load_all():
+    """{name: profile} for every saved profile"""
+    return glorb_config.read_config('profiles.json')
+
+
+def load(name):
+    """The profile saved under name, or None"""
+    return load_all().get(name)
+
+
+def save(name, profile):
+    """Atomically store profile under name, keeping the other profiles"""
+    profiles = load_all()
+    profiles[name] = profile
+    return glorb_config.write_config('profiles.json', profiles)
+
+
+def monitor_key(display):
+    """Identity of the monitor behind a display, independent of enumeration order
+
+    The hardware ID names the monitor model; the device or connector name
+    tells two identical monitors apart.
+    """
+    hardware_id = display.get('hardware_id')
+    return f"{hardware_id}/{display['name']}" if hardware_id else display['name']
+
+
+def capture(displays, brightness):
+    """Profile of the current layout; brightness maps display ids to percentages or None"""
+    monitors = {}
+    for display in displays:
+        monitors[monitor_key(display)] = {
+            'name': display['name'],
+            'hardware_id': display.get('hardware_id'),
+            'rotation': ROTATIONS[display.get('orientation') or 0],
+            'width': display.get('width'),
+            'height': display.get('height'),
+            'frequency': display.get('frequency'),
+            'brightness': brightness.get(display['id']),
+        }
+    return {'monitors': monitors}
+
+
+def match(profile, displays):
+    """Pair profile entries with live displays; returns ([(display, entry)...], [unmatched keys])
+
+    An exact identity wins; otherwise a hardware ID seen on only one display,
+    so a monitor moved to another port keeps its settings; otherwise the
+    device name alone.
+    """
+    entries = dict(profile.get('monitors', {}))
+    by_key = {monitor_key(display): display for display in displays}
+    by_hardware = {}
+    for display in displays:
+        if display.get('hardware_id'):
+            by_hardware.setdefault(display['hardware_id'], []).append(display)
+    by_name = {display['name']: display for display in displays}
+
+    pairs = []
+    used = set()
+    for key in list(entries):
+        display = by_key.get(key)
+        if display is not None:
+            pairs.append((display, entries.pop(key)))
+            used.add(display['id'])
+    for key, entry in list(entries.items()):
+        candidates = [display for display in by_hardware.get(entry.get('hardware_id'), ()) if display['id'] not in used]
+        display = candidates[0] if len(candidates) == 1 else None
+        if display is None:
+            named = by_name.get(entry['name'])
+            if named is not None and named.get('hardware_id') == entry.get('hardware_id'):
+                display = named
+        if display is not None and display['id'] not in used:
+            pairs.append((display, entries.pop(key)))
+            used.add(display['id'])
+    return pairs, sorted(entries)
+
+
+def diff(pairs, brightness):
+    """Operations that move the matched displays to their profile entries
+
+    Returns (changes, levels): (monitor_id, 'rotate'|'mode', value) tuples for
+    MonitorManager.apply and {monitor_id: percent} for brightness writes.
+    Settings the display already has, or the profile does not record, are
+    left out.
+    """
+    changes = []
+    levels = {}
+    for display, entry in pairs:
+        monitor_id = display['id']
+        width, height = display.get('width'), display.get('height')
+        rotation = ROTATIONS[display.get('orientation') or 0]
+        if entry.get('rotation') is not None and entry['rotation'] != rotation:
+            changes.append((monitor_id, 'rotate', entry['rotation']))
+            if (entry['rotation'] // 90) % 2 != (rotation // 90) % 2:
+                # The rotation alone already turns the desktop size around
+                width, height = height, width
+        if entry.get('width') and entry.get('height'):
+            frequency = entry.get('frequency')
+            if (entry['width'], entry['height']) != (width, height) or \
+                    (frequency and display.get('frequency') and frequency != display['frequency']):
+                changes.append((monitor_id, 'mode', (entry['width'], entry['height'], frequency)))
+        if entry.get('brightness') is not None and entry['brightness'] != brightness.get(monitor_id):
+            levels[monitor_id] = entry['brightness']
+    return changes, levels
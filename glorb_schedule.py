@@ -0,0 +1,269 @@
+"""Daily brightness curves and the low-wakeup scheduler behind glorb schedule
+
+A curve is a list of (time of day, level) keyframes, interpolated linearly
+and wrapping around midnight. Brightness is written in whole percent, so a
+curve only changes what is on screen at the moments its rounded level
+changes. DayPlan works those moments out for every monitor a day ahead, and
+the scheduler sleeps from one to the next instead of waking on a fixed tick.
+"""
+
+import bisect
+import math
+import time
+
+import glorb_config
+
+DEFAULTS = glorb_config.SCHEDULE_DEFAULTS
+
+DAY = 86400
+SCHEDULE_FILE = 'schedule.json'
+
+# A wakeup this close to a planned change counts as on time: clocks and float timestamps are not exact
+TOLERANCE = 0.01
+
+
+def parse_time(text):
+    """Seconds since midnight from HH:MM or HH:MM:SS"""
+    try:
+        parts = [int(part) for part in text.split(':')]
+        if len(parts) in (2, 3):
+            hours, minutes, seconds = (parts + [0])[:3]
+            if 0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60:
+                return hours * 3600 + minutes * 60 + seconds
+    except ValueError:
+        pass
+    raise ValueError(f"invalid time '{text}' (expected HH:MM)")
+
+
+def format_time(seconds):
+    seconds = int(seconds) % DAY
+    text = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}"
+    return text + f":{seconds % 60:02d}" if seconds % 60 else text
+
+
+def parse_keyframe(text):
+    """(seconds since midnight, level 0.0-1.0) from TIME=LEVEL, e.g. 07:30=0.4"""
+    moment, _, level = text.partition('=')
+    try:
+        value = float(level)
+    except ValueError:
+        value = -1.0
+    if not 0.0 <= value <= 1.0:
+        raise ValueError(f"invalid keyframe '{text}' (expected TIME=LEVEL, e.g. 07:30=0.4)")
+    return parse_time(moment), value
+
+
+def _percent(level):
+    """Whole percent shown for a level in percent, rounding halves up"""
+    return int(math.floor(level + 0.5))
+
+
+class Curve:
+    """Brightness over a day from (seconds since midnight, level 0.0-1.0) keyframes"""
+
+    def __init__(self, keyframes):
+        if not keyframes:
+            raise ValueError("a brightness curve needs at least one keyframe")
+        self.keyframes = sorted((seconds % DAY, level) for seconds, level in keyframes)
+        self._points = [(seconds, level * 100) for seconds, level in self.keyframes]
+        self._times = [seconds for seconds, _ in self._points]
+
+    def __repr__(self):
+        return f"Curve({self.keyframes!r})"
+
+    def level(self, seconds):
+        """Interpolated brightness in percent (not rounded) at a time of day"""
+        seconds %= DAY
+        index = bisect.bisect_right(self._times, seconds)
+        before = self._points[index - 1] if index else (self._points[-1][0] - DAY, self._points[-1][1])
+        after = self._points[index] if index < len(self._points) else (self._points[0][0] + DAY, self._points[0][1])
+        if after[0] == before[0]:
+            return after[1]
+        return before[1] + (after[1] - before[1]) * (seconds - before[0]) / (after[0] - before[0])
+
+    def steps(self):
+        """(seconds, percent) for every moment of the day the whole-percent level changes"""
+        points = [(self._points[-1][0] - DAY, self._points[-1][1])] + self._points + \
+            [(self._points[0][0] + DAY, self._points[0][1])]
+        steps = []
+        for (start, begin), (end, finish) in zip(points, points[1:]):
+            if begin == finish:
+                continue
+            if start == end:
+                # Two keyframes at one time: a jump
+                if _percent(begin) != _percent(finish):
+                    steps.append((start, _percent(finish)))
+                continue
+            rising = finish > begin
+            low, high = min(begin, finish), max(begin, finish)
+            # The shown level changes where the curve crosses a half percent
+            for boundary in range(int(math.floor(low - 0.5)) + 1, int(math.ceil(high - 0.5))):
+                crossing = boundary + 0.5
+                moment = start + (crossing - begin) * (end - start) / (finish - begin)
+                steps.append((moment, boundary + 1 if rising else boundary))
+        return sorted(step for step in steps if 0 <= step[0] < DAY)
+
+
+def _throttle(steps, min_interval):
+    """Steps at least min_interval apart, each writing the level due at its time"""
+    if min_interval <= 0 or not steps:
+        return steps
+    times = [moment for moment, _ in steps]
+    kept = []
+    # Whatever the previous day ended on
+    value = steps[-1][1]
+    index = 0
+    while index < len(steps):
+        moment = steps[index][0]
+        if kept:
+            # The end of a ramp is deferred rather than dropped; the last write of the day may come early
+            moment = min(max(moment, kept[-1][0] + min_interval), DAY - 1)
+        index = max(bisect.bisect_right(times, moment), index + 1)
+        current = steps[index - 1][1]
+        if current != value:
+            kept.append((moment, current))
+            value = current
+    return kept
+
+
+class DayPlan:
+    """When each monitor's shown brightness changes over a day, and the wakeups that write it"""
+
+    def __init__(self, curves, min_interval=DEFAULTS['min_interval'], coalesce=DEFAULTS['coalesce']):
+        self.curves = dict(curves)
+        self.coalesce = coalesce
+        self.steps = {monitor_id: _throttle(curve.steps(), min_interval) for monitor_id, curve in self.curves.items()}
+        writes = sorted((moment, monitor_id, percent) for monitor_id, steps in self.steps.items()
+                        for moment, percent in steps)
+        self.wakeups = []
+        for moment, monitor_id, percent in writes:
+            if self.wakeups and moment - self.wakeups[-1][0] <= coalesce and monitor_id not in self.wakeups[-1][1]:
+                self.wakeups[-1][1][monitor_id] = percent
+            else:
+                self.wakeups.append((moment, {monitor_id: percent}))
+        self._times = [moment for moment, _ in self.wakeups]
+
+    @property
+    def writes(self):
+        """Brightness writes per day"""
+        return sum(len(steps) for steps in self.steps.values())
+
+    def levels(self, seconds):
+        """{monitor_id: percent} due at a time of day, counting writes the wakeup then covers"""
+        seconds = (seconds + self.coalesce) % DAY
+        levels = {}
+        for monitor_id, steps in self.steps.items():
+            if not steps:
+                levels[monitor_id] = _percent(self.curves[monitor_id].level(seconds))
+                continue
+            index = bisect.bisect_right(steps, (seconds, math.inf))
+            levels[monitor_id] = steps[index - 1][1]
+        return levels
+
+    def next_wakeup(self, seconds):
+        """(seconds until the next wakeup after a time of day, its writes), or (None, {}) for flat curves"""
+        if not self.wakeups:
+            return None, {}
+        seconds %= DAY
+        index = bisect.bisect_right(self._times, seconds)
+        if index < len(self.wakeups):
+            return self._times[index] - seconds, self.wakeups[index][1]
+        return self._times[0] + DAY - seconds, self.wakeups[0][1]
+
+
+def load():
+    """{monitor_id or 'all': Curve} from the saved schedule"""
+    curves = {}
+    for key, keyframes in glorb_config.read_config(SCHEDULE_FILE).items():
+        try:
+            curve = Curve([(parse_time(moment), float(level)) for moment, level in keyframes])
+        except (TypeError, ValueError):
+            continue
+        curves['all' if key == 'all' else int(key)] = curve
+    return curves
+
+
+def save(curves):
+    """Store {monitor_id or 'all': Curve}; returns False if the file could not be written"""
+    return glorb_config.write_config(SCHEDULE_FILE, {
+        str(key): [[format_time(seconds), level] for seconds, level in curve.keyframes]
+        for key, curve in curves.items()
+    })
+
+
+def seconds_of_day(timestamp):
+    """Local time of day of a time.time() timestamp, in seconds"""
+    local = time.localtime(timestamp)
+    return local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + timestamp % 1
+
+
+class BrightnessScheduler:
+    """Follows brightness curves on every monitor, waking only when a change becomes visible
+
+    curves maps monitor ids to Curves; an 'all' curve covers every other
+    monitor. Writes go through the manager's bulk brightness path, so a
+    long-lived manager keeps its DDC/CI handles from one change to the next.
+    updates() sleeps until the next planned change (or max_sleep), writes
+    only the monitors whose level moved, and yields each write. The plan is
+    rebuilt when monitors come and go. stats counts wakeups (idle ones wrote
+    nothing), brightness writes and plan rebuilds.
+    """
+
+    def __init__(self, manager, curves, clock=time.time, sleep=time.sleep, **config):
+        self.config = glorb_config.settings(DEFAULTS, 'GLORB_SCHEDULE', 'schedule', config)
+        self.manager = manager
+        self.curves = dict(curves)
+        self._clock = clock
+        self._sleep = sleep
+        self.plan = None
+        self._monitors = None
+        # Level last written to each monitor
+        self.levels = {}
+        self.stats = {'wakeups': 0, 'idle_wakeups': 0, 'writes': 0, 'failed_writes': 0, 'replans': 0}
+
+    def replan(self):
+        """The plan for the connected monitors, rebuilt if they changed"""
+        monitors = [display['id'] for display in self.manager.displays]
+        if monitors == self._monitors:
+            return self.plan
+        if self._monitors is not None:
+            self.stats['replans'] += 1
+        # A monitor that was unplugged may come back at any level
+        self.levels = {monitor_id: level for monitor_id, level in self.levels.items() if monitor_id in monitors}
+        self._monitors = monitors
+        curves = {monitor_id: self.curves.get(monitor_id, self.curves.get('all')) for monitor_id in monitors}
+        self.plan = DayPlan({monitor_id: curve for monitor_id, curve in curves.items() if curve is not None},
+                            self.config['min_interval'], self.config['coalesce'])
+        return self.plan
+
+    def _apply(self, now):
+        """Write the levels due now that differ from the last ones written"""
+        due = self.plan.levels(seconds_of_day(now) + TOLERANCE)
+        changes = {monitor_id: percent for monitor_id, percent in due.items() if self.levels.get(monitor_id) != percent}
+        if not changes:
+            return None
+        results = self.manager.set_brightness_many(changes)
+        for monitor_id, result in results.items():
+            if result['ok']:
+                self.levels[monitor_id] = changes[monitor_id]
+                self.stats['writes'] += 1
+            else:
+                self.stats['failed_writes'] += 1
+        return {'time': round(now, 3), 'levels': changes}
+
+    def updates(self):
+        """Yield {'time', 'levels'} for every set of writes until the caller stops iterating"""
+        self.replan()
+        update = self._apply(self._clock())
+        if update:
+            yield update
+        while True:
+            delay, _ = self.plan.next_wakeup(seconds_of_day(self._clock()) + TOLERANCE)
+            self._sleep(self.config['max_sleep'] if delay is None else min(delay + TOLERANCE, self.config['max_sleep']))
+            self.stats['wakeups'] += 1
+            self.replan()
+            update = self._apply(self._clock())
+            if update:
+                yield update
+            else:
+                self.stats['idle_wakeups'] += 1
@@ -0,0 +1,276 @@
+"""Simulated displays with configurable monitor counts, mode lists and hardware latencies"""
+
+import hashlib
+import threading
+import time
+
+import glorb_cache
+import glorb_config
+import glorb_ddc
+import glorb_gamma
+import glorb_vcp
+from glorb_backend import Backend, ROTATIONS
+from glorb_modes import ModeCatalog
+
+MAX_MONITORS = 64
+
+# Latencies in seconds; DDC/CI monitors need ~40ms between commands
+DEFAULTS = {
+    'monitors': 2,
+    'modes': 40,
+    'enum_latency': 0.002,
+    'ddc_latency': 0.04,
+    'panel_latency': 0.01,
+    'modeset_latency': 0.1,
+    'dead': 0,
+    'dead_latency': 5.0,
+    'caps_latency': 1.0,
+    'gamma_latency': 0.001,
+    'no_ddc': 0,
+}
+
+# What every simulated external monitor reports over DDC/CI
+CAPABILITIES = ('(prot(monitor)type(lcd)model(SIM{index:04X})cmds(01 02 03 07 0C E3 F3)'
+                'vcp(02 04 05 08 10 12 14(05 06 08 0B) 16 18 1A 60(0F 11 12) 62 D6(01 04 05))mccs_ver(2.1))')
+VCP_DEFAULTS = {0x12: 75, 0x14: 0x05, 0x16: 50, 0x18: 50, 0x1A: 50, 0x60: 0x0F, 0x62: 30, 0xD6: 0x01}
+VCP_MAXIMUM = 100
+
+# Resolutions handed out to simulated monitors, largest first
+RESOLUTIONS = ((3840, 2160), (2560, 1440), (1920, 1200), (1920, 1080), (1680, 1050), (1600, 900),
+               (1440, 900), (1366, 768), (1280, 1024), (1280, 800), (1280, 720), (1024, 768), (800, 600))
+REFRESH_RATES = (240, 165, 144, 120, 75, 60, 59, 50, 30)
+
+
+def simulated_modes(index, count):
+    """count distinct (width, height, frequency, bpp) modes for monitor index"""
+    modes = []
+    for width, height in RESOLUTIONS[index % 3:] + RESOLUTIONS[:index % 3]:
+        for frequency in REFRESH_RATES:
+            for bits_per_pixel in (32, 16, 8):
+                if len(modes) == count:
+                    return modes
+                modes.append((width, height, frequency, bits_per_pixel))
+    return modes
+
+
+class SimulatedTransaction:
+    """Stage changes for simulated displays and apply them in one simulated mode-set"""
+
+    def __init__(self, backend, on_commit=None):
+        self._backend = backend
+        self._on_commit = on_commit
+        self._staged = {}
+        self.results = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def _monitor(self, display_id):
+        if display_id not in self._backend.monitors:
+            raise ValueError(f"Monitor {display_id} not found")
+        return self._staged.setdefault(display_id, {})
+
+    def rotate(self, display_id, angle):
+        if angle not in ROTATIONS:
+            raise ValueError(f"Invalid angle {angle}. Use 0, 90, 180, or 270")
+        self._monitor(display_id)['orientation'] = ROTATIONS.index(angle)
+        return self
+
+    def set_mode(self, display_id, width, height, frequency=None):
+        changes = self._monitor(display_id)
+        changes['width'], changes['height'] = width, height
+        if frequency:
+            changes['frequency'] = frequency
+        return self
+
+    def commit(self):
+        if not self._staged:
+            self.results = {}
+            return self.results
+        self._backend.modeset(self._staged)
+        self.results = {display_id: 0 for display_id in self._staged}
+        self._staged = {}
+        if self._on_commit:
+            self._on_commit()
+        return self.results
+
+
+class SimulatedBackend(Backend):
+    """In-memory monitors that cost what real hardware costs
+
+    Enumeration takes enum_latency per monitor, every DDC/CI read or write
+    takes ddc_latency on that monitor's own bus, monitor 0 is a laptop panel
+    answering in panel_latency, and a mode-set takes modeset_latency no
+    matter how many displays it changes. External monitors report a
+    capabilities string after caps_latency and keep a small set of VCP
+    features besides brightness. The `no_ddc` monitors after the panel have
+    no DDC/CI at all and can only be dimmed through their gamma ramp,
+    which takes gamma_latency to load. The last `dead` monitors behave
+    like monitors that are asleep or on another input: every DDC/CI request
+    hangs for dead_latency and then fails. DDC/CI goes through a
+    glorb_ddc.DdcGuard like on real hardware. Settings come from keyword
+    arguments or GLORB_SIM. calls counts operations for benchmarks.
+    """
+
+    name = 'sim'
+
+    def __init__(self, guard=None, **config):
+        settings = glorb_config.settings(DEFAULTS, 'GLORB_SIM', 'simulator', config)
+        if not 1 <= settings['monitors'] <= MAX_MONITORS:
+            raise ValueError(f"The simulator supports 1 to {MAX_MONITORS} monitors")
+        self.config = settings
+        self.guard = guard or glorb_ddc.DdcGuard()
+        self.calls = {'enumerate': 0, 'fingerprint': 0, 'ddc': 0, 'capabilities': 0, 'panel': 0, 'gamma': 0,
+                      'modeset': 0}
+        self.monitors = {}
+        self.vcp = {}
+        self.gamma = {}
+        self._buses = {}
+        self._lock = threading.Lock()
+        for index in range(settings['monitors']):
+            width, height, frequency, _ = simulated_modes(index, 1)[0]
+            self.monitors[index] = {
+                'id': index,
+                'name': f"\\\\.\\DISPLAY{index + 1}",
+                'description': 'Simulated Laptop Panel' if index == 0 else f"Simulated Monitor {index}",
+                'width': width,
+                'height': height,
+                'frequency': frequency,
+                'orientation': 0,
+                'primary': index == 0,
+                'hardware_id': f"SIM{index:04X}",
+                'brightness': 50,
+            }
+            self.vcp[index] = dict(VCP_DEFAULTS)
+            self._buses[index] = threading.Lock()
+
+    def _count(self, call, seconds=0.0):
+        with self._lock:
+            self.calls[call] += 1
+        if seconds:
+            time.sleep(seconds)
+
+    def _fingerprint(self):
+        layout = repr(sorted((m['id'], m['width'], m['height'], m['orientation']) for m in self.monitors.values()))
+        return hashlib.sha1(layout.encode('utf-8')).hexdigest()
+
+    def fingerprint(self):
+        self._count('fingerprint')
+        return self._fingerprint()
+
+    def load_displays(self, use_cache=True):
+        fingerprint = self._fingerprint()
+        if use_cache:
+            cached = glorb_cache.load('sim-topology', fingerprint)
+            if cached:
+                return cached
+        self._count('enumerate', self.config['enum_latency'] * len(self.monitors))
+        displays = [{key: value for key, value in monitor.items() if key != 'brightness'}
+                    for monitor in self.monitors.values()]
+        glorb_cache.store('sim-topology', fingerprint, displays)
+        return displays
+
+    def _has_ddc(self, display_id):
+        return display_id in self.monitors and display_id > self.config['no_ddc']
+
+    def _transfer(self, display_id, request, call='ddc', latency=None):
+        with self._buses[display_id]:
+            if display_id >= len(self.monitors) - self.config['dead']:
+                self._count(call, self.config['dead_latency'])
+                return None
+            self._count(call, self.config['ddc_latency'] if latency is None else latency)
+            return request()
+
+    def _ddc(self, display_id, code=0x10, value=None):
+        """Read, or write then read back, one VCP feature over the monitor's bus; None on failure"""
+        def request():
+            if code == 0x10:
+                if value is not None:
+                    self.monitors[display_id]['brightness'] = value
+                return self.monitors[display_id]['brightness']
+            if value is not None:
+                self.vcp[display_id][code] = value
+            return self.vcp[display_id].get(code)
+        return self.guard.call(display_id, self._transfer, display_id, request,
+                               succeeded=lambda current: current is not None)
+
+    def set_brightness(self, display, percent):
+        if not self._has_ddc(display['id']):
+            return None
+        return self._ddc(display['id'], value=percent) is not None
+
+    def health(self, display):
+        return self.guard.describe(display['id'])
+
+    def set_panel_brightness(self, display, percent):
+        if display['id'] != 0:
+            return None
+        self._count('panel', self.config['panel_latency'])
+        self.monitors[0]['brightness'] = percent
+        return True
+
+    def get_brightness(self, display, max_age=None):
+        if display['id'] not in self.monitors:
+            return None
+        if display['id'] == 0:
+            self._count('panel', self.config['panel_latency'])
+            return self.monitors[0]['brightness']
+        if not self._has_ddc(display['id']):
+            return None
+        return self._ddc(display['id'])
+
+    def set_gamma(self, display, percent, kelvin):
+        if display['id'] not in self.monitors:
+            return None
+        table = glorb_gamma.ramp(percent, kelvin)
+        self._count('gamma', self.config['gamma_latency'])
+        self.gamma[display['id']] = table
+        return True
+
+    def vcp_capabilities(self, display):
+        display_id = display['id']
+        if not self._has_ddc(display_id):
+            return None
+
+        def fetch():
+            return self.guard.call(display_id, self._transfer, display_id,
+                                   lambda: CAPABILITIES.format(index=display_id), 'capabilities',
+                                   self.config['caps_latency'], timeout=self.config['caps_latency'] + 1)
+        return glorb_vcp.load_capabilities(self.monitor_identity(display), fetch)
+
+    def get_vcp(self, display, code):
+        if not self._has_ddc(display['id']):
+            return None
+        current = self._ddc(display['id'], code)
+        return None if current is None else (current, VCP_MAXIMUM)
+
+    def set_vcp(self, display, code, value):
+        if not self._has_ddc(display['id']):
+            return False
+        return self._ddc(display['id'], code, value) is not None
+
+    def modeset(self, staged):
+        """Apply {display_id: {field: value}} in one simulated mode-set"""
+        self._count('modeset', self.config['modeset_latency'])
+        for display_id, changes in staged.items():
+            monitor = self.monitors[display_id]
+            orientation = changes.get('orientation', monitor['orientation'])
+            if 'width' not in changes and orientation % 2 != monitor['orientation'] % 2:
+                # Turning between landscape and portrait swaps the desktop size
+                monitor['width'], monitor['height'] = monitor['height'], monitor['width']
+            monitor.update(changes)
+
+    def mode_catalog(self, display):
+        return ModeCatalog(simulated_modes(display['id'], self.config['modes']))
+
+    def transaction(self, displays, on_commit=None):
+        return SimulatedTransaction(self, on_commit)
+
+    def close(self):
+        # Stop the per-monitor DDC/CI workers
+        self.guard.forget()
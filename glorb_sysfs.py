@@ -0,0 +1,147 @@
+"""Linux backlight control through /sys/class/backlight"""
+
+import os
+import time
+
+import glorb_trace
+from glorb_backend import Backend, percent_to_raw, raw_to_percent
+
+SYSFS_BACKLIGHT_ROOT = '/sys/class/backlight'
+
+# Kernel backlight interface types, most preferred first
+TYPE_PRIORITY = {'firmware': 0, 'platform': 1, 'raw': 2}
+
+
+def _read_attr(path, default=None):
+    try:
+        with open(path, 'r') as fh:
+            return fh.read().strip()
+    except OSError:
+        return default
+
+
+class Backlight:
+    """One backlight device, with its brightness attributes held open
+
+    max_brightness is read once; brightness and actual_brightness stay open
+    so repeated reads and writes are a single pread/pwrite each. Writes work
+    the same on sysfs and on the plain files of a fake tree.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = _read_attr(os.path.join(path, 'type'), 'raw')
+        self.max_brightness = int(_read_attr(os.path.join(path, 'max_brightness'), '0') or 0)
+        self.last_value = None
+        self.last_time = 0.0
+        self._read_fd = None
+        self._write_fd = None
+
+    def read(self):
+        """Current raw brightness as reported by the hardware"""
+        if self._read_fd is None:
+            actual = os.path.join(self.path, 'actual_brightness')
+            if not os.path.exists(actual):
+                actual = os.path.join(self.path, 'brightness')
+            self._read_fd = os.open(actual, os.O_RDONLY)
+        value = int(glorb_trace.call('pread brightness', os.pread, self._read_fd, 32, 0, category='sysfs').split()[0])
+        self.last_value, self.last_time = value, time.monotonic()
+        return value
+
+    def write(self, value):
+        """Write a raw brightness value"""
+        if self._write_fd is None:
+            self._write_fd = os.open(os.path.join(self.path, 'brightness'), os.O_WRONLY)
+        data = str(value).encode('ascii')
+        glorb_trace.call('pwrite brightness', os.pwrite, self._write_fd, data, 0, category='sysfs')
+        # Drops what is left of a longer value in a plain file; on sysfs it
+        # only sets the inode size, as opening with O_TRUNC (`echo >`) does
+        os.ftruncate(self._write_fd, len(data))
+        self.last_value, self.last_time = value, time.monotonic()
+
+    def close(self):
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._read_fd = self._write_fd = None
+
+
+class SysfsBacklightBackend(Backend):
+    """Laptop and embedded panels exposed under /sys/class/backlight
+
+    The root is configurable (root argument or GLORB_SYSFS_ROOT) so a fake
+    directory tree can stand in for sysfs. Rotation and display modes are
+    not available through this interface.
+    """
+
+    name = 'sysfs'
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('GLORB_SYSFS_ROOT') or SYSFS_BACKLIGHT_ROOT
+        self._devices = {}
+
+    def load_displays(self, use_cache=True):
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            entries = []
+
+        # Devices that are still present keep their open attribute files
+        previous = {device.path: device for device in self._devices.values()}
+        devices = [previous.pop(os.path.join(self.root, entry), None) or Backlight(os.path.join(self.root, entry))
+                   for entry in entries]
+        for device in previous.values():
+            device.close()
+        self._devices = {}
+        devices = [device for device in devices if device.max_brightness > 0]
+        devices.sort(key=lambda device: (TYPE_PRIORITY.get(device.type, len(TYPE_PRIORITY)), device.name))
+
+        displays = []
+        for index, device in enumerate(devices):
+            self._devices[index] = device
+            displays.append({
+                'id': index,
+                'name': device.name,
+                'description': f"Backlight {device.name} ({device.type})",
+                'width': None,
+                'height': None,
+                'primary': index == 0
+            })
+        return displays
+
+    def set_brightness(self, display, percent):
+        device = self._devices.get(display['id'])
+        if device is None:
+            return None
+        try:
+            device.write(percent_to_raw(percent, 0, device.max_brightness))
+            return True
+        except PermissionError:
+            print(f"Permission denied writing {device.path}/brightness (add a udev rule or join the video group)")
+            return False
+        except OSError:
+            return False
+
+    def get_brightness(self, display, max_age=None):
+        device = self._devices.get(display['id'])
+        if device is None:
+            return None
+        try:
+            fresh = max_age is not None and device.last_value is not None and time.monotonic() - device.last_time <= max_age
+            value = device.last_value if fresh else device.read()
+        except (OSError, ValueError):
+            return None
+        return raw_to_percent(value, 0, device.max_brightness)
+
+    def watcher(self, on_change, settle=None):
+        import glorb_hotplug
+        return glorb_hotplug.LinuxDisplayWatcher(on_change, settle or glorb_hotplug.DEFAULT_SETTLE)
+
+    def close(self):
+        for device in self._devices.values():
+            device.close()
+        self._devices = {}
@@ -0,0 +1,135 @@
+"""Compact display records and the indexed topology built from them"""
+
+FIELDS = ('id', 'name', 'description', 'width', 'height', 'frequency', 'orientation', 'primary',
+          'hardware_id', 'hmonitor', 'position')
+
+
+class Display:
+    """One display, stored in __slots__ but readable like the dicts backends used to return
+
+    display['width'] and display.get('hmonitor') keep working for code
+    written against dicts; unset fields read as None.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, id, name, description='', width=None, height=None, frequency=None, orientation=0,
+                 primary=False, hardware_id=None, hmonitor=None, position=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.width = width
+        self.height = height
+        self.frequency = frequency
+        self.orientation = orientation
+        self.primary = primary
+        self.hardware_id = hardware_id
+        self.hmonitor = hmonitor
+        self.position = tuple(position) if position is not None else None
+
+    @classmethod
+    def from_dict(cls, values):
+        """Record from a backend dict or cached JSON; unknown keys are ignored"""
+        return cls(**{field: values[field] for field in FIELDS if field in values})
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def replace(self, **changes):
+        """Copy with some fields changed"""
+        values = self.as_dict()
+        values.update(changes)
+        return Display(**values)
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in FIELDS else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in FIELDS and getattr(self, key) is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, Display):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for field in FIELDS:
+            setattr(self, field, state.get(field))
+
+    def __repr__(self):
+        return f"Display(id={self.id!r}, name={self.name!r}, {self.width}x{self.height})"
+
+
+def as_display(display):
+    return display if isinstance(display, Display) else Display.from_dict(display)
+
+
+class Topology:
+    """Displays in enumeration order with O(1) lookup by id, device name and HMONITOR
+
+    Iterates like the list of displays it replaces.
+    """
+
+    __slots__ = ('_displays', '_by_id', '_by_name', '_by_hmonitor')
+
+    def __init__(self, displays=()):
+        self._displays = [as_display(display) for display in displays]
+        self._by_id = {display.id: display for display in self._displays}
+        self._by_name = {display.name: display for display in self._displays}
+        self._by_hmonitor = {display.hmonitor: display for display in self._displays if display.hmonitor}
+
+    def __iter__(self):
+        return iter(self._displays)
+
+    def __len__(self):
+        return len(self._displays)
+
+    def __getitem__(self, index):
+        return self._displays[index]
+
+    def __bool__(self):
+        return bool(self._displays)
+
+    def __eq__(self, other):
+        if isinstance(other, Topology):
+            return self._displays == other._displays
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Topology({self._displays!r})"
+
+    def find(self, display_id):
+        """Display with this id, or None"""
+        return self._by_id.get(display_id)
+
+    def by_name(self, name):
+        """Display driven by a device name such as \\\\.\\DISPLAY1, or None"""
+        return self._by_name.get(name)
+
+    def by_hmonitor(self, hmonitor):
+        """Display behind an HMONITOR, or None"""
+        return self._by_hmonitor.get(hmonitor)
+
+    def ids(self):
+        return list(self._by_id)
+
+    def as_dicts(self):
+        """Plain dicts, e.g. for JSON"""
+        return [display.as_dict() for display in self._displays]
@@ -0,0 +1,160 @@
+"""Optional timing of native and backend calls, exported as Chrome trace JSON
+
+Tracing is off unless enable() is called. While it is off, call() is a
+direct function call behind one global check and span() hands back a shared
+do-nothing object, so instrumented code costs practically nothing.
+"""
+
+import os
+import threading
+import time
+
+# Backend methods timed by instrument(), with what counts as a failed result
+BACKEND_METHODS = {
+    'load_displays': None,
+    'rescan': None,
+    'set_brightness': lambda result: result is not False,
+    'set_panel_brightness': lambda result: result is not False,
+    'set_gamma': lambda result: result is not False,
+    'get_brightness': None,
+    'mode_catalog': None,
+}
+
+_events = None
+_origin = 0.0
+
+
+def enable():
+    """Start recording calls, discarding anything recorded before"""
+    global _events, _origin
+    _origin = time.perf_counter()
+    _events = []
+
+
+def disable():
+    global _events
+    _events = None
+
+
+def enabled():
+    return _events is not None
+
+
+def events():
+    """Recorded (name, category, start, duration, thread id, outcome) tuples, times in seconds"""
+    return list(_events or ())
+
+
+def _record(name, category, start, outcome):
+    end = time.perf_counter()
+    _events.append((name, category, start - _origin, end - start, threading.get_ident(), outcome))
+
+
+def call(name, func, *args, check=None, category='native'):
+    """func(*args), timed under name while tracing
+
+    check(result) returning False marks the call as failed; exceptions are
+    recorded with their type and re-raised.
+    """
+    if _events is None:
+        return func(*args)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception as e:
+        _record(name, category, start, type(e).__name__)
+        raise
+    _record(name, category, start, 'failed' if check is not None and not check(result) else 'ok')
+    return result
+
+
+class _Span:
+    def __init__(self, name, category):
+        self.name = name
+        self.category = category
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _events is not None:
+            _record(self.name, self.category, self._start, exc_type.__name__ if exc_type else self.outcome)
+        return False
+
+    def fail(self, outcome='failed'):
+        self.outcome = outcome
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def fail(self, outcome='failed'):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category='native'):
+    """Context manager timing a block; call .fail() on it to record a failed outcome"""
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, category)
+
+
+def instrument(backend):
+    """Time the backend's public operations by wrapping them on the instance"""
+    for method, check in BACKEND_METHODS.items():
+        func = getattr(backend, method, None)
+        if func is None:
+            continue
+
+        def traced(*args, _func=func, _name=f"{backend.name}.{method}", _check=check):
+            return call(_name, _func, *args, check=_check, category='backend')
+        setattr(backend, method, traced)
+    return backend
+
+
+def write_chrome_trace(path):
+    """Write recorded calls as Chrome trace / Perfetto JSON"""
+    pid = os.getpid()
+    thread_ids = {}
+    trace_events = []
+    for name, category, start, duration, thread, outcome in events():
+        tid = thread_ids.setdefault(thread, len(thread_ids))
+        # Rounding both ends, not the duration, keeps a nested call inside its caller
+        ts, end = round(start * 1e6, 3), round((start + duration) * 1e6, 3)
+        trace_events.append({
+            'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': ts, 'dur': round(end - ts, 3), 'args': {'outcome': outcome},
+        })
+    for thread, tid in thread_ids.items():
+        label = 'main' if thread == threading.main_thread().ident else f"worker {tid}"
+        trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': label}})
+    import json
+    with open(path, 'w') as fh:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, fh)
+
+
+def summary():
+    """Per-call count, total/mean/max time and failures, slowest total first"""
+    totals = {}
+    for name, category, _, duration, _, outcome in events():
+        entry = totals.setdefault((category, name), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+        entry[3] += outcome != 'ok'
+
+    lines = [f"{'call':<52}{'count':>7}{'total':>11}{'mean':>10}{'max':>10}{'failed':>8}"]
+    for (category, name), (count, total, longest, failed) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        label = f"{category}:{name}"
+        lines.append(f"{label:<52}{count:>7}{total * 1000:>9.1f}ms{total / count * 1000:>8.2f}ms"
+                     f"{longest * 1000:>8.2f}ms{failed:>8}")
+    return '\n'.join(lines)
@@ -0,0 +1,187 @@
+"""MCCS VCP features: capabilities string parsing and the per-monitor feature table"""
+
+import glorb_cache
+from glorb_config import VCP_FEATURES as FEATURES
+
+# Bumped whenever the cached feature table changes shape
+CAPABILITIES_FORMAT = 1
+FEATURE_NAMES = {code: name for name, code in FEATURES.items()}
+
+# Names for the values of non-continuous features
+VALUE_NAMES = {
+    0x60: {0x01: 'vga1', 0x02: 'vga2', 0x03: 'dvi1', 0x04: 'dvi2', 0x0F: 'dp1', 0x10: 'dp2',
+           0x11: 'hdmi1', 0x12: 'hdmi2', 0x1B: 'usbc'},
+    0xD6: {0x01: 'on', 0x02: 'standby', 0x03: 'suspend', 0x04: 'off', 0x05: 'off-button'},
+    0x8D: {0x01: 'on', 0x02: 'off'},
+}
+
+
+def _groups(text):
+    """Top-level name(value) pairs of a capabilities string, values unparsed"""
+    text = text.strip()
+    if text.startswith('('):
+        # The closing bracket is left over at the end, or missing if the reply was cut short
+        text = text[1:]
+    groups = {}
+    index = 0
+    while index < len(text):
+        start = text.find('(', index)
+        if start == -1:
+            break
+        name = text[index:start].strip().lower()
+        depth = 0
+        for end in range(start, len(text)):
+            if text[end] == '(':
+                depth += 1
+            elif text[end] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            # Truncated string: take what is there
+            end = len(text)
+        groups[name] = text[start + 1:end]
+        index = end + 1
+    return groups
+
+
+def _hex_codes(text):
+    """Two-digit hex codes; some monitors leave out the spaces between them"""
+    codes = []
+    for token in text.split():
+        for index in range(0, len(token), 2):
+            try:
+                codes.append(int(token[index:index + 2], 16))
+            except ValueError:
+                continue
+    return codes
+
+
+def parse_vcp_list(text):
+    """{code: [allowed values] or None for continuous} from the body of vcp(...)"""
+    features = {}
+    index = 0
+    code = None
+    while index < len(text):
+        char = text[index]
+        if char == '(':
+            end = text.find(')', index)
+            end = len(text) if end == -1 else end
+            if code is not None:
+                features[code] = _hex_codes(text[index + 1:end])
+            index = end + 1
+            continue
+        if char.isspace():
+            index += 1
+            continue
+        end = index
+        while end < len(text) and not text[end].isspace() and text[end] != '(':
+            end += 1
+        code = None
+        for code in _hex_codes(text[index:end]):
+            features.setdefault(code, None)
+        index = end
+    return features
+
+
+def parse_capabilities(text):
+    """VcpCapabilities from a DDC/CI capabilities string such as
+    (prot(monitor)type(lcd)model(U2720Q)vcp(10 12 60(0F 11 1B) D6(01 04))mccs_ver(2.1))
+    """
+    groups = _groups(text)
+    return VcpCapabilities(parse_vcp_list(groups.get('vcp', '')), model=groups.get('model'),
+                           mccs_version=groups.get('mccs_ver'))
+
+
+def edid_identity(edid):
+    """Cache key for a monitor from its raw EDID (covers model and serial number)"""
+    import hashlib
+    return hashlib.sha1(bytes(edid)).hexdigest()[:16]
+
+
+def parse_feature(text):
+    """VCP code from a feature name, 0x12 or a bare hex code; ValueError if unknown"""
+    text = text.strip().lower()
+    if text in FEATURES:
+        return FEATURES[text]
+    try:
+        code = int(text, 16)
+    except ValueError:
+        raise ValueError(f"Unknown VCP feature '{text}' (use a hex code or one of: {', '.join(FEATURES)})")
+    if not 0 <= code <= 0xFF:
+        raise ValueError(f"VCP code {text} out of range")
+    return code
+
+
+def parse_value(code, text):
+    """Value for a feature from a name such as hdmi1, or a decimal/0x number"""
+    text = text.strip().lower()
+    for value, name in VALUE_NAMES.get(code, {}).items():
+        if name == text:
+            return value
+    try:
+        value = int(text, 0)
+    except ValueError:
+        names = ', '.join(VALUE_NAMES.get(code, {}).values())
+        raise ValueError(f"Invalid VCP value '{text}'" + (f" (use a number or one of: {names})" if names else ""))
+    if not 0 <= value <= 0xFFFF:
+        raise ValueError(f"VCP value {text} out of range")
+    return value
+
+
+def feature_label(code):
+    name = FEATURE_NAMES.get(code)
+    return f"{name} (0x{code:02X})" if name else f"0x{code:02X}"
+
+
+def value_label(code, value):
+    name = VALUE_NAMES.get(code, {}).get(value)
+    return f"{name} (0x{value:02X})" if name else str(value)
+
+
+class VcpCapabilities:
+    """Which VCP features a monitor reports and, for non-continuous ones, their allowed values"""
+
+    def __init__(self, features, model=None, mccs_version=None):
+        self.features = dict(features)
+        self.model = model
+        self.mccs_version = mccs_version
+
+    def supports(self, code, value=None):
+        if code not in self.features:
+            return False
+        allowed = self.features[code]
+        return value is None or allowed is None or value in allowed
+
+    def values(self, code):
+        """Allowed values of a non-continuous feature, or None for a continuous one"""
+        return self.features.get(code)
+
+    def as_dict(self):
+        return {'model': self.model, 'mccs_version': self.mccs_version,
+                'features': {f"{code:02X}": values for code, values in sorted(self.features.items())}}
+
+    @classmethod
+    def from_dict(cls, values):
+        features = {int(code, 16): allowed for code, allowed in values.get('features', {}).items()}
+        return cls(features, values.get('model'), values.get('mccs_version'))
+
+
+def load_capabilities(identity, fetch):
+    """Feature table for the monitor with this identity, from disk or fetch() -> capabilities string
+
+    The capabilities request takes seconds on many monitors, so the parsed
+    table is kept on disk per monitor and the string is only fetched once.
+    Returns None when the monitor does not answer.
+    """
+    name = f"vcp-{identity}"
+    cached = glorb_cache.load(name, CAPABILITIES_FORMAT) if identity else None
+    if cached is not None:
+        return VcpCapabilities.from_dict(cached)
+    text = fetch()
+    if not text:
+        return None
+    capabilities = parse_capabilities(text)
+    if identity:
+        glorb_cache.store(name, CAPABILITIES_FORMAT, capabilities.as_dict())
+    return capabilities
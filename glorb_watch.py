@@ -0,0 +1,141 @@
+"""Display state records and the adaptive poller behind glorb watch"""
+
+import time
+
+import glorb_config
+from glorb_backend import ROTATIONS
+
+# Seconds between polls; see glorb_config.WATCH_DEFAULTS
+DEFAULTS = glorb_config.WATCH_DEFAULTS
+
+# Record fields compared between polls, in output order
+RECORD_FIELDS = ('id', 'name', 'description', 'hardware_id', 'width', 'height', 'frequency', 'rotation',
+                 'primary', 'position', 'brightness')
+
+
+def display_record(display, brightness=None):
+    """JSON-ready state of one display, shared by identify --json and watch events"""
+    position = display.get('position')
+    return {
+        'id': display['id'],
+        'name': display['name'],
+        'description': display.get('description', ''),
+        'hardware_id': display.get('hardware_id'),
+        'width': display.get('width'),
+        'height': display.get('height'),
+        'frequency': display.get('frequency'),
+        'rotation': ROTATIONS[display.get('orientation') or 0],
+        'primary': bool(display.get('primary')),
+        'position': list(position) if position is not None else None,
+        'brightness': brightness,
+    }
+
+
+def diff_records(before, after):
+    """Names of the fields that differ between two records"""
+    return [field for field in RECORD_FIELDS if before.get(field) != after.get(field)]
+
+
+class DisplayPoller:
+    """Generator of change events for every display, polling as little as it can
+
+    events() first yields a 'snapshot' event per display, then 'added',
+    'removed', 'changed' (mode, rotation, position...) and 'brightness'
+    events as they are noticed. Each event is a dict with the event kind,
+    a wall-clock time, the display id, the display's record and, for
+    changes, the fields that changed. Between polls the poller sleeps until
+    the next one is due, so an idle watch costs next to no CPU. stats counts
+    wakeups, fingerprint checks, re-enumerations and brightness reads.
+    """
+
+    def __init__(self, manager, clock=time.monotonic, sleep=time.sleep, wall_clock=time.time, **config):
+        self.config = glorb_config.settings(DEFAULTS, 'GLORB_WATCH', 'watch', config)
+        self.manager = manager
+        self._clock = clock
+        self._sleep = sleep
+        self._wall_clock = wall_clock
+        self.records = {}
+        self.stats = {'wakeups': 0, 'topology_checks': 0, 'rescans': 0, 'brightness_reads': 0, 'events': 0}
+
+    def _event(self, kind, display_id, record, changed=None):
+        self.stats['events'] += 1
+        event = {'event': kind, 'time': round(self._wall_clock(), 3), 'id': display_id, 'display': record}
+        if changed is not None:
+            event['changed'] = changed
+        return event
+
+    def _read_brightness(self, display_ids):
+        self.stats['brightness_reads'] += len(display_ids)
+        # max_age=0: a reading cached from an earlier write would hide changes made elsewhere
+        return self.manager.get_brightness_many(display_ids, max_age=0)
+
+    def _update(self, brightness):
+        """Events for the difference between the manager's displays and the last records"""
+        events = []
+        current = {}
+        for display in self.manager.displays:
+            display_id = display['id']
+            previous = self.records.get(display_id)
+            level = brightness.get(display_id, previous['brightness'] if previous else None)
+            record = current[display_id] = display_record(display, level)
+            if previous is None:
+                events.append(self._event('added', display_id, record))
+                continue
+            changed = diff_records(previous, record)
+            if changed:
+                kind = 'brightness' if changed == ['brightness'] else 'changed'
+                events.append(self._event(kind, display_id, record, changed))
+        for display_id, record in self.records.items():
+            if display_id not in current:
+                events.append(self._event('removed', display_id, record))
+        self.records = current
+        return events
+
+    def _check_topology(self):
+        """Display ids that need a brightness read after a cheap layout check"""
+        self.stats['topology_checks'] += 1
+        before = {display['id']: display for display in self.manager.displays}
+        if not self.manager.check_topology():
+            return []
+        self.stats['rescans'] += 1
+        return [display['id'] for display in self.manager.displays
+                if display['id'] not in before or before[display['id']] != display]
+
+    def events(self):
+        """Yield change events until the caller stops iterating"""
+        config = self.config
+        self.manager.check_topology()
+        display_ids = [display['id'] for display in self.manager.displays]
+        self.records = {}
+        for event in self._update(self._read_brightness(display_ids)):
+            event['event'] = 'snapshot'
+            yield event
+
+        now = self._clock()
+        next_topology = now + config['topology']
+        next_brightness = now + config['brightness']
+        boost_until = 0.0
+        while True:
+            wake = min(next_topology, next_brightness)
+            now = self._clock()
+            if wake > now:
+                self._sleep(wake - now)
+                now = self._clock()
+            self.stats['wakeups'] += 1
+
+            read = []
+            if now >= next_topology:
+                read = self._check_topology()
+            if now >= next_brightness:
+                read = [display['id'] for display in self.manager.displays]
+            events = self._update(self._read_brightness(read) if read else {})
+
+            if events:
+                boost_until = now + config['boost']
+            fast = now < boost_until
+            if now >= next_topology or events:
+                next_topology = now + config['fast_topology' if fast else 'topology']
+            if now >= next_brightness or events:
+                next_brightness = now + config['fast_brightness' if fast else 'brightness']
+            for event in events:
+                yield event
@@ -0,0 +1,734 @@
+"""Win32 display enumeration helpers shared by glorb and monitor_utils"""
+
+import contextlib
+import hashlib
+import threading
+import time
+import win32api
+import win32con
+from ctypes import windll, wintypes, byref, sizeof, create_string_buffer, Structure, c_void_p, POINTER, WINFUNCTYPE
+from ctypes.wintypes import BYTE, DWORD, BOOL, HANDLE, HDC, RECT
+
+import glorb_cache
+import glorb_ddc
+import glorb_gamma
+import glorb_hotplug
+import glorb_trace
+import glorb_vcp
+import glorb_wmi
+from glorb_backend import Backend, percent_to_raw, raw_to_percent
+from glorb_modes import ModeCatalog
+from glorb_topology import Display
+
+# Constants
+DISPLAY_DEVICE_ACTIVE = 0x00000001
+DISPLAY_DEVICE_PRIMARY_DEVICE = 0x00000004
+
+# GetSystemMetrics: virtual desktop origin/size and monitor count
+TOPOLOGY_METRICS = (76, 77, 78, 79, 80)
+
+# ChangeDisplaySettingsEx flags and results
+CDS_UPDATEREGISTRY = 0x00000001
+CDS_NORESET = 0x10000000
+DISP_CHANGE_SUCCESSFUL = 0
+
+# MonitorFromPoint: no monitor at that point
+MONITOR_DEFAULTTONULL = 0
+
+# EnumDisplayDevices: report the monitor's device interface path
+EDD_GET_DEVICE_INTERFACE_NAME = 0x00000001
+
+# Seconds a monitor may take to send its DDC/CI capabilities string
+CAPABILITIES_TIMEOUT = 10.0
+
+# Bumped whenever the cached topology records change shape
+TOPOLOGY_FORMAT = 2
+
+# Rotation angle to DEVMODE DisplayOrientation
+ROTATION_MAP = {0: 0, 90: 1, 180: 2, 270: 3}
+
+# Seconds a cached DDC/CI brightness reading is trusted by default
+BRIGHTNESS_MAX_AGE = 2.0
+
+# Window messages and WM_DEVICECHANGE event signalling display changes
+WM_DISPLAYCHANGE = 0x007E
+WM_DEVICECHANGE = 0x0219
+WM_QUIT = 0x0012
+DBT_DEVNODES_CHANGED = 0x0007
+
+# Monitor enumeration callback
+MONITORENUMPROC = WINFUNCTYPE(BOOL, HANDLE, HDC, POINTER(RECT), c_void_p)
+
+class PHYSICAL_MONITOR(Structure):
+    _fields_ = [('hPhysicalMonitor', HANDLE), ('szPhysicalMonitorDescription', wintypes.WCHAR * 128)]
+
+class MONITORINFOEX(Structure):
+    _fields_ = [
+        ('cbSize', DWORD),
+        ('rcMonitor', RECT),
+        ('rcWork', RECT),
+        ('dwFlags', DWORD),
+        ('szDevice', wintypes.WCHAR * 32)
+    ]
+
+def _disp_change_ok(result):
+    return result == DISP_CHANGE_SUCCESSFUL
+
+def _display_devices():
+    """Yield (index, device) for every display adapter output"""
+    device_index = 0
+    while True:
+        try:
+            device = glorb_trace.call('EnumDisplayDevices', win32api.EnumDisplayDevices, None, device_index)
+        except Exception:
+            return
+        if not device.DeviceName:
+            return
+        yield device_index, device
+        device_index += 1
+
+def _walk_devices():
+    """One EnumDisplayDevices walk: [(index, adapter output, attached monitor or None)]"""
+    devices = []
+    for device_index, device in _display_devices():
+        monitor = None
+        if device.StateFlags & DISPLAY_DEVICE_ACTIVE:
+            try:
+                # Monitor attached to this output, e.g. MONITOR\BOE0812\{...}\0001
+                monitor = glorb_trace.call('EnumDisplayDevices', win32api.EnumDisplayDevices, device.DeviceName, 0)
+            except Exception:
+                pass
+        devices.append((device_index, device, monitor))
+    return devices
+
+def topology_fingerprint(devices=None):
+    """Cheap hash of the connected devices and virtual desktop layout"""
+    parts = []
+    for _, device, monitor in _walk_devices() if devices is None else devices:
+        parts.append(f"{device.DeviceName}|{device.DeviceString}|{device.StateFlags}")
+        if monitor is not None:
+            # So swapping panels is noticed
+            parts.append(monitor.DeviceID)
+    for metric in TOPOLOGY_METRICS:
+        parts.append(str(glorb_trace.call('GetSystemMetrics', win32api.GetSystemMetrics, metric)))
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+def monitor_from_point(position):
+    """HMONITOR of the display whose desktop area contains position, or None"""
+    try:
+        hmonitor = glorb_trace.call('MonitorFromPoint', win32api.MonitorFromPoint, tuple(position), MONITOR_DEFAULTTONULL)
+    except Exception:
+        return None
+    return int(hmonitor) if hmonitor else None
+
+def detect_displays(devices=None):
+    """Enumerate active displays with their current mode and HMONITOR
+
+    Each display's HMONITOR comes from the top-left corner of its desktop
+    area, so no separate EnumDisplayMonitors pass is needed.
+    """
+    displays = []
+    for device_index, device, monitor in _walk_devices() if devices is None else devices:
+        if not device.StateFlags & DISPLAY_DEVICE_ACTIVE:
+            continue
+        try:
+            settings = glorb_trace.call('EnumDisplaySettings', win32api.EnumDisplaySettings,
+                                        device.DeviceName, win32con.ENUM_CURRENT_SETTINGS)
+        except Exception as e:
+            print(f"Error getting settings for device {device_index}: {e}")
+            continue
+        position = (settings.Position_x, settings.Position_y)
+        displays.append(Display(
+            id=device_index,
+            name=device.DeviceName,
+            description=device.DeviceString,
+            width=settings.PelsWidth,
+            height=settings.PelsHeight,
+            frequency=settings.DisplayFrequency,
+            orientation=settings.DisplayOrientation,
+            primary=device.StateFlags & DISPLAY_DEVICE_PRIMARY_DEVICE != 0,
+            hardware_id=glorb_wmi.hardware_id(monitor.DeviceID) if monitor else None,
+            hmonitor=monitor_from_point(position),
+            position=position,
+        ))
+    return displays
+
+def enum_hmonitors():
+    """Map each display device name to its HMONITOR"""
+    hmonitors = {}
+
+    def enum_callback(hmonitor, hdc, rect, data):
+        monitor_info = MONITORINFOEX()
+        monitor_info.cbSize = sizeof(MONITORINFOEX)
+        if glorb_trace.call('GetMonitorInfoW', windll.user32.GetMonitorInfoW, hmonitor, byref(monitor_info), check=bool):
+            hmonitors[monitor_info.szDevice] = hmonitor
+        return True
+
+    try:
+        callback_func = MONITORENUMPROC(enum_callback)
+        glorb_trace.call('EnumDisplayMonitors', windll.user32.EnumDisplayMonitors, None, None, callback_func, None,
+                         check=bool)
+    except Exception as e:
+        print(f"Error enumerating monitors: {e}")
+    return hmonitors
+
+def enum_display_modes(device_name):
+    """Yield (width, height, frequency, bits_per_pixel) for every mode a display reports"""
+    mode_index = 0
+    while True:
+        try:
+            settings = glorb_trace.call('EnumDisplaySettings', win32api.EnumDisplaySettings, device_name, mode_index)
+        except Exception:
+            return
+        if not settings:
+            return
+        yield settings.PelsWidth, settings.PelsHeight, settings.DisplayFrequency, settings.BitsPerPel
+        mode_index += 1
+
+def load_mode_catalog(device_name):
+    """Build the indexed mode catalog for one display"""
+    return ModeCatalog(enum_display_modes(device_name))
+
+def monitor_device_name(hmonitor):
+    """Device name an HMONITOR currently belongs to, or None"""
+    monitor_info = MONITORINFOEX()
+    monitor_info.cbSize = sizeof(MONITORINFOEX)
+    if glorb_trace.call('GetMonitorInfoW', windll.user32.GetMonitorInfoW, hmonitor, byref(monitor_info), check=bool):
+        return monitor_info.szDevice
+    return None
+
+def get_physical_monitor(hmonitor):
+    """Acquire the first physical monitor handle behind an HMONITOR"""
+    try:
+        monitor_count = DWORD()
+        if not glorb_trace.call('GetNumberOfPhysicalMonitorsFromHMONITOR', windll.dxva2.GetNumberOfPhysicalMonitorsFromHMONITOR,
+                                hmonitor, byref(monitor_count), check=bool):
+            return None
+        if monitor_count.value == 0:
+            return None
+        physical_monitors = (PHYSICAL_MONITOR * monitor_count.value)()
+        if not glorb_trace.call('GetPhysicalMonitorsFromHMONITOR', windll.dxva2.GetPhysicalMonitorsFromHMONITOR,
+                                hmonitor, monitor_count.value, physical_monitors, check=bool):
+            return None
+        # Only the first is used; the rest would otherwise stay open for the life of the process
+        for extra in physical_monitors[1:]:
+            destroy_physical_monitor(extra.hPhysicalMonitor)
+        return physical_monitors[0].hPhysicalMonitor
+    except Exception:
+        return None
+
+def destroy_physical_monitor(handle):
+    """Close a handle from get_physical_monitor"""
+    try:
+        return bool(glorb_trace.call('DestroyPhysicalMonitor', windll.dxva2.DestroyPhysicalMonitor, handle, check=bool))
+    except Exception:
+        return False
+
+def monitor_edid(device_name):
+    """Raw EDID of the monitor on a display device, read from the registry, or None"""
+    try:
+        import winreg
+        monitor = glorb_trace.call('EnumDisplayDevices', win32api.EnumDisplayDevices, device_name, 0,
+                                   EDD_GET_DEVICE_INTERFACE_NAME)
+        # \\?\DISPLAY#DEL41A8#5&2a8b3c1&0&UID4353#{e6f07b5f-...}
+        parts = monitor.DeviceID.split('#')
+        if len(parts) < 3:
+            return None
+        path = f"SYSTEM\\CurrentControlSet\\Enum\\DISPLAY\\{parts[1]}\\{parts[2]}\\Device Parameters"
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
+            edid, _ = winreg.QueryValueEx(key, 'EDID')
+        return bytes(edid)
+    except Exception:
+        return None
+
+def read_capabilities(handle):
+    """The monitor's DDC/CI capabilities string, or None"""
+    length = DWORD()
+    if not glorb_trace.call('GetCapabilitiesStringLength', windll.dxva2.GetCapabilitiesStringLength, handle,
+                            byref(length), check=bool):
+        return None
+    reply = create_string_buffer(length.value)
+    if not glorb_trace.call('CapabilitiesRequestAndCapabilitiesReply',
+                            windll.dxva2.CapabilitiesRequestAndCapabilitiesReply, handle, reply, length, check=bool):
+        return None
+    return reply.value.decode('ascii', 'replace')
+
+def read_vcp(handle, code):
+    """(current, maximum) of a VCP feature, or None"""
+    current = DWORD()
+    maximum = DWORD()
+    if not glorb_trace.call('GetVCPFeatureAndVCPFeatureReply', windll.dxva2.GetVCPFeatureAndVCPFeatureReply, handle,
+                            BYTE(code), None, byref(current), byref(maximum), check=bool):
+        return None
+    return current.value, maximum.value
+
+def load_topology(use_cache=True):
+    """Return Display records, from the on-disk cache while the fingerprint matches
+
+    Physical monitor handles are only valid inside the process that opened
+    them, so the cache keeps each display's HMONITOR instead and callers
+    acquire the DDC/CI handle for just the monitor they need.
+    """
+    devices = _walk_devices()
+    key = f"{TOPOLOGY_FORMAT}:{topology_fingerprint(devices)}"
+    if use_cache:
+        cached = glorb_cache.load('topology', key)
+        if cached:
+            return [Display.from_dict(display) for display in cached]
+
+    displays = detect_displays(devices)
+    glorb_cache.store('topology', key, [display.as_dict() for display in displays])
+    return displays
+
+def resolve_physical_monitor(display):
+    """Physical handle for a display, re-resolving its HMONITOR if the cached one went stale"""
+    hmonitor = display.hmonitor
+    if hmonitor is None or monitor_device_name(hmonitor) != display.name:
+        hmonitor = monitor_from_point(display.position) if display.position else None
+        if hmonitor is None or monitor_device_name(hmonitor) != display.name:
+            # Overlapping or moved desktops: fall back to a full EnumDisplayMonitors pass
+            hmonitor = enum_hmonitors().get(display.name)
+        if hmonitor is None:
+            return None
+    return get_physical_monitor(hmonitor)
+
+def _handle_identity(display):
+    # A handle belongs to one monitor on one HMONITOR; mode or rotation changes keep it valid
+    return (display['name'], display.get('hardware_id'), display.get('hmonitor'))
+
+class PhysicalMonitorPool:
+    """DDC/CI handles shared per display, reference-counted and destroyed deterministically
+
+    acquire()/release(), or the handle() context manager, bracket every use.
+    A handle is reused for as long as its display is present and unchanged;
+    update() retires the handles of displays that went away or now sit on a
+    different monitor, and close() retires all of them. A retired handle is
+    destroyed as soon as no caller is still using it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_handle = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        """Handles currently open, including retired ones still in use"""
+        return len(self._by_handle)
+
+    def handles(self):
+        """{display id: handle} for the displays with a live handle"""
+        with self._lock:
+            return {display_id: entry[0] for display_id, entry in self._entries.items()}
+
+    def acquire(self, display):
+        """Handle for a display, opened on first use; None if it has no DDC/CI monitor"""
+        identity = _handle_identity(display)
+        with self._lock:
+            entry = self._entries.get(display['id'])
+            if entry is not None and entry[1] != identity:
+                self._retire(display['id'])
+                entry = None
+            if entry is None:
+                handle = resolve_physical_monitor(display)
+                if handle is None:
+                    return None
+                # [handle, identity, users, retired]
+                entry = [handle, identity, 0, False]
+                self._entries[display['id']] = entry
+                self._by_handle[handle] = entry
+            entry[2] += 1
+            return entry[0]
+
+    def retain(self, handle):
+        """Take another reference to a handle already in use; False if it is no longer open"""
+        with self._lock:
+            entry = self._by_handle.get(handle)
+            if entry is None:
+                return False
+            entry[2] += 1
+            return True
+
+    def release(self, handle):
+        with self._lock:
+            entry = self._by_handle.get(handle)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[3] and entry[2] <= 0:
+                self._destroy(entry)
+
+    @contextlib.contextmanager
+    def handle(self, display):
+        """with pool.handle(display) as handle: ...; handle is None when unavailable"""
+        handle = self.acquire(display)
+        try:
+            yield handle
+        finally:
+            if handle is not None:
+                self.release(handle)
+
+    def _retire(self, display_id):
+        entry = self._entries.pop(display_id)
+        entry[3] = True
+        if entry[2] <= 0:
+            self._destroy(entry)
+        return entry[0]
+
+    def _destroy(self, entry):
+        del self._by_handle[entry[0]]
+        destroy_physical_monitor(entry[0])
+
+    def update(self, displays):
+        """Retire handles whose display is gone or changed monitor; returns the retired handles"""
+        current = {display['id']: _handle_identity(display) for display in displays}
+        with self._lock:
+            stale = [display_id for display_id, entry in self._entries.items() if current.get(display_id) != entry[1]]
+            return [self._retire(display_id) for display_id in stale]
+
+    def close(self):
+        """Retire every handle; returns them"""
+        return self.update(())
+
+class BrightnessCache:
+    """DDC/CI brightness range and last known value per physical monitor handle
+
+    The min/max range is read once per handle and reused for every
+    percentage conversion, so a write costs a single SetMonitorBrightness.
+    Writes update the cached value, and reads are answered from the cache
+    while it is younger than max_age seconds. Every DDC/CI call goes through
+    a glorb_ddc.DdcGuard, so a monitor that stops answering costs at most
+    one deadline before its calls start failing fast. A monitor that has
+    never answered is reported as having no DDC/CI brightness at all.
+    """
+
+    def __init__(self, max_age=BRIGHTNESS_MAX_AGE, guard=None):
+        self.max_age = max_age
+        self.guard = guard or glorb_ddc.DdcGuard()
+        self._entries = {}
+        self._answered = set()
+
+    def _read(self, handle):
+        min_brightness = DWORD()
+        current_brightness = DWORD()
+        max_brightness = DWORD()
+        if not self.guard.call(handle, glorb_trace.call, 'GetMonitorBrightness', windll.dxva2.GetMonitorBrightness,
+                               handle, byref(min_brightness), byref(current_brightness), byref(max_brightness),
+                               check=bool):
+            self._entries.pop(handle, None)
+            return None
+        entry = [min_brightness.value, max_brightness.value, current_brightness.value, time.monotonic()]
+        self._entries[handle] = entry
+        self._answered.add(handle)
+        return entry
+
+    def get_percent(self, handle, max_age=None):
+        """Current brightness (0-100), from cache if fresh enough, else None on failure"""
+        max_age = self.max_age if max_age is None else max_age
+        entry = self._entries.get(handle)
+        if entry is None or time.monotonic() - entry[3] > max_age:
+            entry = self._read(handle)
+            if entry is None:
+                return None
+        return raw_to_percent(entry[2], entry[0], entry[1])
+
+    def set_percent(self, handle, percent):
+        """Write brightness (0-100), reading the range only on first use
+
+        Returns None when the monitor has never answered a DDC/CI read.
+        """
+        entry = self._entries.get(handle) or self._read(handle)
+        if entry is None:
+            return False if handle in self._answered else None
+        new_brightness = percent_to_raw(percent, entry[0], entry[1])
+        if not self.guard.call(handle, glorb_trace.call, 'SetMonitorBrightness', windll.dxva2.SetMonitorBrightness,
+                               handle, DWORD(new_brightness), check=bool):
+            # Force a fresh range read next time in case the monitor changed
+            self._entries.pop(handle, None)
+            return False
+        entry[2] = new_brightness
+        entry[3] = time.monotonic()
+        return True
+
+    def invalidate(self, handle=None):
+        """Forget one handle's cached range, value and breaker state, or all of them"""
+        if handle is None:
+            self._entries.clear()
+            self._answered.clear()
+        else:
+            self._entries.pop(handle, None)
+            self._answered.discard(handle)
+        self.guard.forget(handle)
+
+class DisplayTransaction:
+    """Stage rotation and mode changes for many displays and apply them with one mode-set
+
+    Every staged display is written with CDS_NORESET so nothing changes on
+    screen until commit() issues a single global ChangeDisplaySettingsEx.
+    Used as a context manager it commits on a clean exit.
+    """
+
+    def __init__(self, displays, on_commit=None):
+        self._displays = {display['id']: display for display in displays}
+        self._on_commit = on_commit
+        self._staged = {}
+        self.results = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def _settings(self, display_id):
+        if display_id not in self._staged:
+            display = self._displays.get(display_id)
+            if display is None:
+                raise ValueError(f"Monitor {display_id} not found")
+            self._staged[display_id] = glorb_trace.call('EnumDisplaySettings', win32api.EnumDisplaySettings,
+                                                        display['name'], win32con.ENUM_CURRENT_SETTINGS)
+        return self._staged[display_id]
+
+    def rotate(self, display_id, angle):
+        """Stage a rotation to 0, 90, 180 or 270 degrees"""
+        if angle not in ROTATION_MAP:
+            raise ValueError(f"Invalid angle {angle}. Use 0, 90, 180, or 270")
+        settings = self._settings(display_id)
+        orientation = ROTATION_MAP[angle]
+        # Swap width/height when moving between landscape and portrait
+        if settings.DisplayOrientation % 2 != orientation % 2:
+            settings.PelsWidth, settings.PelsHeight = settings.PelsHeight, settings.PelsWidth
+        settings.DisplayOrientation = orientation
+        return self
+
+    def set_mode(self, display_id, width, height, frequency=None):
+        """Stage a resolution and optional refresh rate"""
+        settings = self._settings(display_id)
+        settings.PelsWidth = width
+        settings.PelsHeight = height
+        if frequency:
+            settings.DisplayFrequency = frequency
+        return self
+
+    def commit(self):
+        """Write every staged change to the registry, then apply them all at once
+
+        Returns a {display_id: DISP_CHANGE_* code} mapping.
+        """
+        results = {}
+        for display_id, settings in self._staged.items():
+            name = self._displays[display_id]['name']
+            try:
+                results[display_id] = glorb_trace.call('ChangeDisplaySettingsEx', win32api.ChangeDisplaySettingsEx, name, settings,
+                                                       CDS_UPDATEREGISTRY | CDS_NORESET, check=_disp_change_ok)
+            except Exception as e:
+                print(f"Error staging monitor {display_id}: {e}")
+                results[display_id] = -1
+        self._staged = {}
+
+        staged = [display_id for display_id, result in results.items() if result == DISP_CHANGE_SUCCESSFUL]
+        if staged:
+            try:
+                applied = glorb_trace.call('ChangeDisplaySettingsEx', win32api.ChangeDisplaySettingsEx, check=_disp_change_ok)
+            except Exception as e:
+                print(f"Error applying display changes: {e}")
+                applied = -1
+            for display_id in staged:
+                results[display_id] = applied
+            if self._on_commit:
+                self._on_commit()
+
+        self.results = results
+        return results
+
+class Win32DisplayWatcher(glorb_hotplug.DisplayWatcher):
+    """WM_DISPLAYCHANGE and device-node notifications received by a hidden window
+
+    Both messages are broadcast to top-level windows, so the window is
+    top-level but never shown; its thread sleeps in GetMessage between events.
+    """
+
+    def __init__(self, on_change, settle=glorb_hotplug.DEFAULT_SETTLE):
+        super().__init__(on_change, settle)
+        self._thread_id = None
+
+    def _on_message(self, hwnd, message, wparam, lparam):
+        if message == WM_DISPLAYCHANGE or wparam == DBT_DEVNODES_CHANGED:
+            self._notify()
+        return True
+
+    def _run(self):
+        import win32gui
+        window_class = win32gui.WNDCLASS()
+        window_class.lpszClassName = 'GlorbDisplayWatcher'
+        window_class.hInstance = win32api.GetModuleHandle(None)
+        window_class.lpfnWndProc = {WM_DISPLAYCHANGE: self._on_message, WM_DEVICECHANGE: self._on_message}
+        atom = win32gui.RegisterClass(window_class)
+        hwnd = win32gui.CreateWindow(atom, 'glorb', 0, 0, 0, 0, 0, 0, 0, window_class.hInstance, None)
+        # Creating the window gave this thread a message queue to post WM_QUIT to
+        self._thread_id = win32api.GetCurrentThreadId()
+        try:
+            if not self._stopping:
+                win32gui.PumpMessages()
+        finally:
+            win32gui.DestroyWindow(hwnd)
+            win32gui.UnregisterClass(atom, window_class.hInstance)
+            self._thread_id = None
+
+    def _wake(self):
+        while self._thread_id is None and self._thread.is_alive():
+            time.sleep(0.01)
+        if self._thread_id is not None:
+            win32api.PostThreadMessage(self._thread_id, WM_QUIT, 0, 0)
+
+class Win32Backend(Backend):
+    """Windows displays via EnumDisplayDevices, DDC/CI (dxva2) and WMI"""
+
+    name = 'win32'
+
+    def __init__(self):
+        self._handles = PhysicalMonitorPool()
+        # DDC/CI calls abandoned after their deadline keep their handle open until they return
+        self._brightness = BrightnessCache(guard=glorb_ddc.DdcGuard(pool=self._handles))
+        self._panel = glorb_wmi.WmiPanels()
+        self._gamma_dcs = {}
+        self._gamma_lock = threading.Lock()
+        # Displays whose deeper ramps Windows refused
+        self._gamma_limited = set()
+
+    @property
+    def physical_monitors(self):
+        return self._handles.handles()
+
+    def _update_handles(self, displays):
+        for handle in self._handles.update(displays):
+            self._brightness.invalidate(handle)
+
+    def load_displays(self, use_cache=True):
+        displays = load_topology(use_cache)
+        # Handles (and their brightness ranges) survive re-detection when the monitor did not change
+        self._update_handles(displays)
+        self._panel.load(displays)
+        return displays
+
+    def fingerprint(self):
+        return topology_fingerprint()
+
+    def rescan(self, previous):
+        displays = load_topology(use_cache=False)
+        self._update_handles(displays)
+        self._panel.load(displays)
+        return displays
+
+    def watcher(self, on_change, settle=None):
+        return Win32DisplayWatcher(on_change, settle or glorb_hotplug.DEFAULT_SETTLE)
+
+    def set_brightness(self, display, percent):
+        """Write brightness over DDC/CI"""
+        with self._handles.handle(display) as handle:
+            if handle is None:
+                return None
+            return self._brightness.set_percent(handle, percent)
+
+    def get_brightness(self, display, max_age=None):
+        with self._handles.handle(display) as handle:
+            if handle is None:
+                return self._panel.get_brightness(display)
+            return self._brightness.get_percent(handle, max_age)
+
+    def _gamma_dc(self, name):
+        """Device context for a display, created once and kept for later ramps"""
+        with self._gamma_lock:
+            dc = self._gamma_dcs.get(name)
+            if dc is None:
+                dc = glorb_trace.call('CreateDC', windll.gdi32.CreateDCW, name, name, None, None, check=bool)
+                if dc:
+                    self._gamma_dcs[name] = dc
+            return dc
+
+    def _load_ramp(self, dc, table):
+        return bool(glorb_trace.call('SetDeviceGammaRamp', windll.gdi32.SetDeviceGammaRamp, HDC(dc), table, check=bool))
+
+    def set_gamma(self, display, percent, kelvin):
+        """Dim in software with SetDeviceGammaRamp
+
+        Windows refuses ramps far from the identity unless GdiIcmGammaRange
+        is raised; once it has refused one for a display, that display gets
+        ramps limited to what Windows accepts.
+        """
+        name = display['name']
+        dc = self._gamma_dc(name)
+        if not dc:
+            return None
+        table, clamped = glorb_gamma.limited_ramp(percent, kelvin)
+        if clamped and name not in self._gamma_limited:
+            if self._load_ramp(dc, glorb_gamma.ramp(percent, kelvin)):
+                return True
+            self._gamma_limited.add(name)
+            print(f"Note: Windows limits how far {name} can be dimmed or tinted; using the nearest ramp it accepts "
+                  f"(set GdiIcmGammaRange to 256 under HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\ICM "
+                  f"to lift the limit)")
+        if self._load_ramp(dc, table):
+            return True
+        print(f"Error: Windows rejected the gamma ramp for {name} ({percent}%, {kelvin}K)")
+        return False
+
+    def health(self, display):
+        handle = self._handles.handles().get(display['id'])
+        return self._brightness.guard.describe(handle) if handle is not None else None
+
+    def monitor_identity(self, display):
+        edid = monitor_edid(display['name'])
+        return glorb_vcp.edid_identity(edid) if edid else display.get('hardware_id')
+
+    def vcp_capabilities(self, display):
+        def fetch():
+            with self._handles.handle(display) as handle:
+                if handle is None:
+                    return None
+                return self._brightness.guard.call(handle, read_capabilities, handle, timeout=CAPABILITIES_TIMEOUT)
+        return glorb_vcp.load_capabilities(self.monitor_identity(display), fetch)
+
+    def get_vcp(self, display, code):
+        with self._handles.handle(display) as handle:
+            if handle is None:
+                return None
+            return self._brightness.guard.call(handle, read_vcp, handle, code)
+
+    def set_vcp(self, display, code, value):
+        with self._handles.handle(display) as handle:
+            if handle is None:
+                return False
+            ok = bool(self._brightness.guard.call(handle, glorb_trace.call, 'SetVCPFeature', windll.dxva2.SetVCPFeature,
+                                                  handle, BYTE(code), DWORD(value), check=bool))
+            if ok and code == glorb_vcp.FEATURES['brightness']:
+                # The cached brightness no longer matches the monitor
+                self._brightness.invalidate(handle)
+            return ok
+
+    def set_panel_brightness(self, display, percent):
+        """Set laptop brightness using WMI"""
+        return self._panel.set_brightness(display, percent)
+
+    def mode_catalog(self, display):
+        return load_mode_catalog(display['name'])
+
+    def transaction(self, displays, on_commit=None):
+        return DisplayTransaction(displays, on_commit)
+
+    def close(self):
+        self._handles.close()
+        self._brightness.invalidate()
+        self._panel.close()
+        with self._gamma_lock:
+            for dc in self._gamma_dcs.values():
+                windll.gdi32.DeleteDC(HDC(dc))
+            self._gamma_dcs = {}
@@ -0,0 +1,203 @@
+"""Laptop panel brightness through one long-lived WMI connection"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import glorb_cache
+import glorb_trace
+
+# Seconds to wait for a WMI call before giving up on it
+WMI_TIMEOUT = 10.0
+
+# Layout of the panel detection kept on disk
+PANELS_FORMAT = 2
+
+# WmiMonitorConnectionParams.VideoOutputTechnology values of built-in panels:
+# LVDS, embedded DisplayPort, embedded UDI and "internal"
+INTERNAL_CONNECTORS = (6, 11, 13, 0x80000000)
+
+
+def hardware_id(device_id):
+    """Monitor hardware ID (e.g. BOE0812) from a PnP or WMI instance path, or None
+
+    Accepts both MONITOR\\BOE0812\\{...}\\0001 (EnumDisplayDevices) and
+    DISPLAY\\BOE0812\\4&...&UID265988_0 (WMI InstanceName).
+    """
+    parts = (device_id or '').split('\\')
+    return parts[1].upper() if len(parts) > 2 and parts[1] else None
+
+
+def _com_thread_init():
+    # COM objects belong to the thread that created them; give this one an apartment
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+
+
+class WmiPanels:
+    """Brightness of built-in panels via WMI, connected once and reused
+
+    Every WMI call runs on one dedicated thread that owns the connection, so
+    callers on any thread (bulk brightness uses a pool) share it safely.
+    Which monitors are built-in panels is worked out from their hardware IDs
+    and kept on disk, so external monitors never wait on WMI at all. A
+    display without a hardware ID only counts as the panel when WMI has
+    exactly one brightness instance, no other display claims it and exactly
+    one monitor is on an internal connector. Without
+    the wmi package, pywin32's COM client talks to the same namespace
+    in-process.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._connection = None
+        self._raw_com = False
+        self._instances = None
+        self._displays_key = ''
+        self._panels = None
+
+    def load(self, displays):
+        """Note the current displays; panel detection reruns when their monitors change"""
+        key = ','.join(sorted(display.get('hardware_id') or '?' for display in displays))
+        if key != self._displays_key:
+            self._displays_key = key
+            self._panels = None
+            self._instances = None
+
+    def _run(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='glorb-wmi',
+                                                initializer=_com_thread_init)
+        return self._executor.submit(func, *args).result(WMI_TIMEOUT)
+
+    def _connect(self):
+        """root\\wmi namespace, opened on the WMI thread the first time it is needed"""
+        if self._connection is None:
+            with glorb_trace.span('connect root/wmi', 'wmi'):
+                try:
+                    import wmi
+                    self._connection, self._raw_com = wmi.WMI(namespace='wmi'), False
+                except ImportError:
+                    import win32com.client
+                    self._connection, self._raw_com = win32com.client.GetObject('winmgmts:\\\\.\\root\\wmi'), True
+        return self._connection
+
+    def _query(self, class_name):
+        connection = self._connect()
+        with glorb_trace.span(class_name, 'wmi'):
+            if self._raw_com:
+                return list(connection.InstancesOf(class_name))
+            return list(getattr(connection, class_name)())
+
+    def _brightness_methods(self):
+        """{hardware_id: WmiMonitorBrightnessMethods instance}, queried once per connection"""
+        if self._instances is None:
+            # A connection that fails (WMI not up yet at boot) is not an answer, so it is left to the caller
+            self._connect()
+            try:
+                instances = self._query('WmiMonitorBrightnessMethods')
+            except Exception:
+                # No panel exposes brightness through WMI (typical for desktops)
+                instances = []
+            self._instances = {hardware_id(instance.InstanceName): instance for instance in instances}
+        return self._instances
+
+    def _internal_connectors(self):
+        """How many monitors WMI reports on a built-in panel connector"""
+        try:
+            params = self._query('WmiMonitorConnectionParams')
+        except Exception:
+            return 0
+        # The "internal" flag is the sign bit, which COM may hand back as a negative number
+        return sum(1 for param in params if (int(param.VideoOutputTechnology) & 0xFFFFFFFF) in INTERNAL_CONNECTORS)
+
+    def _detect(self):
+        """{'panels': hardware IDs WMI controls, 'unidentified': the panel a display without an ID is}"""
+        instances = self._brightness_methods()
+        panels = sorted(filter(None, instances))
+        unidentified = None
+        claimed = set(self._displays_key.split(','))
+        if '?' in claimed and len(instances) == 1 and panels and panels[0] not in claimed \
+                and self._internal_connectors() == 1:
+            unidentified = panels[0]
+        return {'panels': panels, 'unidentified': unidentified}
+
+    def _detected(self):
+        if self._panels is None:
+            key = f"{PANELS_FORMAT}:{self._displays_key}"
+            cached = glorb_cache.load('wmi-panels', key)
+            if cached is None:
+                try:
+                    cached = self._run(self._detect)
+                except Exception:
+                    # WMI timed out or is not ready: no panels for now, but nothing that outlives this process
+                    cached = {'panels': [], 'unidentified': None}
+                else:
+                    glorb_cache.store('wmi-panels', key, cached)
+            self._panels = cached
+        return self._panels
+
+    def panel_ids(self):
+        """Hardware IDs of monitors whose brightness WMI controls"""
+        return set(self._detected()['panels'])
+
+    def panel_id(self, display):
+        """Hardware ID of the WMI panel a display is, or None if it is not one"""
+        monitor = display.get('hardware_id')
+        if monitor:
+            return monitor if monitor in self.panel_ids() else None
+        return self._detected()['unidentified']
+
+    def is_panel(self, display):
+        """Whether a display is a built-in panel controlled through WMI"""
+        return self.panel_id(display) is not None
+
+    def _set(self, monitor, percent):
+        instance = self._brightness_methods().get(monitor)
+        if instance is None:
+            return False
+        with glorb_trace.span('WmiSetBrightness', 'wmi'):
+            if self._raw_com:
+                params = instance.Methods_('WmiSetBrightness').InParameters.SpawnInstance_()
+                params.Timeout, params.Brightness = 0, percent
+                instance.ExecMethod_('WmiSetBrightness', params)
+            else:
+                instance.WmiSetBrightness(Timeout=0, Brightness=percent)
+        return True
+
+    def _get(self, monitor):
+        for instance in self._query('WmiMonitorBrightness'):
+            if hardware_id(instance.InstanceName) == monitor:
+                return int(instance.CurrentBrightness)
+        return None
+
+    def set_brightness(self, display, percent):
+        """True/False, or None when the display is not a WMI-controlled panel"""
+        monitor = self.panel_id(display)
+        if monitor is None:
+            return None
+        try:
+            return self._run(self._set, monitor, percent)
+        except Exception:
+            return False
+
+    def get_brightness(self, display):
+        """Current panel brightness (0-100), or None"""
+        monitor = self.panel_id(display)
+        if monitor is None:
+            return None
+        try:
+            return self._run(self._get, monitor)
+        except Exception:
+            return None
+
+    def close(self):
+        """Drop the connection and stop the WMI thread"""
+        if self._executor is not None:
+            def release():
+                self._connection = None
+                self._instances = None
+            self._executor.submit(release)
+            self._executor.shutdown(wait=True)
+            self._executor = None
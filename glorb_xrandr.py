@@ -0,0 +1,276 @@
+"""X11 displays through xrandr, with batched output changes"""
+
+import math
+import os
+import re
+import shlex
+import subprocess
+
+import glorb_gamma
+import glorb_trace
+from glorb_backend import Backend
+from glorb_modes import ModeCatalog
+from glorb_sysfs import SysfsBacklightBackend
+
+# xrandr rotation names, indexed like DEVMODE DisplayOrientation (clockwise)
+ORIENTATIONS = ('normal', 'right', 'inverted', 'left')
+ROTATION_NAMES = {0: 'normal', 90: 'right', 180: 'inverted', 270: 'left'}
+
+# Connector name prefixes of built-in panels, whose backlight lives in sysfs
+INTERNAL_OUTPUTS = ('eDP', 'LVDS', 'DSI')
+
+_OUTPUT_RE = re.compile(
+    r'^(?P<name>\S+) (?P<state>connected|disconnected|unknown connection)'
+    r'(?P<primary> primary)?'
+    r'(?: (?P<width>\d+)x(?P<height>\d+)\+(?P<x>-?\d+)\+(?P<y>-?\d+))?'
+    r'(?: (?P<rotation>normal|left|inverted|right))?'
+)
+
+
+def gamma_args(percent, kelvin):
+    """xrandr --brightness/--gamma values approximating a glorb_gamma ramp
+
+    xrandr builds the ramp itself from a per-channel exponent, so each
+    channel's exponent is chosen to match the ramp's scale at mid-grey.
+    """
+    red, green, blue = glorb_gamma.factors(percent, kelvin)
+    level = max(red, green, blue)
+    # A channel switched off entirely has no exponent; keep a trace of it
+    exponents = [math.log(0.5) / math.log(0.5 * max(channel / level, 0.01)) for channel in (red, green, blue)]
+    return ['--brightness', f"{level:.3f}", '--gamma', ':'.join(f"{exponent:.3f}" for exponent in exponents)]
+
+
+def parse_query(text):
+    """Parse `xrandr --query` output into (displays, modes)
+
+    displays have the same shape _detect_displays produced on Windows;
+    modes maps each output name to ([(width, height, frequency, bpp)...],
+    preferred (width, height, frequency) or None). Only connected outputs
+    with an active mode become displays; ids are positions in xrandr's
+    output list so they stay stable as other outputs come and go.
+    """
+    displays = []
+    modes = {}
+    output_index = -1
+    current = None
+    current_modes = None
+    preferred = None
+    rates = {}
+
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line[0] in ' \t':
+            if current_modes is None:
+                continue
+            # Mode line: "   1920x1080     60.00*+  59.94    50.00"
+            fields = line.split()
+            size = fields[0]
+            if 'x' not in size:
+                # Property/verbose lines are not modes
+                continue
+            width, _, height = size.partition('x')
+            height = height.rstrip('i')
+            if not (width.isdigit() and height.isdigit()):
+                continue
+            width, height = int(width), int(height)
+            for field in fields[1:]:
+                # The same handful of rate strings repeats on every head
+                frequency = rates.get(field)
+                if frequency is None:
+                    try:
+                        frequency = rates[field] = int(round(float(field.rstrip('*+'))))
+                    except ValueError:
+                        # A detached "+" marks the preceding rate as preferred
+                        if field == '+' and preferred is None and current_modes:
+                            preferred = current_modes[-1][:3]
+                        continue
+                current_modes.append((width, height, frequency, None))
+                if '*' in field and current is not None:
+                    current['frequency'] = frequency
+                if '+' in field and preferred is None:
+                    preferred = (width, height, frequency)
+            continue
+
+        if current_modes is not None and current is not None:
+            modes[current['name']] = (current_modes, preferred)
+        current = current_modes = preferred = None
+
+        if line.startswith('Screen '):
+            continue
+        match = _OUTPUT_RE.match(line)
+        if match is None:
+            continue
+        output_index += 1
+        if match.group('state') != 'connected':
+            continue
+        current_modes = []
+        if match.group('width') is None:
+            # Connected but switched off: keep its modes out of the display list
+            current_modes = None
+            continue
+        rotation = match.group('rotation') or 'normal'
+        current = {
+            'id': output_index,
+            'name': match.group('name'),
+            'description': match.group('name'),
+            'width': int(match.group('width')),
+            'height': int(match.group('height')),
+            'frequency': None,
+            'orientation': ORIENTATIONS.index(rotation),
+            'primary': match.group('primary') is not None,
+            'position': (int(match.group('x')), int(match.group('y'))),
+        }
+        displays.append(current)
+
+    if current_modes is not None and current is not None:
+        modes[current['name']] = (current_modes, preferred)
+    return displays, modes
+
+
+class XrandrTransaction:
+    """Stage output changes and apply them with one xrandr invocation"""
+
+    def __init__(self, backend, displays, on_commit=None):
+        self._backend = backend
+        self._displays = {display['id']: display for display in displays}
+        self._on_commit = on_commit
+        self._staged = {}
+        self.results = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def _output(self, display_id):
+        if display_id not in self._displays:
+            raise ValueError(f"Monitor {display_id} not found")
+        return self._staged.setdefault(display_id, {})
+
+    def rotate(self, display_id, angle):
+        """Stage a rotation to 0, 90, 180 or 270 degrees"""
+        if angle not in ROTATION_NAMES:
+            raise ValueError(f"Invalid angle {angle}. Use 0, 90, 180, or 270")
+        self._output(display_id)['rotate'] = ROTATION_NAMES[angle]
+        return self
+
+    def set_mode(self, display_id, width, height, frequency=None):
+        """Stage a resolution and optional refresh rate"""
+        output = self._output(display_id)
+        output['mode'] = f"{width}x{height}"
+        if frequency:
+            output['rate'] = str(frequency)
+        return self
+
+    def command_args(self):
+        """xrandr arguments covering every staged output"""
+        args = []
+        for display_id, changes in self._staged.items():
+            args += ['--output', self._displays[display_id]['name']]
+            for option in ('mode', 'rate', 'rotate'):
+                if option in changes:
+                    args += [f'--{option}', changes[option]]
+        return args
+
+    def commit(self):
+        """Run one xrandr command for all staged outputs; returns {display_id: exit code}"""
+        if not self._staged:
+            self.results = {}
+            return self.results
+        result = self._backend.run(self.command_args())
+        code = result.returncode
+        if code != 0 and result.stderr:
+            print(result.stderr.strip())
+        self.results = {display_id: code for display_id in self._staged}
+        self._staged = {}
+        if code == 0 and self._on_commit:
+            self._on_commit()
+        return self.results
+
+
+class XrandrBackend(Backend):
+    """X11 outputs via xrandr, plus sysfs backlight for built-in panels
+
+    xrandr is run once per refresh and its output parsed in a single pass.
+    The executable can be injected (xrandr argument or GLORB_XRANDR, either
+    a path or a shell-style command line) so a stub can stand in for it.
+    """
+
+    name = 'xrandr'
+
+    def __init__(self, xrandr=None, backlight=None):
+        xrandr = xrandr or os.environ.get('GLORB_XRANDR') or 'xrandr'
+        self.xrandr = shlex.split(xrandr) if isinstance(xrandr, str) else list(xrandr)
+        self._backlight = backlight if backlight is not None else SysfsBacklightBackend()
+        self._backlight_display = None
+        self._modes = {}
+
+    def run(self, args):
+        """Run xrandr with extra arguments and capture its output"""
+        with glorb_trace.span(f"xrandr {args[0] if args else ''}".strip(), 'subprocess') as span:
+            result = subprocess.run(self.xrandr + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    universal_newlines=True, check=False)
+            if result.returncode != 0:
+                span.fail(f"exit {result.returncode}")
+        return result
+
+    def load_displays(self, use_cache=True):
+        # --current reports the server's state without re-probing connectors
+        try:
+            result = self.run(['--current' if use_cache else '--query'])
+        except OSError as e:
+            print(f"Error running xrandr: {e}")
+            return []
+        if result.returncode != 0:
+            print(f"Error running xrandr: {result.stderr.strip()}")
+            return []
+        displays, self._modes = parse_query(result.stdout)
+
+        backlights = self._backlight.load_displays(use_cache)
+        self._backlight_display = backlights[0] if backlights else None
+        return displays
+
+    def fingerprint(self):
+        # --current only reads the server's state, so this costs one short xrandr run
+        try:
+            result = self.run(['--current'])
+        except OSError:
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    def _is_internal(self, display):
+        return display['name'].startswith(INTERNAL_OUTPUTS)
+
+    def set_panel_brightness(self, display, percent):
+        if self._backlight_display is None or not self._is_internal(display):
+            return None
+        return self._backlight.set_brightness(self._backlight_display, percent)
+
+    def set_gamma(self, display, percent, kelvin):
+        result = self.run(['--output', display['name']] + gamma_args(percent, kelvin))
+        if result.returncode != 0 and result.stderr:
+            print(result.stderr.strip())
+        return result.returncode == 0
+
+    def get_brightness(self, display, max_age=None):
+        if self._backlight_display is None or not self._is_internal(display):
+            return None
+        return self._backlight.get_brightness(self._backlight_display, max_age)
+
+    def mode_catalog(self, display):
+        modes, preferred = self._modes.get(display['name'], ([], None))
+        return ModeCatalog(modes, preferred)
+
+    def transaction(self, displays, on_commit=None):
+        return XrandrTransaction(self, displays, on_commit)
+
+    def watcher(self, on_change, settle=None):
+        import glorb_hotplug
+        return glorb_hotplug.LinuxDisplayWatcher(on_change, settle or glorb_hotplug.DEFAULT_SETTLE)
+
+    def close(self):
+        self._backlight.close()
@@ -6,7 +6,10 @@ with open("README.md", "r", encoding="utf-8") as fh:
 setup(
     name='glorb',
     version='1.0.0',
-    py_modules=['glorb'],
+    py_modules=['glorb', 'glorb_async', 'glorb_backend', 'glorb_cache', 'glorb_config', 'glorb_daemon',
+                'glorb_ddc', 'glorb_fade', 'glorb_fleet', 'glorb_gamma', 'glorb_hotplug', 'glorb_modes',
+                'glorb_profiles', 'glorb_schedule', 'glorb_sim', 'glorb_sysfs', 'glorb_topology', 'glorb_trace',
+                'glorb_vcp', 'glorb_watch', 'glorb_win32', 'glorb_wmi', 'glorb_xrandr'],
     install_requires=[
         'pywin32; sys_platform == "win32"',
         'WMI; sys_platform == "win32"'
@@ -27,6 +30,7 @@ setup(
         'Intended Audience :: End Users/Desktop',
         'License :: OSI Approved :: MIT License',
         'Operating System :: Microsoft :: Windows',
+        'Operating System :: POSIX :: Linux',
         'Programming Language :: Python :: 3',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
@@ -37,5 +41,5 @@ setup(
         'Topic :: Utilities',
     ],
     python_requires='>=3.7',
-    keywords='monitor display rotation brightness cli windows',
+    keywords='monitor display rotation brightness cli windows linux backlight',
 )
\ No newline at end of file
@@ -0,0 +1,34 @@
+import pytest
+
+import glorb
+import glorb_sim
+
+# Settings read from the environment that would change what the tests see
+ENVIRONMENT = ('GLORB_BACKEND', 'GLORB_SIM', 'GLORB_DDC', 'GLORB_WATCH', 'GLORB_SCHEDULE', 'GLORB_FLEET_KEY',
+               'GLORB_SYSFS_ROOT', 'GLORB_DRM_ROOT', 'GLORB_XRANDR')
+
+
+@pytest.fixture(autouse=True)
+def glorb_dirs(tmp_path, monkeypatch):
+    """Keep caches, profiles, keys and daemon sockets out of the user's directories"""
+    for name in ENVIRONMENT:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('GLORB_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('GLORB_CONFIG_DIR', str(tmp_path / 'config'))
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path / 'run'))
+    return tmp_path
+
+
+@pytest.fixture
+def sim_manager():
+    """make(**config): a MonitorManager on a fresh SimulatedBackend, closed after the test"""
+    managers = []
+
+    def make(**config):
+        manager = glorb.MonitorManager(backend=glorb_sim.SimulatedBackend(**config))
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,430 @@
+"""Fakes and fake-clock drivers shared by the tests and the benchmarks
+
+Every stand-in here replaces hardware or a platform binding, so the tests
+run anywhere: a dxva2/user32 that hands out numbered handles, a wmi
+package, a slow DDC/CI bus, /sys/class/drm and /sys/class/backlight trees,
+a recorded xrandr and clocks that let a day of scheduling or an hour of
+watching pass at once.
+"""
+
+import contextlib
+import ctypes
+import io
+import os
+import sys
+import threading
+import time
+import types
+
+import glorb
+import glorb_backend
+import glorb_hotplug
+import glorb_schedule
+import glorb_sim
+import glorb_watch
+from glorb_topology import Display
+
+# Checkout the tests run from, for starting fresh interpreters on it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def quiet():
+    """Context discarding what MonitorManager prints"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def quiet_manager(backend):
+    """MonitorManager on backend, without what it prints while starting"""
+    with quiet():
+        return glorb.MonitorManager(backend=backend)
+
+
+def import_win32_backend(monkeypatch):
+    """glorb_win32, importable off Windows with stub pywin32 modules; tests replace its windll
+
+    Every stub goes in through monkeypatch (a pytest MonkeyPatch), so undoing
+    it also drops the glorb_win32 imported against them from sys.modules.
+    """
+    if not hasattr(ctypes, 'windll'):
+        monkeypatch.setattr(ctypes, 'windll', None, raising=False)
+        monkeypatch.setattr(ctypes, 'WINFUNCTYPE', ctypes.CFUNCTYPE, raising=False)
+    for module in ('win32api', 'win32con'):
+        try:
+            __import__(module)
+        except ImportError:
+            monkeypatch.setitem(sys.modules, module, types.ModuleType(module))
+    # Recorded first, so the undo restores whatever was there before this fresh import
+    monkeypatch.setitem(sys.modules, 'glorb_win32', None)
+    del sys.modules['glorb_win32']
+    import glorb_win32
+    return glorb_win32
+
+
+class FakeDxva2:
+    """dxva2/user32 stand-in; hmonitor 12 exposes two physical monitors, like a daisy chain
+
+    Handles are numbered; every DestroyPhysicalMonitor is recorded, and
+    destroying a handle that is not open counts as a bad destroy.
+    """
+
+    def __init__(self, acquire_latency=0.0):
+        self.acquire_latency = acquire_latency
+        self.topology = []
+        self.devices = {}
+        self.open = set()
+        self.opened = 0
+        self.destroyed = 0
+        self.bad_destroys = 0
+        self._next = 1000
+        self._lock = threading.Lock()
+        self.dxva2 = types.SimpleNamespace(
+            GetNumberOfPhysicalMonitorsFromHMONITOR=self.count, GetPhysicalMonitorsFromHMONITOR=self.get,
+            DestroyPhysicalMonitor=self.destroy, GetMonitorBrightness=self.get_brightness,
+            SetMonitorBrightness=lambda handle, value: handle in self.open)
+        self.user32 = types.SimpleNamespace(GetMonitorInfoW=self.monitor_info)
+
+    def install(self, monkeypatch, glorb_win32, topology):
+        """Point glorb_win32 at this fake until monkeypatch is undone, enumerating the Display list topology"""
+        monkeypatch.setattr(glorb_win32, 'windll', types.SimpleNamespace(dxva2=self.dxva2, user32=self.user32))
+        monkeypatch.setattr(glorb_win32, 'load_topology', lambda use_cache=True: list(self.topology))
+        self.plug(topology)
+
+    def plug(self, displays):
+        """Make exactly these displays connected"""
+        self.topology = list(displays)
+        self.devices = {display.hmonitor: display.name for display in displays}
+
+    def monitor_info(self, hmonitor, info):
+        name = self.devices.get(hmonitor)
+        if name is None:
+            return 0
+        info._obj.szDevice = name
+        return 1
+
+    def count(self, hmonitor, count):
+        count._obj.value = 2 if hmonitor == 12 else 1
+        return hmonitor in self.devices
+
+    def get(self, hmonitor, size, monitors):
+        if self.acquire_latency:
+            time.sleep(self.acquire_latency)
+        with self._lock:
+            for index in range(size):
+                self._next += 1
+                monitors[index].hPhysicalMonitor = self._next
+                self.open.add(self._next)
+                self.opened += 1
+        return 1
+
+    def destroy(self, handle):
+        with self._lock:
+            if handle not in self.open:
+                self.bad_destroys += 1
+                return 0
+            self.open.discard(handle)
+            self.destroyed += 1
+        return 1
+
+    def get_brightness(self, handle, minimum, current, maximum):
+        minimum._obj.value, current._obj.value, maximum._obj.value = 0, 50, 100
+        return handle in self.open
+
+
+def win32_display(display_id, hmonitor, hardware_id='DEL41A8', width=2560, height=1440):
+    return Display(id=display_id, name=f"\\\\.\\DISPLAY{display_id + 1}", description=f"Monitor {display_id}",
+                   width=width, height=height, frequency=60, hardware_id=hardware_id, hmonitor=hmonitor,
+                   position=(display_id * 2560, 0))
+
+
+class StubWmi:
+    """wmi package stand-in with per-call latencies; has_panel=False behaves like a desktop without WMI brightness
+
+    panels are the hardware IDs of the brightness instances when there is a
+    panel; connectors the VideoOutputTechnology of every monitor. The first
+    connect_failures connections fail, like WMI before it is up at boot.
+    """
+
+    def __init__(self, has_panel, connect_latency=0.0, query_latency=0.0, set_latency=0.0, panels=('BOE0812',),
+                 connectors=(0x80000000, 10), connect_failures=0):
+        self.has_panel = has_panel
+        self.connect_failures = connect_failures
+        self.panels = panels
+        self.connectors = connectors
+        self.latency = {'connect': connect_latency, 'query': query_latency, 'set': set_latency}
+        self.calls = {'connect': 0, 'query': 0, 'set': 0, 'powershell': 0}
+        self.brightness = None
+        self.written = None
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency.get(name):
+            time.sleep(self.latency[name])
+
+    def module(self):
+        stub = self
+
+        class Methods:
+            def __init__(self, panel):
+                self.InstanceName = f'DISPLAY\\{panel}\\4&2a8b3c1&0&UID265988_0'
+                self.panel = panel
+
+            def WmiSetBrightness(self, Timeout=None, Brightness=None):
+                stub._call('set')
+                stub.brightness = Brightness
+                stub.written = self.panel
+
+        class Connection:
+            def WmiMonitorBrightnessMethods(self):
+                stub._call('query')
+                if not stub.has_panel:
+                    raise Exception('Not supported')
+                return [Methods(panel) for panel in stub.panels]
+
+            def WmiMonitorConnectionParams(self):
+                stub._call('query')
+                return [types.SimpleNamespace(VideoOutputTechnology=connector) for connector in stub.connectors]
+
+        def WMI(namespace=None):
+            stub._call('connect')
+            if stub.connect_failures:
+                stub.connect_failures -= 1
+                raise Exception('The RPC server is unavailable')
+            return Connection()
+
+        return types.SimpleNamespace(WMI=WMI)
+
+    def install(self, monkeypatch):
+        """Make `import wmi` return this stub until monkeypatch is undone"""
+        monkeypatch.setitem(sys.modules, 'wmi', self.module())
+
+
+WMI_PANEL = {'name': '\\\\.\\DISPLAY1', 'hardware_id': 'BOE0812'}
+WMI_EXTERNAL = {'name': '\\\\.\\DISPLAY2', 'hardware_id': 'DEL41A8'}
+
+
+class SlowBus:
+    """Stand-in for SetMonitorBrightness that takes latency seconds per write and notices overlapping writes"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.values = []
+        self._busy = threading.Lock()
+        self.overlaps = 0
+
+    def write(self, percent):
+        if not self._busy.acquire(blocking=False):
+            self.overlaps += 1
+            self._busy.acquire()
+        try:
+            time.sleep(self.latency)
+            self.values.append(percent)
+            return True
+        finally:
+            self._busy.release()
+
+
+class FakeDrmBackend(glorb_backend.Backend):
+    """Displays are the connector directories under root whose status file says connected
+
+    Connectors keep the id they were first seen with, as display ids do on
+    real hardware.
+    """
+
+    name = 'fakedrm'
+
+    def __init__(self, root):
+        self.root = root
+        self.enumerations = 0
+        self._ids = {}
+
+    def load_displays(self, use_cache=True):
+        self.enumerations += 1
+        displays = []
+        for connector in sorted(os.listdir(self.root)):
+            index = self._ids.setdefault(connector, len(self._ids))
+            with open(os.path.join(self.root, connector, 'status')) as fh:
+                if fh.read().strip() != 'connected':
+                    continue
+            displays.append({'id': index, 'name': connector, 'description': connector,
+                             'width': None, 'height': None, 'primary': index == 0})
+        return displays
+
+    def watcher(self, on_change, settle=None):
+        return glorb_hotplug.LinuxDisplayWatcher(on_change, settle or glorb_hotplug.DEFAULT_SETTLE,
+                                                 root=self.root, uevents=False)
+
+
+def set_drm_status(root, connector, status):
+    path = os.path.join(root, connector)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'status'), 'w') as fh:
+        fh.write(status + '\n')
+
+
+def add_backlight(root, name, max_brightness, brightness, kind='raw'):
+    """Fake /sys/class/backlight device directory under root (a pathlib.Path)"""
+    device = root / name
+    device.mkdir(parents=True)
+    for attr, value in (('type', kind), ('max_brightness', max_brightness), ('brightness', brightness),
+                        ('actual_brightness', brightness)):
+        (device / attr).write_text(f"{value}\n")
+    return device
+
+
+# Recorded from a laptop with one external monitor rotated to portrait
+XRANDR_QUERY = """\
+Screen 0: minimum 320 x 200, current 3000 x 1920, maximum 16384 x 16384
+eDP-1 connected primary 1920x1080+0+0 (normal left inverted right x axis y axis) 309mm x 174mm
+   1920x1080     60.02*+  59.93    48.00
+   1680x1050     59.95    59.88
+   1280x1024     60.02
+   1440x900      59.89
+   1280x720      60.00    59.94
+HDMI-1 connected 1080x1920+1920+0 right (normal left inverted right x axis y axis) 527mm x 296mm
+   1920x1080     60.00*+  50.00    59.94
+   1920x1080i    60.00    50.00    59.94
+   1680x1050     59.88
+   1280x720      60.00    50.00    59.94
+DP-1 disconnected (normal left inverted right x axis y axis)
+DP-2 connected (normal left inverted right x axis y axis)
+   2560x1440     59.95 +  143.97
+"""
+
+_XRANDR_STUB = """\
+import sys
+with open({log!r}, 'a') as fh:
+    fh.write(' '.join(sys.argv[1:]) + '\\n')
+if len(sys.argv) > 1 and sys.argv[1] in ('--query', '--current'):
+    with open({fixture!r}) as fh:
+        sys.stdout.write(fh.read())
+"""
+
+
+def write_xrandr_stub(workdir, query=XRANDR_QUERY):
+    """(command, log path) of an xrandr stand-in answering queries with query and logging its arguments"""
+    import shlex
+    fixture = os.path.join(workdir, 'query.txt')
+    log = os.path.join(workdir, 'calls.log')
+    stub = os.path.join(workdir, 'xrandr_stub.py')
+    with open(fixture, 'w') as fh:
+        fh.write(query)
+    with open(stub, 'w') as fh:
+        fh.write(_XRANDR_STUB.format(log=log, fixture=fixture))
+    return f"{shlex.quote(sys.executable)} {shlex.quote(stub)}", log
+
+
+class Stopped(Exception):
+    """Raised by a fake sleep to end a generator-driven run"""
+
+
+# A day/night curve for every monitor, and a different one for monitor 1
+SCHEDULE_ALL = glorb_schedule.Curve([glorb_schedule.parse_keyframe(text) for text in
+                                     ('06:30=0.1', '07:00=0.8', '12:00=0.9', '18:00=0.75', '21:00=0.3',
+                                      '23:30=0.1')])
+SCHEDULE_OWN = glorb_schedule.Curve([glorb_schedule.parse_keyframe(text) for text in ('07:00=0.4', '19:00=0.6')])
+# Seconds between samples of what the monitors show
+SCHEDULE_SAMPLE = 97
+
+
+def midnight():
+    """A local midnight away from daylight saving changes"""
+    return time.mktime((2026, 3, 2, 0, 0, 0, 0, 0, -1))
+
+
+def follow_schedule(monitors, suspend=None, **config):
+    """Follow SCHEDULE_ALL/SCHEDULE_OWN for a day on a fake clock
+
+    suspend is (start, end) in seconds after midnight. Returns (scheduler,
+    backend, samples, log): samples are (seconds, {monitor_id: percent})
+    read every SCHEDULE_SAMPLE seconds, log the scheduler's writes.
+    """
+    backend = glorb_sim.SimulatedBackend(monitors=monitors, enum_latency=0, ddc_latency=0, panel_latency=0)
+    manager = quiet_manager(backend)
+    start = midnight()
+    now = [start]
+    samples = []
+
+    def shown():
+        return {monitor_id: backend.monitors[monitor_id]['brightness'] for monitor_id in range(monitors)}
+
+    def sleep(seconds):
+        end = now[0] + seconds
+        if suspend and now[0] <= start + suspend[0] < end:
+            # Asleep: nothing is sampled and the sleep overruns
+            end = max(end, start + suspend[1])
+        else:
+            moment = now[0] - (now[0] - start) % SCHEDULE_SAMPLE + SCHEDULE_SAMPLE
+            while moment < end:
+                samples.append((moment - start, shown()))
+                moment += SCHEDULE_SAMPLE
+        now[0] = end
+        if now[0] >= start + glorb_schedule.DAY:
+            raise Stopped
+
+    scheduler = glorb_schedule.BrightnessScheduler(manager, {'all': SCHEDULE_ALL, 1: SCHEDULE_OWN},
+                                                   clock=lambda: now[0], sleep=sleep, **config)
+    log = []
+    with quiet(), contextlib.suppress(Stopped):
+        for update in scheduler.updates():
+            log.append((update['time'] - start, update['levels']))
+    manager.close()
+    return scheduler, backend, samples, log
+
+
+def schedule_curves(monitors):
+    return {monitor_id: SCHEDULE_OWN if monitor_id == 1 else SCHEDULE_ALL for monitor_id in range(monitors)}
+
+
+HOUR = 3600.0
+# (fake time, description, change applied to the simulator behind glorb watch's back)
+WATCH_CHANGES = (
+    (1000.3, 'rotate monitor 1', lambda backend: backend.modeset({1: {'orientation': 1}})),
+    (1004.1, 'brightness of monitor 1 right after', lambda backend: backend.monitors[1].update(brightness=20)),
+    (2000.5, 'brightness of monitor 2 while idle', lambda backend: backend.monitors[2].update(brightness=80)),
+)
+
+
+def watch_fake_hour(monitors):
+    """Poll for an hour on a fake clock while WATCH_CHANGES happen
+
+    Returns (delays, counts, config): the seconds until each change was
+    reported (None if never), the poller's statistics with the simulator's
+    enumerations and DDC/CI reads, and the poller's settings.
+    """
+    backend = glorb_sim.SimulatedBackend(monitors=monitors, enum_latency=0, ddc_latency=0, panel_latency=0)
+    manager = quiet_manager(backend)
+    now = [0.0]
+    pending = list(WATCH_CHANGES)
+
+    def sleep(seconds):
+        now[0] += seconds
+        while pending and pending[0][0] <= now[0]:
+            pending.pop(0)[2](backend)
+        if now[0] >= HOUR:
+            raise Stopped
+
+    poller = glorb_watch.DisplayPoller(manager, clock=lambda: now[0], sleep=sleep, wall_clock=lambda: now[0])
+    events = []
+    with contextlib.suppress(Stopped):
+        for event in poller.events():
+            events.append(event)
+    manager.close()
+
+    delays = []
+    for when, _, _ in WATCH_CHANGES:
+        seen = [event for event in events if event['event'] != 'snapshot' and event['time'] >= when]
+        delays.append(seen[0]['time'] - when if seen else None)
+    counts = dict(poller.stats, enumerations=backend.calls['enumerate'],
+                  ddc=backend.calls['ddc'] + backend.calls['panel'])
+    return delays, counts, poller.config
+
+
+def scraping_hour(monitors, interval):
+    """Counts for identify --json every interval: a full enumeration and a brightness read of every monitor"""
+    backend = glorb_sim.SimulatedBackend(monitors=monitors, enum_latency=0, ddc_latency=0, panel_latency=0)
+    manager = quiet_manager(backend)
+    for _ in range(int(HOUR / interval)):
+        manager.refresh()
+        manager.records()
+    manager.close()
+    return {'enumerations': backend.calls['enumerate'], 'ddc': backend.calls['ddc'] + backend.calls['panel']}
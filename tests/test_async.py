@@ -0,0 +1,64 @@
+import asyncio
+import contextlib
+
+import glorb_sim
+from glorb_async import AsyncMonitorManager
+
+DDC_LATENCY = 0.05
+
+
+def run(scenario, **config):
+    """Run scenario(manager, backend) on a fresh event loop against a simulated backend"""
+    async def main():
+        backend = glorb_sim.SimulatedBackend(**dict({'monitors': 4, 'ddc_latency': DDC_LATENCY,
+                                                     'panel_latency': DDC_LATENCY, 'modeset_latency': 0.05},
+                                                    **config))
+        async with await AsyncMonitorManager.create(backend=backend) as manager:
+            return await scenario(manager, backend)
+    return asyncio.run(main())
+
+
+def test_mode_sets_and_brightness_run_together():
+    async def scenario(manager, backend):
+        await asyncio.gather(manager.rotate(1, 90), manager.brightness(0, 0.7),
+                             manager.get_display_modes(2), manager.set_display_mode(2, 1920, 1080))
+        return backend
+
+    backend = run(scenario)
+    assert backend.monitors[1]['orientation'] == 1
+    assert backend.monitors[2]['width'] == 1920
+    assert backend.monitors[0]['brightness'] == 70
+
+
+def test_calls_for_one_monitor_keep_their_order():
+    async def scenario(manager, backend):
+        await asyncio.gather(*(manager.brightness(1, level / 10) for level in (3, 1, 7)))
+        return backend.monitors[1]['brightness']
+
+    assert run(scenario) == 70
+
+
+def test_timeout_leaves_the_monitor_serialized():
+    async def scenario(manager, backend):
+        with contextlib.suppress(asyncio.TimeoutError):
+            await manager.brightness(1, 0.1, timeout=DDC_LATENCY / 4)
+            return None
+        # The timed-out write still finishes before this one runs
+        await manager.brightness(1, 0.9)
+        return backend.monitors[1]['brightness']
+
+    assert run(scenario) == 90
+
+
+def test_cancelling_a_queued_call_drops_it():
+    async def scenario(manager, backend):
+        first = asyncio.ensure_future(manager.brightness(3, 0.2))
+        queued = asyncio.ensure_future(manager.brightness(3, 0.8))
+        await asyncio.sleep(DDC_LATENCY / 4)
+        queued.cancel()
+        await first
+        with contextlib.suppress(asyncio.CancelledError):
+            await queued
+        return backend.monitors[3]['brightness']
+
+    assert run(scenario) == 20
@@ -0,0 +1,21 @@
+from tests import support
+
+
+def test_changes_to_several_monitors_take_one_mode_set(sim_manager):
+    manager = sim_manager(monitors=4, enum_latency=0, modeset_latency=0)
+    width, height, frequency = manager.mode_catalog(3).native_mode()
+    with support.quiet():
+        assert manager.apply([(1, 'rotate', 90), (2, 'rotate', 180), (3, 'rotate', 270),
+                              (3, 'mode', (height, width, frequency))])
+    monitors = manager.backend.monitors
+    assert manager.backend.calls['modeset'] == 1
+    assert [monitors[monitor_id]['orientation'] for monitor_id in range(4)] == [0, 1, 2, 3]
+    assert (monitors[3]['width'], monitors[3]['height']) == (height, width)
+
+
+def test_rejected_change_sets_no_mode(sim_manager):
+    manager = sim_manager(monitors=3, enum_latency=0, modeset_latency=0)
+    with support.quiet():
+        assert not manager.apply([(1, 'rotate', 90), (2, 'mode', (123, 45, 60))])
+    assert manager.backend.calls['modeset'] == 0
+    assert manager.backend.monitors[1]['orientation'] == 0
@@ -0,0 +1,27 @@
+from tests import support
+
+
+def test_bulk_writes_take_the_same_path_as_single_writes(sim_manager):
+    manager = sim_manager(monitors=3, no_ddc=1, enum_latency=0, ddc_latency=0, panel_latency=0)
+    backend = manager.backend
+    with support.quiet():
+        results = manager.brightness_many({0: 0.3, 1: 0.4, 2: 0.5})
+    calls = dict(backend.calls)
+    with support.quiet():
+        for monitor_id, level in ((0, 0.3), (1, 0.4), (2, 0.5)):
+            assert manager.brightness(monitor_id, level)
+
+    assert {monitor_id: result['method'] for monitor_id, result in results.items()} == \
+        {0: 'panel', 1: 'gamma', 2: 'ddc'}
+    assert all(result['ok'] and result['error'] is None for result in results.values())
+    # The panel is written once, through its own interface, and never over DDC/CI
+    assert calls['panel'] == 1 and calls['ddc'] == 1
+    assert {name: backend.calls[name] - calls[name] for name in ('panel', 'ddc')} == {'panel': 1, 'ddc': 1}
+
+
+def test_bulk_write_reports_unknown_and_failing_monitors(sim_manager):
+    manager = sim_manager(monitors=3, dead=1, enum_latency=0, ddc_latency=0, panel_latency=0, dead_latency=0)
+    with support.quiet():
+        results = manager.brightness_many({2: 0.5, 7: 0.5})
+    assert results[2] == dict(results[2], ok=False, method=None, error='write failed')
+    assert results[7] == {'ok': False, 'method': None, 'error': 'not found', 'elapsed': 0.0}
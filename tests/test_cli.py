@@ -0,0 +1,59 @@
+import contextlib
+import io
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import glorb
+import glorb_daemon
+import glorb_schedule
+import glorb_vcp
+import glorb_watch
+from tests import support
+
+# Modules glorb.py imports only in the commands that use them
+LAZY = ('json', 'glorb_daemon', 'glorb_fade', 'glorb_gamma', 'glorb_profiles', 'glorb_schedule', 'glorb_trace',
+        'glorb_vcp', 'glorb_watch')
+
+
+def help_text(*argv):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), pytest.raises(SystemExit):
+        glorb.main([*argv, '--help'])
+    return ' '.join(output.getvalue().split())
+
+
+def test_help_states_the_defaults_the_modules_use():
+    assert f"layout checks (default {glorb_watch.DEFAULTS['topology']:g})" in help_text('watch')
+    assert f"brightness reads (default {glorb_watch.DEFAULTS['brightness']:g})" in help_text('watch')
+    assert f"one monitor (default {glorb_schedule.DEFAULTS['min_interval']:g})" in help_text('schedule', 'run')
+    assert f"Feature name ({', '.join(glorb_vcp.FEATURES)})" in help_text('vcp', 'get')
+
+
+def test_import_leaves_command_modules_unloaded():
+    code = f"import sys, glorb; print(' '.join(name for name in {LAZY!r} if name in sys.modules))"
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=support.ROOT, capture_output=True, text=True,
+                            check=True).stdout.split()
+    assert loaded == []
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="Unix socket daemon")
+def test_silent_daemon_falls_back_to_running_in_process(monkeypatch):
+    # A daemon that accepts the connection but never answers
+    silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    silent.bind(glorb_daemon.daemon_address())
+    silent.listen()
+    glorb_daemon._write_key('key')
+    monkeypatch.setattr(glorb_daemon, 'REPLY_TIMEOUT', 0.2)
+    monkeypatch.setenv('GLORB_BACKEND', 'sim')
+    try:
+        with pytest.raises(glorb_daemon.DaemonUnavailable):
+            glorb_daemon.send_command('ping')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            glorb.main(['b', '1', '0.4'])
+    finally:
+        silent.close()
+    assert 'Monitor 1 brightness set to 40%' in output.getvalue()
@@ -0,0 +1,32 @@
+import pytest
+
+import glorb_config
+import glorb_ddc
+import glorb_sim
+
+
+def test_environment_settings_take_their_defaults_type_and_overrides_win(monkeypatch):
+    monkeypatch.setenv('GLORB_DDC', 'timeout=1, retries=4')
+    guard = glorb_ddc.DdcGuard(retries=1)
+    assert guard.config['timeout'] == 1.0 and isinstance(guard.config['timeout'], float)
+    assert guard.config['retries'] == 1
+    assert guard.config['threshold'] == glorb_ddc.DEFAULTS['threshold']
+
+
+def test_unknown_setting_is_named(monkeypatch):
+    monkeypatch.setenv('GLORB_SIM', 'monitors=3,latency=1')
+    with pytest.raises(ValueError, match="Unknown simulator setting 'latency'"):
+        glorb_sim.SimulatedBackend()
+    assert glorb_config.parse_settings('', glorb_sim.DEFAULTS, 'simulator') == {}
+
+
+def test_config_files_and_cache_entries_share_one_atomic_writer(tmp_path):
+    import glorb_cache
+    import glorb_schedule
+    curves = {'all': glorb_schedule.Curve([(7 * 3600, 0.2), (12 * 3600, 0.9)])}
+    assert glorb_schedule.save(curves)
+    assert glorb_schedule.load()['all'].keyframes == curves['all'].keyframes
+    assert glorb_cache.store('modes', 'k', [1, 2]) and glorb_cache.load('modes', 'k') == [1, 2]
+    assert not glorb_config.write_config('bad.json', {'level': object()})
+    assert glorb_config.read_config('bad.json') == {}
+    assert not [path for path in tmp_path.rglob('*.tmp')]
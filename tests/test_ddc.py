@@ -0,0 +1,89 @@
+import threading
+import time
+
+import glorb_ddc
+
+
+def fake_guard(**config):
+    now = [0.0]
+    sleeps = []
+    guard = glorb_ddc.DdcGuard(clock=lambda: now[0], sleep=sleeps.append, jitter=lambda: 0.5,
+                               **dict({'timeout': 0, 'retries': 2, 'backoff': 0.1, 'threshold': 3,
+                                       'cooldown': 10.0}, **config))
+    return guard, now, sleeps
+
+
+def test_flaky_monitor_succeeds_after_growing_backoffs():
+    guard, _, sleeps = fake_guard()
+    answers = iter([False, False, True])
+    assert guard.call('m', lambda: next(answers)) is True
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0]
+
+
+def test_breaker_opens_and_recovers_after_cooldown():
+    guard, now, _ = fake_guard()
+    calls = []
+    assert guard.call('m', lambda: calls.append(1)) is None
+    assert guard.call('m', lambda: calls.append(1)) is None
+    assert len(calls) == 3
+    assert 'not responding' in guard.describe('m')
+
+    now[0] += 10.0
+    assert guard.call('m', lambda: True) is True
+    assert guard.describe('m') is None
+
+
+def test_dead_monitor_fails_alone_and_shows_in_identify(sim_manager, capsys):
+    guard = glorb_ddc.DdcGuard(timeout=0.05, retries=1, threshold=2, cooldown=60.0)
+    manager = sim_manager(monitors=4, dead=1, dead_latency=0.5, guard=guard)
+    for level in (0.2, 0.4):
+        results = manager.brightness_all(level)
+    assert [monitor_id for monitor_id, result in results.items() if not result['ok']] == [3]
+    capsys.readouterr()
+    manager.identify()
+    assert 'not responding' in capsys.readouterr().out
+
+
+class CountingPool:
+    """retain()/release() bookkeeping of a PhysicalMonitorPool"""
+
+    def __init__(self):
+        self.users = {}
+
+    def retain(self, key):
+        self.users[key] = self.users.get(key, 0) + 1
+        return True
+
+    def release(self, key):
+        self.users[key] -= 1
+
+
+def test_abandoned_call_keeps_its_handle_until_it_returns():
+    pool = CountingPool()
+    guard = glorb_ddc.DdcGuard(timeout=0.05, retries=0, pool=pool)
+    unblock = threading.Event()
+    assert guard.call('m', unblock.wait) is None
+    # The caller gave up, but the worker is still inside the call
+    assert pool.users['m'] == 1
+    assert guard.call('m', lambda: True) is None
+    unblock.set()
+    deadline = time.monotonic() + 2.0
+    while pool.users['m'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.users['m'] == 0
+    assert guard.call('m', lambda: True) is True
+    guard.forget()
+
+
+def test_one_worker_thread_per_monitor():
+    guard = glorb_ddc.DdcGuard(timeout=1.0)
+    before = threading.active_count()
+    for _ in range(20):
+        for key in ('a', 'b'):
+            assert guard.call(key, lambda: True) is True
+    assert threading.active_count() - before == 2
+    workers = list(guard._workers.values())
+    guard.forget()
+    for worker in workers:
+        worker.thread.join(1.0)
+        assert not worker.thread.is_alive()
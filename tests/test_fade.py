@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import glorb_fade
+from tests import support
+
+
+def fade(bus, start, target, duration, min_interval=glorb_fade.DEFAULT_MIN_INTERVAL):
+    fader = glorb_fade.FadeScheduler(bus.write, start, min_interval)
+    fader.fade_to(target, duration)
+    assert fader.wait(5.0)
+    fader.close()
+    return fader
+
+
+@pytest.mark.parametrize('latency', [0.002, 0.03, 0.1])
+def test_fade_reaches_its_target_without_flooding_the_bus(latency):
+    bus = support.SlowBus(latency)
+    duration = 0.3
+    fader = fade(bus, 100, 20, duration)
+    assert bus.values[-1] == 20 and fader.current == 20
+    assert len(bus.values) <= int(duration / max(latency, glorb_fade.DEFAULT_MIN_INTERVAL)) + 2
+    assert bus.overlaps == 0
+    assert bus.values == sorted(bus.values, reverse=True)
+
+
+def test_new_target_supersedes_the_fade_in_progress():
+    bus = support.SlowBus(0.03)
+    fader = glorb_fade.FadeScheduler(bus.write, 50)
+    for target in (90, 10, 70, 30, 60):
+        fader.fade_to(target, 0.2)
+        time.sleep(0.01)
+    assert fader.wait(5.0)
+    fader.close()
+    assert bus.values[-1] == 60 and bus.overlaps == 0
+
+
+def test_step_chosen_before_a_cancel_is_never_written_after_the_direct_write():
+    bus = support.SlowBus(0.0)
+    lock = threading.RLock()
+    fader = glorb_fade.FadeScheduler(bus.write, 100, min_interval=0.0, lock=lock)
+    with lock:
+        fader.fade_to(0, 1.0)
+        # The worker picks a step and waits for the monitor lock held by this direct writer
+        time.sleep(0.05)
+        fader.cancel(40)
+        bus.write(40)
+    time.sleep(0.1)
+    fader.close()
+    assert bus.values == [40] and fader.current == 40
+
+
+def test_direct_write_after_a_fade_sticks(sim_manager):
+    manager = sim_manager(monitors=2, enum_latency=0, ddc_latency=0.01, panel_latency=0)
+    with support.quiet():
+        manager.fade_brightness(1, 0.0, 0.5, wait=False)
+        time.sleep(0.1)
+        assert manager.brightness(1, 0.77)
+    time.sleep(0.6)
+    assert manager.backend.monitors[1]['brightness'] == 77
+
+
+@pytest.mark.parametrize('text, seconds', [('500ms', 0.5), ('1.5s', 1.5), ('2', 2.0)])
+def test_parse_duration(text, seconds):
+    assert glorb_fade.parse_duration(text) == seconds
+
+
+def test_parse_duration_rejects_garbage():
+    with pytest.raises(ValueError):
+        glorb_fade.parse_duration('soon')
@@ -0,0 +1,130 @@
+import pytest
+
+import glorb_fleet
+import glorb_sim
+from tests import support
+
+KEY = b'test-fleet-key'
+
+
+def start_agent(address=('127.0.0.1', 0)):
+    backend = glorb_sim.SimulatedBackend(monitors=2, enum_latency=0, ddc_latency=0, panel_latency=0)
+    return glorb_fleet.Agent(support.quiet_manager(backend), KEY, address).start()
+
+
+def host(agent):
+    return f"{agent.address[0]}:{agent.address[1]}"
+
+
+@pytest.fixture
+def agents():
+    started = [start_agent() for _ in range(3)]
+    yield started
+    for agent in started:
+        agent.stop()
+        agent.manager.close()
+
+
+def test_fan_out_pools_one_connection_per_host(agents):
+    hosts = [host(agent) for agent in agents]
+    with glorb_fleet.FleetClient(KEY, timeout=5) as client:
+        first = client.fan_out(hosts, [('brightness_all', (0.4,))])
+        second = client.fan_out(hosts, [('brightness_all', (0.6,)), ('refresh', ())])
+        assert all(result['ok'] for result in first.values())
+        assert all(result['ok'] for result in second.values())
+        assert client.connects == len(hosts)
+    assert all(agent.manager.backend.monitors[1]['brightness'] == 60 for agent in agents)
+
+
+def test_pipelined_replies_come_back_in_order(agents):
+    with glorb_fleet.FleetClient(KEY, timeout=5) as client:
+        replies = client.pipeline(host(agents[0]), [('brightness', (0, 0.25)), ('brightness', (7, 0.5))])
+    assert [reply['result'] for reply in replies] == [True, False]
+    assert 'not found' in replies[1]['output']
+
+
+def test_unreachable_host_and_wrong_key_fail_only_that_host(agents):
+    hosts = [host(agent) for agent in agents]
+    agents[-1].stop()
+    with glorb_fleet.FleetClient(b'wrong key', timeout=2) as intruder:
+        denied = intruder.fan_out(hosts[:1], [('identify', ())])[hosts[0]]
+    assert not denied['ok'] and 'authentication' in denied['error']
+    with glorb_fleet.FleetClient(KEY, timeout=2) as client:
+        mixed = client.fan_out(hosts, [('brightness_all', (0.5,))])
+    assert not mixed[hosts[-1]]['ok']
+    assert all(mixed[h]['ok'] for h in hosts[:-1])
+
+
+def test_stale_connection_to_a_restarted_agent_is_retried(agents):
+    with glorb_fleet.FleetClient(KEY, timeout=5) as client:
+        client.call(host(agents[0]), 'identify')
+        agents[0].stop()
+        agents[0].manager.close()
+        agents[0] = start_agent(agents[0].address)
+        connects = client.connects
+        reply = client.call(host(agents[0]), 'brightness', 1, 0.3)
+    assert reply['status'] == 'ok' and client.connects == connects + 1
+
+
+@pytest.mark.parametrize('text, address', [
+    ('kiosk1', ('kiosk1', glorb_fleet.DEFAULT_PORT)),
+    ('kiosk1:7800', ('kiosk1', 7800)),
+    (':7800', ('0.0.0.0', 7800)),
+    ('[::1]:7800', ('::1', 7800)),
+    ('[fe80::1]', ('fe80::1', glorb_fleet.DEFAULT_PORT)),
+    ('fe80::1', ('fe80::1', glorb_fleet.DEFAULT_PORT)),
+    ('[::]:', ('::', glorb_fleet.DEFAULT_PORT)),
+])
+def test_parse_address(text, address):
+    assert glorb_fleet.parse_address(text) == address
+    assert glorb_fleet.parse_address(glorb_fleet.format_address(address)) == address
+
+
+@pytest.mark.parametrize('text', ['[::1', '[::1]7800', 'host:port'])
+def test_parse_address_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        glorb_fleet.parse_address(text)
+
+
+def test_agent_on_ipv6_loopback():
+    try:
+        agent = start_agent(('::1', 0))
+    except OSError:
+        pytest.skip("no IPv6 loopback")
+    try:
+        with glorb_fleet.FleetClient(KEY, timeout=5) as client:
+            reply = client.call(glorb_fleet.format_address(agent.address), 'brightness', 1, 0.3)
+        assert reply['status'] == 'ok' and agent.manager.backend.monitors[1]['brightness'] == 30
+    finally:
+        agent.stop()
+        agent.manager.close()
+
+
+@pytest.mark.parametrize('forge', ['replay', 'tamper'])
+def test_replayed_or_altered_message_ends_the_connection(agents, forge):
+    agent = agents[0]
+    with glorb_fleet.FleetClient(KEY, timeout=2) as client:
+        conn = client._connect(agent.address)
+        try:
+            frame = conn._frame({'id': 0, 'command': 'brightness', 'params': [1, 0.3]})
+            conn.sock.sendall(frame)
+            assert conn.recv(2)['status'] == 'ok'
+            if forge == 'tamper':
+                frame = conn._frame({'id': 1, 'command': 'brightness', 'params': [1, 0.3]})
+                frame = frame.replace(b'0.3', b'0.9')
+            conn.sock.sendall(frame)
+            with pytest.raises(EOFError):
+                conn.recv(2)
+        finally:
+            conn.close()
+    assert agent.requests == 1 and agent.manager.backend.monitors[1]['brightness'] == 30
+
+
+def test_silent_host_times_out_as_a_fleet_error():
+    silent = glorb_fleet._listen('127.0.0.1', 0)
+    try:
+        with glorb_fleet.FleetClient(KEY, timeout=0.2) as client:
+            with pytest.raises(glorb_fleet.FleetError, match='no reply within'):
+                client.call(glorb_fleet.format_address(silent.getsockname()), 'identify')
+    finally:
+        silent.close()
@@ -0,0 +1,115 @@
+import types
+
+import pytest
+
+import glorb_gamma
+from tests import support
+
+
+def test_full_neutral_output_is_the_identity_ramp():
+    red, green, blue = glorb_gamma.channels(glorb_gamma.ramp(100))
+    assert list(red) == list(green) == list(blue) == list(range(0, 65536, 257))
+
+
+def test_ramps_rise_monotonically_and_with_brightness():
+    ramps = [glorb_gamma.channels(glorb_gamma.ramp(percent, 4000)) for percent in range(0, 101, 10)]
+    for ramp in ramps:
+        for channel in ramp:
+            assert all(a <= b for a, b in zip(channel, channel[1:]))
+    assert all(a[0][-1] < b[0][-1] for a, b in zip(ramps, ramps[1:]))
+
+
+def test_zero_percent_keeps_the_floor():
+    assert glorb_gamma.channels(glorb_gamma.ramp(0))[0][-1] == int(65535 * glorb_gamma.FLOOR)
+
+
+def test_warm_temperatures_cut_blue_most():
+    red, green, blue = (channel[-1] for channel in glorb_gamma.channels(glorb_gamma.ramp(100, 2700)))
+    assert red == 65535 and red > green > blue
+
+
+def test_nearby_temperatures_share_a_cached_ramp():
+    assert glorb_gamma.ramp(50, 4480) is glorb_gamma.ramp(50, 4520)
+
+
+def test_software_fade_reuses_cached_ramps(sim_manager):
+    manager = sim_manager(monitors=3, no_ddc=2)
+    backend = manager.backend
+    manager.color_temperature(1, 3400)
+    glorb_gamma.clear_cache()
+    manager.fade_brightness(1, 0.2, 0.2)
+    before = glorb_gamma.cache_info()
+    manager.fade_brightness(1, 0.9, 0.2)
+    after = glorb_gamma.cache_info()
+    manager.brightness_many({1: 0.5, 2: 0.5})
+
+    assert after.misses == before.misses
+    assert backend.calls['ddc'] == 0
+    assert backend.gamma[1] == glorb_gamma.ramp(50, 3400)
+    assert backend.gamma[2] == glorb_gamma.ramp(50)
+
+
+def within_windows_range(table):
+    identity = range(0, 65536, 257)
+    return all(value >= reference - glorb_gamma.WIN32_MAX_DEVIATION
+               for channel in glorb_gamma.channels(table) for value, reference in zip(channel, identity))
+
+
+@pytest.mark.parametrize('percent, kelvin', [(0, 6500), (20, 1000), (100, 1900), (60, 3400)])
+def test_limited_ramps_stay_within_what_windows_accepts(percent, kelvin):
+    table, clamped = glorb_gamma.limited_ramp(percent, kelvin)
+    assert within_windows_range(table)
+    for channel in glorb_gamma.channels(table):
+        assert all(a <= b for a, b in zip(channel, channel[1:]))
+    assert clamped == (table != glorb_gamma.ramp(percent, kelvin))
+
+
+def test_limited_ramp_leaves_mild_ramps_alone():
+    assert glorb_gamma.limited_ramp(80, 5000) == (glorb_gamma.ramp(80, 5000), False)
+
+
+@pytest.fixture
+def win32_gamma(monkeypatch):
+    glorb_win32 = support.import_win32_backend(monkeypatch)
+    fake = support.FakeDxva2()
+    fake.install(monkeypatch, glorb_win32, [support.win32_display(0, 11)])
+    loaded = []
+    gdi32 = types.SimpleNamespace(CreateDCW=lambda *args: 77, DeleteDC=lambda dc: 1,
+                                  SetDeviceGammaRamp=lambda dc, table: loaded.append(table) or 1)
+    glorb_win32.windll.gdi32 = gdi32
+    backend = glorb_win32.Win32Backend()
+    yield backend, gdi32, loaded
+    backend.close()
+
+
+def test_win32_falls_back_to_limited_ramps_once_windows_refuses_one(win32_gamma, capsys):
+    backend, gdi32, loaded = win32_gamma
+    display = support.win32_display(0, 11)
+    identity = glorb_gamma.ramp(100)
+
+    def windows_default(dc, table):
+        # Accept only ramps that never fall further below the identity than Windows allows
+        if not within_windows_range(table):
+            return 0
+        loaded.append(table)
+        return 1
+
+    gdi32.SetDeviceGammaRamp = windows_default
+    assert backend.set_gamma(display, 80, 6500)
+    assert backend.set_gamma(display, 0, 6500) and backend.set_gamma(display, 5, 6500)
+    assert loaded == [glorb_gamma.ramp(80), glorb_gamma.limited_ramp(0)[0], glorb_gamma.limited_ramp(5)[0]]
+    assert capsys.readouterr().out.count('Windows limits') == 1
+    assert backend.set_gamma(display, 100, 6500) and loaded[-1] == identity
+
+
+def test_win32_loads_full_ramps_when_windows_allows_them(win32_gamma):
+    backend, _, loaded = win32_gamma
+    assert backend.set_gamma(support.win32_display(0, 11), 0, 1000)
+    assert loaded == [glorb_gamma.ramp(0, 1000)]
+
+
+def test_win32_reports_a_rejected_ramp(win32_gamma, capsys):
+    backend, gdi32, _ = win32_gamma
+    gdi32.SetDeviceGammaRamp = lambda dc, table: 0
+    assert backend.set_gamma(support.win32_display(0, 11), 50, 6500) is False
+    assert 'Windows rejected the gamma ramp' in capsys.readouterr().out
@@ -0,0 +1,36 @@
+import threading
+import time
+
+import glorb
+from tests import support
+
+
+def test_watcher_reports_plugged_and_unplugged_connectors(tmp_path):
+    root = str(tmp_path / 'drm')
+    support.set_drm_status(root, 'card0-eDP-1', 'connected')
+    support.set_drm_status(root, 'card0-HDMI-A-1', 'disconnected')
+    manager = glorb.MonitorManager(backend=support.FakeDrmBackend(root))
+    edp = manager.displays[0]
+    changes = []
+    changed = threading.Event()
+
+    def on_change(added, removed, changed_displays):
+        changes.append(([d['name'] for d in added], [d['name'] for d in removed]))
+        changed.set()
+
+    manager.subscribe(on_change)
+    assert manager.watch()
+    # The watcher thread sets up its inotify watches before it sees anything
+    time.sleep(0.2)
+    try:
+        for connector, status, expected in (('card0-HDMI-A-1', 'connected', (['card0-HDMI-A-1'], [])),
+                                            ('card0-HDMI-A-1', 'disconnected', ([], ['card0-HDMI-A-1'])),
+                                            ('card0-DP-2', 'connected', (['card0-DP-2'], []))):
+            changed.clear()
+            support.set_drm_status(root, connector, status)
+            assert changed.wait(2.0)
+            assert changes[-1] == expected
+        # Unchanged monitors keep their records across incremental updates
+        assert manager._find_display(edp['id']) is edp
+    finally:
+        manager.close()
@@ -0,0 +1,22 @@
+import glorb_modes
+from tests import support
+
+MODES = [(2560, 1440, 144, 32), (2560, 1440, 60, 32), (1920, 1080, 60, 32)]
+
+
+def test_transposed_modes_only_for_a_quarter_turn():
+    catalog = glorb_modes.ModeCatalog(MODES)
+    assert catalog.supports(2560, 1440, 144)
+    assert not catalog.supports(1440, 2560)
+    assert catalog.refresh_rates(1440, 2560) == []
+    assert catalog.supports(1440, 2560, 144, quarter_turn=True)
+    assert not catalog.supports(1440, 2560, 75, quarter_turn=True)
+
+
+def test_portrait_mode_needs_a_rotation_to_portrait(sim_manager):
+    manager = sim_manager(monitors=2, enum_latency=0, modeset_latency=0)
+    width, height, frequency = manager.mode_catalog(1).native_mode()
+    with support.quiet():
+        assert not manager.apply([(1, 'mode', (height, width, frequency))])
+        assert not manager.apply([(1, 'rotate', 180), (1, 'mode', (height, width, frequency))])
+        assert manager.apply([(1, 'rotate', 90), (1, 'mode', (height, width, frequency))])
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import glorb_sim
+import glorb_sysfs
+import monitor_utils
+from tests import support
+
+
+def utils(**config):
+    with support.quiet():
+        return monitor_utils.MonitorUtils(backend=glorb_sim.SimulatedBackend(
+            enum_latency=0, ddc_latency=0, panel_latency=0, modeset_latency=0, **config))
+
+
+def test_runs_on_the_simulator():
+    with utils(monitors=3) as monitors, support.quiet():
+        assert len(monitors.get_display_info()) == 3
+        assert monitors.set_brightness(0, 30) and monitors.set_brightness(2, 120)
+        assert monitors.get_brightness(0) == 30 and monitors.get_brightness(2) == 100
+        assert monitors.backend.calls['panel'] >= 1 and monitors.backend.monitors[2]['brightness'] == 100
+        assert monitors.rotate_display(1, 90)
+        assert monitors.get_display_info(1)['orientation'] == 1
+        assert not monitors.rotate_display(1, 45)
+
+
+def test_display_modes_are_checked_against_the_catalog():
+    with utils(monitors=2) as monitors, support.quiet():
+        width, height, frequency = monitors.get_mode_catalog(1).native_mode()
+        assert {'width': width, 'height': height, 'frequency': frequency} in \
+            [{key: mode[key] for key in ('width', 'height', 'frequency')} for mode in monitors.get_display_modes(1)]
+        assert not monitors.set_display_mode(1, width, height, 1)
+        assert monitors.set_display_mode(1, width, height, frequency)
+
+
+def test_missing_brightness_control_is_reported():
+    with utils(monitors=2, no_ddc=1) as monitors, support.quiet():
+        assert monitors.set_brightness(1, 50) is False
+        assert monitors.set_brightness(9, 50) is False
+
+
+def test_import_loads_no_windows_bindings():
+    loaded = subprocess.run([sys.executable, '-c', 'import sys, monitor_utils; print(" ".join(sys.modules))'],
+                            cwd=support.ROOT, capture_output=True, text=True, check=True).stdout.split()
+    assert 'glorb_win32' not in loaded and 'win32api' not in loaded
+
+
+def test_backend_without_display_modes_reports_it(tmp_path, capsys):
+    root = tmp_path / 'backlight'
+    support.add_backlight(root, 'intel_backlight', 1000, 500)
+    with monitor_utils.MonitorUtils(backend=glorb_sysfs.SysfsBacklightBackend(str(root))) as monitors:
+        assert monitors.get_display_modes(0) == []
+        assert monitors.set_display_mode(0, 1920, 1080, 60) is False
+        assert monitors.set_brightness(0, 30)
+    assert 'cannot list display modes' in capsys.readouterr().out
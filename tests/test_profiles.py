@@ -0,0 +1,66 @@
+import glorb_profiles
+from tests import support
+
+
+def sim(sim_manager, monitors=3):
+    return sim_manager(monitors=monitors, enum_latency=0, ddc_latency=0, panel_latency=0, modeset_latency=0)
+
+
+def state(manager):
+    return [(display['orientation'], display['width'], display['height'], manager.get_brightness(display['id']))
+            for display in manager.displays]
+
+
+def test_save_and_apply_round_trip(sim_manager):
+    manager = sim(sim_manager)
+    with support.quiet():
+        manager.rotate(1, 90)
+        manager.brightness_many({0: 0.3, 2: 0.8})
+        saved = state(manager)
+        assert manager.save_profile('desk')
+        manager.rotate(1, 0)
+        manager.brightness_many({0: 0.9, 2: 0.1})
+        assert state(manager) != saved
+        assert manager.apply_profile('desk')
+    assert state(manager) == saved
+    assert set(glorb_profiles.load('desk')['monitors']) == {'SIM0000/\\\\.\\DISPLAY1', 'SIM0001/\\\\.\\DISPLAY2',
+                                                            'SIM0002/\\\\.\\DISPLAY3'}
+
+
+def test_applying_the_current_layout_changes_nothing(sim_manager, capsys):
+    manager = sim(sim_manager)
+    with support.quiet():
+        manager.rotate(2, 270)
+        manager.brightness(1, 0.6)
+        assert manager.save_profile('desk')
+    writes = []
+    for method in ('set_brightness', 'set_panel_brightness', 'set_gamma'):
+        setattr(manager.backend, method, lambda *args, _method=method: writes.append(_method))
+    modesets = manager.backend.calls['modeset']
+    assert manager.apply_profile('desk')
+    assert "already applied" in capsys.readouterr().out
+    assert writes == [] and manager.backend.calls['modeset'] == modesets
+
+
+def display(display_id, name, hardware_id):
+    return {'id': display_id, 'name': name, 'hardware_id': hardware_id, 'orientation': 0,
+            'width': 1920, 'height': 1080, 'frequency': 60}
+
+
+def test_monitors_are_matched_by_hardware_id_and_connector():
+    saved = [display(0, 'DP-1', 'DEL41A8'), display(1, 'DP-2', 'DEL41A8'), display(2, 'HDMI-1', 'GSM5B7F'),
+             display(3, 'HDMI-2', 'ACI27A1')]
+    profile = glorb_profiles.capture(saved, {0: 10, 1: 20, 2: 30, 3: 40})
+    # Enumerated in another order, the LG moved to another port, the Asus unplugged
+    live = [display(0, 'DP-2', 'DEL41A8'), display(1, 'DP-3', 'GSM5B7F'), display(2, 'DP-1', 'DEL41A8')]
+    pairs, missing = glorb_profiles.match(profile, live)
+    matched = {live_display['name']: entry['brightness'] for live_display, entry in pairs}
+    # Identical Dells keep the settings of their own connector; the LG follows its hardware ID
+    assert matched == {'DP-1': 10, 'DP-2': 20, 'DP-3': 30}
+    assert missing == ['ACI27A1/HDMI-2']
+
+
+def test_a_different_monitor_on_a_known_connector_is_not_matched():
+    profile = glorb_profiles.capture([display(0, 'DP-1', 'DEL41A8')], {0: 10})
+    pairs, missing = glorb_profiles.match(profile, [display(0, 'DP-1', 'GSM5B7F')])
+    assert pairs == [] and missing == ['DEL41A8/DP-1']
@@ -0,0 +1,43 @@
+import glorb_schedule
+from tests import support
+
+MONITORS = 3
+
+
+def test_exact_tracking_shows_the_curve_and_writes_on_each_step():
+    scheduler, backend, samples, log = support.follow_schedule(MONITORS, min_interval=0, coalesce=0)
+    curves = support.schedule_curves(MONITORS)
+    steps = {monitor_id: [moment for moment, _ in curve.steps()] for monitor_id, curve in curves.items()}
+
+    def near_step(moment, monitor_id, within):
+        return any(abs(moment - step) < within for step in steps[monitor_id])
+
+    # A sample right at a step may read either side of it
+    mismatches = [(moment, monitor_id) for moment, shown in samples for monitor_id, percent in shown.items()
+                  if percent != glorb_schedule._percent(curves[monitor_id].level(moment))
+                  and not near_step(moment, monitor_id, 0.1)]
+    assert samples and not mismatches
+    assert all(near_step(moment, monitor_id, 0.01) for moment, levels in log[1:] for monitor_id in levels)
+
+
+def test_default_plan_stays_close_to_the_curve_with_few_writes():
+    scheduler, backend, samples, log = support.follow_schedule(MONITORS)
+    curves = support.schedule_curves(MONITORS)
+    stats, plan = scheduler.stats, scheduler.plan
+    lag = max(abs(percent - glorb_schedule._percent(curves[monitor_id].level(moment)))
+              for moment, shown in samples for monitor_id, percent in shown.items())
+    assert stats['wakeups'] - stats['idle_wakeups'] == len(plan.wakeups)
+    assert stats['writes'] == plan.writes + MONITORS
+    assert backend.calls['enumerate'] <= 1
+    assert lag <= 3
+    # A cron job running glorb b every five minutes
+    assert stats['writes'] < glorb_schedule.DAY // 300 * MONITORS
+
+
+def test_levels_due_after_a_suspend_are_written_on_resume():
+    suspend = (7 * 3600 + 600, 10 * 3600 + 1200)
+    scheduler, backend, samples, log = support.follow_schedule(MONITORS, suspend=suspend)
+    resumed = [levels for moment, levels in log if moment >= suspend[1]]
+    assert resumed
+    for monitor_id, percent in scheduler.plan.levels(suspend[1]).items():
+        assert resumed[0].get(monitor_id, percent) == percent
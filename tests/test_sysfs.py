@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+
+import glorb
+import glorb_sysfs
+from tests import support
+
+
+def test_brightness_is_scaled_to_max_brightness(tmp_path):
+    root = tmp_path / 'backlight'
+    device = support.add_backlight(root, 'intel_backlight', 19200, 9600)
+    backend = glorb_sysfs.SysfsBacklightBackend(str(root))
+    display, = backend.load_displays()
+    assert backend.get_brightness(display) == 50
+
+    assert backend.set_brightness(display, 25)
+    assert (device / 'brightness').read_text() == '4800'
+    (device / 'actual_brightness').write_text('19200\n')
+    assert backend.get_brightness(display) == 100
+    backend.close()
+
+
+def test_shorter_value_replaces_a_longer_one(tmp_path):
+    root = tmp_path / 'backlight'
+    device = support.add_backlight(root, 'intel_backlight', 1000, 500)
+    backend = glorb_sysfs.SysfsBacklightBackend(str(root))
+    display, = backend.load_displays()
+    assert backend.set_brightness(display, 8) and backend.set_brightness(display, 1)
+    assert (device / 'brightness').read_text() == '10'
+    backend.close()
+
+
+def test_firmware_interface_comes_first_and_dead_devices_are_skipped(tmp_path):
+    root = tmp_path / 'backlight'
+    support.add_backlight(root, 'intel_backlight', 1000, 500)
+    support.add_backlight(root, 'acpi_video0', 100, 50, kind='firmware')
+    support.add_backlight(root, 'broken', 0, 0)
+    backend = glorb_sysfs.SysfsBacklightBackend(str(root))
+    assert [display['name'] for display in backend.load_displays()] == ['acpi_video0', 'intel_backlight']
+    backend.close()
+
+
+def test_write_to_a_read_only_brightness_file_fails(tmp_path, monkeypatch, capsys):
+    root = tmp_path / 'backlight'
+    device = support.add_backlight(root, 'intel_backlight', 1000, 500)
+    brightness = device / 'brightness'
+    brightness.chmod(0o444)
+    if os.access(brightness, os.W_OK):
+        # Root ignores file modes; refuse the open the way the kernel does for other users
+        real_open = os.open
+
+        def refusing_open(path, flags, *args):
+            if os.fspath(path) == str(brightness) and flags & os.O_WRONLY:
+                raise PermissionError(13, 'Permission denied', path)
+            return real_open(path, flags, *args)
+
+        monkeypatch.setattr(glorb_sysfs.os, 'open', refusing_open)
+    backend = glorb_sysfs.SysfsBacklightBackend(str(root))
+    display, = backend.load_displays()
+    assert backend.set_brightness(display, 80) is False
+    assert 'Permission denied' in capsys.readouterr().out
+    assert brightness.read_text() == '500\n'
+    backend.close()
+
+
+def test_identify_json_lists_backlights(tmp_path, monkeypatch):
+    root = tmp_path / 'backlight'
+    support.add_backlight(root, 'intel_backlight', 1000, 300)
+    monkeypatch.setenv('GLORB_SYSFS_ROOT', str(root))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        glorb.main(['--no-daemon', '--backend', 'sysfs', 'identify', '--json'])
+    record, = json.loads(output.getvalue())
+    assert record['id'] == 0 and record['name'] == 'intel_backlight' and record['brightness'] == 30
@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import glorb
+import glorb_trace
+from tests import support
+
+
+def spans_by_thread(trace):
+    threads = {}
+    for event in trace['traceEvents']:
+        if event['ph'] == 'X':
+            threads.setdefault(event['tid'], []).append(event)
+    return threads
+
+
+def test_profile_writes_a_chrome_trace_with_nested_spans(tmp_path, monkeypatch):
+    root = tmp_path / 'backlight'
+    support.add_backlight(root, 'intel_backlight', 1000, 500)
+    monkeypatch.setenv('GLORB_SYSFS_ROOT', str(root))
+    path = tmp_path / 'trace.json'
+    try:
+        with support.quiet():
+            glorb.main(['--profile', '--trace-file', str(path), '--backend', 'sysfs', 'b', '0', '0.3'])
+    finally:
+        glorb_trace.disable()
+
+    trace = json.loads(path.read_text())
+    assert trace['displayTimeUnit'] == 'ms'
+    names = {event['name'] for event in trace['traceEvents'] if event['ph'] == 'X'}
+    assert {'sysfs.set_panel_brightness', 'sysfs.set_brightness', 'pwrite brightness'} <= names
+    assert any(event['ph'] == 'M' and event['args']['name'] == 'main' for event in trace['traceEvents'])
+
+    for spans in spans_by_thread(trace).values():
+        # Spans on one thread are either disjoint or one lies entirely within the other
+        for a in spans:
+            assert a['dur'] >= 0
+            for b in spans:
+                if a is b or a['ts'] + a['dur'] <= b['ts'] or b['ts'] + b['dur'] <= a['ts']:
+                    continue
+                outer, inner = sorted((a, b), key=lambda event: (event['ts'], -event['dur']))
+                assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'] + 1e-6
+    write, = [event for event in trace['traceEvents'] if event['name'] == 'pwrite brightness']
+    caller, = [event for event in trace['traceEvents'] if event['name'] == 'sysfs.set_brightness']
+    assert caller['ts'] <= write['ts'] and write['ts'] + write['dur'] <= caller['ts'] + caller['dur'] + 1e-6
+
+
+def test_failed_command_still_closes_the_manager_and_writes_the_trace(tmp_path, monkeypatch):
+    closed = []
+    close = glorb.MonitorManager.close
+
+    def failing_identify(self, *args):
+        raise RuntimeError('backend went away')
+
+    def recording_close(self):
+        closed.append(self)
+        close(self)
+
+    monkeypatch.setattr(glorb.MonitorManager, 'identify', failing_identify)
+    monkeypatch.setattr(glorb.MonitorManager, 'close', recording_close)
+    path = tmp_path / 'trace.json'
+    try:
+        with support.quiet(), pytest.raises(RuntimeError, match='backend went away'):
+            glorb.main(['--profile', '--trace-file', str(path), '--backend', 'sim', 'identify'])
+    finally:
+        glorb_trace.disable()
+    assert len(closed) == 1
+    assert 'glorb identify' in {event['name'] for event in json.loads(path.read_text())['traceEvents']}
+
+def test_trace_module_imports_json_only_to_write():
+    loaded = subprocess.run([sys.executable, '-c', 'import sys, glorb_trace; print("json" in sys.modules)'],
+                            cwd=support.ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    assert loaded == 'False'
@@ -0,0 +1,35 @@
+import pytest
+
+import glorb_vcp
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('(prot(monitor)type(lcd)model(U2720Q)vcp(10 12 60(0F 11 1B) D6(01 04))mccs_ver(2.1))',
+     {0x10: None, 0x12: None, 0x60: [0x0F, 0x11, 0x1B], 0xD6: [0x01, 0x04]}),
+    # No spaces between codes, as some Samsung and LG firmware sends them
+    ('(prot(monitor)type(LCD)model(LG)cmds(01020C)vcp(0210121460(0F1112)62D6(0104))mccs_ver(2.2))',
+     {0x02: None, 0x10: None, 0x12: None, 0x14: None, 0x60: [0x0F, 0x11, 0x12], 0x62: None, 0xD6: [0x01, 0x04]}),
+    # Truncated mid-reply
+    ('(prot(monitor)vcp(10 12 60(0F 11', {0x10: None, 0x12: None, 0x60: [0x0F, 0x11]}),
+])
+def test_parse_capabilities(text, expected):
+    assert glorb_vcp.parse_capabilities(text).features == expected
+
+
+def test_capabilities_are_fetched_once_per_monitor(sim_manager):
+    def run():
+        manager = sim_manager(monitors=3, caps_latency=0.01)
+        results = [manager.vcp_set(monitor_id, 'input', 'hdmi1') for monitor_id in (1, 2)]
+        results += [manager.vcp_get(monitor_id, 'contrast') for monitor_id in (1, 2)]
+        return manager.backend.calls['capabilities'], results
+
+    cold, cold_results = run()
+    warm, warm_results = run()
+    assert all(cold_results) and all(warm_results)
+    assert (cold, warm) == (2, 0)
+
+
+def test_vcp_set_rejects_values_the_monitor_does_not_list(sim_manager, capsys):
+    manager = sim_manager(monitors=2, caps_latency=0)
+    assert not manager.vcp_set(1, 'input', 'dp2')
+    assert 'not a valid' in capsys.readouterr().out
@@ -0,0 +1,17 @@
+from tests import support
+
+
+def test_changes_are_reported_within_their_polling_intervals():
+    delays, counts, config = support.watch_fake_hour(4)
+    assert None not in delays
+    assert delays[0] <= config['topology']
+    assert delays[1] <= config['fast_brightness']
+    assert delays[2] <= config['brightness']
+
+
+def test_idle_watch_enumerates_and_reads_rarely():
+    delays, counts, config = support.watch_fake_hour(4)
+    scraped = support.scraping_hour(4, config['topology'])
+    # Only startup (first load and first check) and the rotation enumerate
+    assert counts['enumerations'] <= 3
+    assert counts['ddc'] * 10 < scraped['ddc']
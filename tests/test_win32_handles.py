@@ -0,0 +1,103 @@
+import ctypes
+import sys
+import threading
+import time
+
+import pytest
+
+import glorb
+from tests import support
+
+
+@pytest.fixture
+def glorb_win32(monkeypatch):
+    return support.import_win32_backend(monkeypatch)
+
+
+@pytest.fixture
+def fake(glorb_win32, monkeypatch):
+    fake = support.FakeDxva2()
+    fake.install(monkeypatch, glorb_win32, [support.win32_display(0, 11), support.win32_display(1, 12),
+                                            support.win32_display(2, 13)])
+    return fake
+
+
+def test_handles_are_reused_and_destroyed_exactly_once(glorb_win32, fake):
+    display = support.win32_display
+    manager = glorb.MonitorManager(backend=glorb_win32.Win32Backend())
+    with manager:
+        for write in range(5):
+            manager.brightness_all(write / 5)
+        # The second physical monitor behind hmonitor 12 is closed straight away
+        assert (fake.opened, len(fake.open)) == (4, 3)
+
+        # Rotation re-detects displays; the same monitors keep their handles
+        fake.plug([display(0, 11), display(1, 12, width=1440, height=2560), display(2, 13)])
+        manager.refresh()
+        manager.brightness_all(0.5)
+        assert (fake.opened, len(fake.open)) == (4, 3)
+
+        fake.plug([display(0, 11), display(1, 12, width=1440, height=2560)])
+        manager.update_topology()
+        assert (fake.destroyed, len(fake.open)) == (2, 2)
+
+        fake.plug([display(0, 11), display(1, 12, width=1440, height=2560), display(2, 14, hardware_id='GSM5B7F')])
+        manager.update_topology()
+        manager.brightness(2, 0.3)
+        assert (fake.opened, len(fake.open)) == (5, 3)
+
+    assert not fake.open and fake.opened == fake.destroyed and not fake.bad_destroys
+    manager.close()
+    assert not fake.bad_destroys
+
+
+def test_handle_in_use_outlives_its_display(glorb_win32, fake):
+    display = support.win32_display
+    with glorb.MonitorManager(backend=glorb_win32.Win32Backend()) as manager:
+        pool = manager.backend._handles
+        handle = pool.acquire(manager.displays.find(0))
+        fake.plug([display(1, 12), display(2, 13)])
+        manager.update_topology()
+        assert handle in fake.open
+        pool.release(handle)
+        assert handle not in fake.open
+    assert not fake.bad_destroys
+
+
+def test_handle_stays_open_while_an_abandoned_ddc_call_runs(glorb_win32, fake, monkeypatch):
+    display = support.win32_display
+    monkeypatch.setenv('GLORB_DDC', 'timeout=0.05,retries=0')
+    unblock = threading.Event()
+    writing = []
+
+    def stuck_write(handle, value):
+        writing.append(handle)
+        unblock.wait()
+        return handle in fake.open
+
+    fake.dxva2.SetMonitorBrightness = stuck_write
+    with glorb.MonitorManager(backend=glorb_win32.Win32Backend()) as manager:
+        with support.quiet():
+            assert not manager.brightness(0, 0.5)
+        handle, = writing
+        fake.plug([display(1, 12), display(2, 13)])
+        manager.update_topology()
+        # The display is gone, but the abandoned SetMonitorBrightness still holds its handle
+        assert handle in fake.open
+        unblock.set()
+        deadline = time.monotonic() + 2.0
+        while handle in fake.open and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert handle not in fake.open
+    assert not fake.bad_destroys
+
+
+def test_stubs_are_gone_once_monkeypatch_is_undone():
+    names = ('glorb_win32', 'win32api', 'win32con', 'wmi')
+    before = [sys.modules.get(name) for name in names], getattr(ctypes, 'windll', None)
+    with pytest.MonkeyPatch.context() as patch:
+        glorb_win32 = support.import_win32_backend(patch)
+        support.FakeDxva2().install(patch, glorb_win32, [support.win32_display(0, 11)])
+        support.StubWmi(has_panel=True).install(patch)
+        assert sys.modules['glorb_win32'] is glorb_win32 and 'wmi' in sys.modules
+    assert ([sys.modules.get(name) for name in names], getattr(ctypes, 'windll', None)) == before
@@ -0,0 +1,86 @@
+import pytest
+
+import glorb_wmi
+from tests import support
+
+
+def panels(monkeypatch, stub, displays):
+    stub.install(monkeypatch)
+    wmi_panels = glorb_wmi.WmiPanels()
+    wmi_panels.load(displays)
+    return wmi_panels
+
+
+def test_panel_brightness_uses_one_connection(monkeypatch):
+    stub = support.StubWmi(has_panel=True)
+    wmi_panels = panels(monkeypatch, stub, [support.WMI_PANEL, support.WMI_EXTERNAL])
+    for percent in range(5):
+        assert wmi_panels.set_brightness(support.WMI_PANEL, percent)
+    wmi_panels.close()
+    assert stub.brightness == 4 and stub.calls['connect'] == 1
+
+
+@pytest.mark.parametrize('has_panel', [True, False])
+def test_external_monitor_never_gets_a_wmi_write(has_panel, monkeypatch):
+    stub = support.StubWmi(has_panel)
+    displays = [support.WMI_PANEL, support.WMI_EXTERNAL] if has_panel else [support.WMI_EXTERNAL]
+    wmi_panels = panels(monkeypatch, stub, displays)
+    for percent in range(3):
+        assert not wmi_panels.set_brightness(support.WMI_EXTERNAL, percent)
+    wmi_panels.close()
+    assert stub.calls['set'] == 0 and stub.calls['connect'] <= 1
+
+
+def test_panel_detection_is_kept_on_disk(monkeypatch):
+    displays = [support.WMI_PANEL, support.WMI_EXTERNAL]
+    first = panels(monkeypatch, support.StubWmi(has_panel=True), displays)
+    first.set_brightness(support.WMI_EXTERNAL, 50)
+    first.close()
+    stub = support.StubWmi(has_panel=True)
+    wmi_panels = panels(monkeypatch, stub, displays)
+    assert not wmi_panels.set_brightness(support.WMI_EXTERNAL, 50)
+    wmi_panels.close()
+    assert stub.calls['connect'] == 0
+
+
+UNIDENTIFIED = {'name': '\\\\.\\DISPLAY3', 'hardware_id': None}
+
+
+@pytest.mark.parametrize('connectors', [(0x80000000, 10), (-0x80000000, 10), (11,)])
+def test_display_without_hardware_id_is_the_only_internal_panel(connectors, monkeypatch):
+    stub = support.StubWmi(has_panel=True, connectors=connectors)
+    wmi_panels = panels(monkeypatch, stub, [UNIDENTIFIED, support.WMI_EXTERNAL])
+    assert wmi_panels.set_brightness(UNIDENTIFIED, 40)
+    wmi_panels.close()
+    assert stub.written == 'BOE0812' and stub.brightness == 40
+
+
+@pytest.mark.parametrize('stub_config, displays', [
+    # Two monitors on internal connectors: which one is it?
+    ({'connectors': (0x80000000, 6)}, [UNIDENTIFIED, support.WMI_EXTERNAL]),
+    # Two WMI brightness instances
+    ({'panels': ('BOE0812', 'AUO21ED')}, [UNIDENTIFIED, support.WMI_EXTERNAL]),
+    # The only instance belongs to a display that has its hardware ID
+    ({}, [UNIDENTIFIED, support.WMI_PANEL]),
+    # No monitor on an internal connector
+    ({'connectors': (10, 10)}, [UNIDENTIFIED, support.WMI_EXTERNAL]),
+])
+def test_display_without_hardware_id_is_not_a_panel_when_ambiguous(stub_config, displays, monkeypatch):
+    stub = support.StubWmi(has_panel=True, **stub_config)
+    wmi_panels = panels(monkeypatch, stub, displays)
+    assert wmi_panels.set_brightness(UNIDENTIFIED, 40) is None
+    assert wmi_panels.get_brightness(UNIDENTIFIED) is None
+    wmi_panels.close()
+    assert stub.calls['set'] == 0
+
+
+def test_failed_detection_is_not_kept_on_disk(monkeypatch):
+    displays = [support.WMI_PANEL, support.WMI_EXTERNAL]
+    stub = support.StubWmi(has_panel=True, connect_failures=1)
+    first = panels(monkeypatch, stub, displays)
+    assert first.set_brightness(support.WMI_PANEL, 40) is None
+    first.close()
+    second = panels(monkeypatch, stub, displays)
+    assert second.set_brightness(support.WMI_PANEL, 40)
+    second.close()
+    assert stub.brightness == 40
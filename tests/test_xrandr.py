@@ -0,0 +1,28 @@
+import glorb
+import glorb_xrandr
+from tests import support
+
+
+def test_parse_query():
+    displays, modes = glorb_xrandr.parse_query(support.XRANDR_QUERY)
+    assert [display['name'] for display in displays] == ['eDP-1', 'HDMI-1']
+    edp, hdmi = displays
+    assert edp['id'] == 0 and edp['primary'] and edp['frequency'] == 60 and edp['orientation'] == 0
+    assert hdmi['id'] == 1 and (hdmi['width'], hdmi['height']) == (1080, 1920) and hdmi['orientation'] == 1
+    assert modes['eDP-1'][1] == (1920, 1080, 60) and len(modes['eDP-1'][0]) == 9
+    assert 'DP-2' not in modes
+
+
+def test_apply_runs_xrandr_once_for_every_change(tmp_path):
+    command, log = support.write_xrandr_stub(str(tmp_path))
+    backend = glorb_xrandr.XrandrBackend(command, backlight=glorb_xrandr.SysfsBacklightBackend(str(tmp_path)))
+    manager = glorb.MonitorManager(backend=backend)
+    assert manager.apply([(0, 'mode', (1680, 1050, 60)), (1, 'rotate', 0), (1, 'mode', (1920, 1080, None))])
+    manager.close()
+
+    with open(log) as fh:
+        assert fh.read().splitlines() == [
+            '--current',
+            '--output eDP-1 --mode 1680x1050 --rate 60 --output HDMI-1 --mode 1920x1080 --rotate normal',
+            '--query',
+        ]